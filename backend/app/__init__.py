@@ -2,7 +2,9 @@ from flask import Flask
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from .db import db
-from .extensions import limiter
+from .extensions import limiter, feed_cache, liked_set_cache, token_versions, like_buffer, variant_worker, password_hasher, email_sender
+from .utils.json_provider import FastJSONProvider
+from .utils.uploads import UploadRequest
 from config import init_app_config
 from flask_mail import Mail
 import os
@@ -11,12 +13,17 @@ mail = Mail()
 
 def create_app(env=None):
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    # File parts of upload routes are streamed to disk while they are validated
+    app.request_class = UploadRequest
     
     # Initialize configuration from the config module
     configured_env = init_app_config(app, env)
     
     # Initialize extensions
     limiter.init_app(app)
+    feed_cache.init_app(app)
+    liked_set_cache.init_app(app)
     
     # Setup CORS
     CORS(app, 
@@ -25,10 +32,25 @@ def create_app(env=None):
     
     # Initialize JWT
     jwt = JWTManager(app)
+    # Reject access tokens whose user context claims were changed since they were issued
+    token_versions.init_app(app, jwt)
     
     # Initialize database
     db.init_app(app)
 
+    # Buffer like toggles when write-behind mode is enabled
+    like_buffer.init_app(app)
+
+    # Resize uploaded images in the background
+    variant_worker.init_app(app)
+
+    # Hash passwords outside the request thread
+    password_hasher.init_app(app)
+
+    # Count queries and database time per request
+    from .instrumentation import init_query_instrumentation
+    init_query_instrumentation(app)
+
     app.config['MAIL_SECRET_KEY'] = os.getenv('MAIL_SECRET_KEY')
     app.config['MAIL_SERVER'] = os.getenv('MAIL_SERVER')
     app.config['MAIL_PORT'] = int(os.getenv('MAIL_PORT', 587))
@@ -41,6 +63,9 @@ def create_app(env=None):
     # Initialize Mail
     mail.init_app(app)
 
+    # Send queued emails in the background, over the MAIL_* server configured above
+    email_sender.init_app(app)
+
     with app.app_context():
         # Import all models to register them with SQLAlchemy
         from app import models
@@ -58,6 +83,12 @@ def create_app(env=None):
     app.register_blueprint(profile_bp, url_prefix='/api')
     app.register_blueprint(upgrade_membership_bp, url_prefix='/api')
     app.register_blueprint(comments_bp, url_prefix="/api")
+
+    # Register maintenance CLI commands (e.g. `flask counters reconcile`)
+    from .commands import counters_cli, media_cli, outbox_cli
+    app.cli.add_command(counters_cli)
+    app.cli.add_command(media_cli)
+    app.cli.add_command(outbox_cli)
     
     # Log application creation
     app.logger.info(f"Application initialized with environment: {configured_env}")
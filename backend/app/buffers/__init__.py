@@ -0,0 +1,5 @@
+from .like_buffer import LikeWriteBuffer
+
+__all__ = [
+    'LikeWriteBuffer',
+]
@@ -0,0 +1,241 @@
+import atexit
+import fcntl
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# (user_id, post_id) -> (liked state in the database when first buffered, desired liked state).
+# The database state is None for entries replayed from the log, whose origin is unknown.
+Key = Tuple[int, int]
+Entry = Tuple[Optional[bool], bool]
+
+class LikeWriteBuffer:
+    """Write-behind buffer for like toggles.
+
+    Toggles are appended to a local log and collapsed in memory to the final liked state per
+    (user, post). A background thread applies the collapsed states in bulk every
+    LIKE_BUFFER_FLUSH_MS, recounts the affected posts and drops their feed pages. Readers overlay
+    pending states on what the database returns. The log holds final states, so replaying it
+    after a crash is idempotent. The buffer is a no-op unless LIKE_WRITE_BEHIND is enabled,
+    and only one process may own a log path.
+    """
+
+    def __init__(self, app=None, feed_cache=None, like_repository=None):
+        self.app = None
+        self.enabled = False
+        self.interval = 0.2
+        self.fsync = False
+        self.feed_cache = feed_cache
+        self._like_repository = like_repository
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[Key, Entry] = {}
+        self._flushing: Dict[Key, Entry] = {}
+        self._post_delta: Dict[int, int] = {}
+        self._generation = 0
+        self._path = None
+        self._log = None
+        self._lock_file = None
+        self._stop = threading.Event()
+        self._thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        app.extensions['like_buffer'] = self
+        if not app.config.get('LIKE_WRITE_BEHIND', False):
+            return
+
+        self.app = app
+        self.interval = int(app.config.get('LIKE_BUFFER_FLUSH_MS', 200)) / 1000
+        self.fsync = bool(app.config.get('LIKE_BUFFER_FSYNC', False))
+        self._path = app.config['LIKE_BUFFER_PATH']
+        os.makedirs(os.path.dirname(self._path) or '.', exist_ok=True)
+
+        self._lock_file = open(self._path + '.lock', 'w')
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            app.logger.warning(f"Like buffer {self._path} is owned by another process; writing likes synchronously")
+            self._lock_file.close()
+            self._lock_file = None
+            return
+
+        # Entries left by a previous process are applied by the first flush
+        for key, liked in self._read_log().items():
+            self._pending[key] = (None, liked)
+        self._log = open(self._path, 'a', buffering=1)
+        self.enabled = True
+
+        self._thread = threading.Thread(target=self._run, name='like-buffer-flusher', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def _repository(self):
+        if self._like_repository is None:
+            from app.repositories import LikeRepository
+            return LikeRepository()
+        return self._like_repository
+
+    def _read_log(self) -> Dict[Key, bool]:
+        states: Dict[Key, bool] = {}
+        if not os.path.exists(self._path):
+            return states
+        with open(self._path) as log:
+            for line in log:
+                parts = line.split()
+                if len(parts) == 3:
+                    states[(int(parts[0]), int(parts[1]))] = parts[2] == '1'
+        return states
+
+    def _append(self, key: Key, liked: bool) -> None:
+        self._log.write(f"{key[0]} {key[1]} {int(liked)}\n")
+        if self.fsync:
+            os.fsync(self._log.fileno())
+
+    def _compact_log(self) -> None:
+        """Rewrite the log with only the entries that are still pending"""
+        tmp_path = self._path + '.tmp'
+        with open(tmp_path, 'w') as tmp:
+            tmp.writelines(f"{user_id} {post_id} {int(liked)}\n" for (user_id, post_id), (_, liked) in self._pending.items())
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        self._log.close()
+        os.replace(tmp_path, self._path)
+        self._log = open(self._path, 'a', buffering=1)
+
+    def _current(self, key: Key) -> Optional[bool]:
+        entry = self._pending.get(key) or self._flushing.get(key)
+        return entry[1] if entry else None
+
+    def _shift_delta(self, post_id: int, entry: Optional[Entry], sign: int) -> None:
+        if entry is None or entry[0] is None or entry[0] == entry[1]:
+            return
+        delta = self._post_delta.get(post_id, 0) + sign * (1 if entry[1] else -1)
+        if delta:
+            self._post_delta[post_id] = delta
+        else:
+            self._post_delta.pop(post_id, None)
+
+    def toggle(self, user_id: int, post_id: int) -> Optional[Tuple[bool, int]]:
+        """Buffer a like toggle and return (liked, like count including buffered changes), or None if the post is missing"""
+        key = (int(user_id), int(post_id))
+        while True:
+            generation = self._generation
+            state = self._repository().get_like_state(*key)
+            if state is None:
+                return None
+            db_liked, db_count = state
+
+            with self._lock:
+                # A flush committed since the read: the database state may be stale, read again
+                if generation != self._generation and key not in self._pending:
+                    continue
+                entry = self._pending.get(key)
+                if entry is not None:
+                    base, current = entry
+                elif key in self._flushing:
+                    base = current = self._flushing[key][1]
+                else:
+                    base = current = db_liked
+
+                liked = not current
+                self._shift_delta(key[1], entry, -1)
+                new_entry = (base, liked)
+                self._pending[key] = new_entry
+                self._shift_delta(key[1], new_entry, 1)
+                self._append(key, liked)
+                return liked, db_count + self._post_delta.get(key[1], 0)
+
+    def liked_state(self, user_id: int, post_id: int) -> Optional[bool]:
+        """The buffered liked state for (user, post), or None when the database is authoritative"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            return self._current((int(user_id), int(post_id)))
+
+    def likes_delta(self, post_id: int) -> int:
+        """Like count change buffered for a post but not yet visible in posts.likes_count"""
+        if not self.enabled:
+            return 0
+        with self._lock:
+            return self._post_delta.get(int(post_id), 0)
+
+    def overlay_liked(self, user_id: int, post_ids: Iterable[int], liked_post_ids: Iterable[int]) -> List[int]:
+        """Merge buffered states into the liked post ids the database returned for post_ids"""
+        liked = set(liked_post_ids)
+        if self.enabled and (self._pending or self._flushing):
+            user_id = int(user_id)
+            with self._lock:
+                for post_id in post_ids:
+                    state = self._current((user_id, post_id))
+                    if state is True:
+                        liked.add(post_id)
+                    elif state is False:
+                        liked.discard(post_id)
+        return [post_id for post_id in post_ids if post_id in liked]
+
+    def flush(self) -> int:
+        """Apply all pending states in one transaction; returns the number of (user, post) states written"""
+        if not self.enabled:
+            return 0
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                self._flushing, self._pending = self._pending, {}
+            states = {key: liked for key, (_, liked) in self._flushing.items()}
+
+            try:
+                post_ids = self._repository().apply_like_states(states)
+            except Exception as e:
+                with self._lock:
+                    # Keep the batch for the next attempt; newer toggles already in pending win
+                    for key, entry in self._flushing.items():
+                        newer = self._pending.get(key)
+                        if newer is not None:
+                            self._shift_delta(key[1], newer, -1)
+                            self._shift_delta(key[1], entry, -1)
+                            merged = (entry[0], newer[1])
+                            self._pending[key] = merged
+                            self._shift_delta(key[1], merged, 1)
+                        else:
+                            self._pending[key] = entry
+                    self._flushing = {}
+                self.app.logger.error(f"Error flushing like buffer: {str(e)}")
+                return 0
+
+            with self._lock:
+                # The database now holds these states, so their deltas are part of likes_count
+                for key, entry in self._flushing.items():
+                    self._shift_delta(key[1], entry, -1)
+                self._flushing = {}
+                self._generation += 1
+                self._compact_log()
+
+            if self.feed_cache is not None and post_ids:
+                self.feed_cache.invalidate(
+                    self.feed_cache.sort_tag('likes'),
+                    *(self.feed_cache.post_tag(post_id) for post_id in post_ids)
+                )
+            self.app.logger.info(f"Flushed {len(states)} buffered likes for {len(post_ids)} posts")
+            return len(states)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            with self.app.app_context():
+                self.flush()
+
+    def stop(self) -> None:
+        """Stop the flusher and write out whatever is still pending"""
+        if not self.enabled:
+            return
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        with self.app.app_context():
+            self.flush()
+        self.enabled = False
+        self._log.close()
+        if self._lock_file is not None:
+            self._lock_file.close()
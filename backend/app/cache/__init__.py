@@ -0,0 +1,12 @@
+from .backends import InMemoryCacheBackend, RedisCacheBackend
+from .feed_cache import FeedCache
+from .liked_set_cache import LikedSetCache
+from .token_versions import TokenVersionCache
+
+__all__ = [
+    'InMemoryCacheBackend',
+    'RedisCacheBackend',
+    'FeedCache',
+    'LikedSetCache',
+    'TokenVersionCache',
+]
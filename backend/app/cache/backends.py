@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+class InMemoryCacheBackend:
+    """Process-local cache of byte payloads with TTL expiry, LRU eviction and tag-based invalidation"""
+
+    shared = False
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: int, tags: Iterable[str] = ()) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            tags = tuple(tags)
+            self._entries[key] = (time.monotonic() + ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            # Evict least recently used entries beyond capacity
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._remove(key)
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        with self._lock:
+            keys = set()
+            for tag in tags:
+                keys |= self._tags.pop(tag, set())
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+class RedisCacheBackend:
+    """Cache backend for a local Redis-compatible server shared by all workers.
+
+    LRU eviction is delegated to the server (configure maxmemory-policy allkeys-lru).
+    """
+
+    shared = True
+
+    def __init__(self, url: str, prefix: str = "leonardo:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("The redis package is required for the redis cache backend")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: int, tags: Iterable[str] = ()) -> None:
+        pipe = self.client.pipeline()
+        pipe.set(self.prefix + key, value, ex=ttl)
+        for tag in tags:
+            tag_key = f"{self.prefix}tag:{tag}"
+            pipe.sadd(tag_key, key)
+            pipe.expire(tag_key, ttl)
+        pipe.execute()
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        tag_keys = [f"{self.prefix}tag:{tag}" for tag in tags]
+        if not tag_keys:
+            return 0
+        pipe = self.client.pipeline()
+        for tag_key in tag_keys:
+            pipe.smembers(tag_key)
+        members = set()
+        for result in pipe.execute():
+            members |= {m.decode() if isinstance(m, bytes) else m for m in result}
+        if members:
+            self.client.delete(*[self.prefix + key for key in members])
+        self.client.delete(*tag_keys)
+        return len(members)
+
+    def clear(self) -> None:
+        keys = list(self.client.scan_iter(match=self.prefix + "*"))
+        if keys:
+            self.client.delete(*keys)
@@ -0,0 +1,75 @@
+import hashlib
+import json
+from typing import Iterable, Optional
+from .backends import InMemoryCacheBackend, RedisCacheBackend
+
+class FeedCache:
+    """Response cache for feed pages, keyed by query parameters and invalidated by tags.
+
+    Entries are stored as pre-serialized JSON bytes. Each entry is tagged with the posts
+    it contains, its sort order and its scope, so writes only drop the pages they affect.
+    The cache is a no-op until init_app configures a backend.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.ttl = 30
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        backend = app.config.get('FEED_CACHE_BACKEND', 'memory')
+        self.ttl = int(app.config.get('FEED_CACHE_TTL_SECONDS', 30))
+        if backend == 'redis':
+            self.backend = RedisCacheBackend(app.config['FEED_CACHE_URL'])
+        elif backend == 'memory':
+            self.backend = InMemoryCacheBackend(int(app.config.get('FEED_CACHE_MAX_ENTRIES', 1024)))
+        else:
+            self.backend = None
+        app.extensions['feed_cache'] = self
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    @staticmethod
+    def make_key(sort_by: str, cursor: Optional[str], offset: int, limit: int,
+                 search: Optional[str], user_id: Optional[int], preview_chars: Optional[int] = None) -> str:
+        raw = json.dumps([sort_by, cursor, offset, limit, search, user_id, preview_chars], separators=(",", ":"))
+        return "feed:" + hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def scope_tag(user_id: Optional[int] = None) -> str:
+        return f"scope:user:{user_id}" if user_id else "scope:all"
+
+    @staticmethod
+    def sort_tag(sort_by: str) -> str:
+        return f"sort:{sort_by}"
+
+    @staticmethod
+    def post_tag(post_id: int) -> str:
+        return f"post:{post_id}"
+
+    @staticmethod
+    def author_tag(user_id: int) -> str:
+        """Pages showing posts by user_id, which embed the author's username and picture"""
+        return f"author:{user_id}"
+
+    SEARCH_TAG = "search"
+
+    def get(self, key: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        return self.backend.get(key)
+
+    def set(self, key: str, payload: bytes, tags: Iterable[str]) -> None:
+        if self.enabled:
+            self.backend.set(key, payload, self.ttl, tags)
+
+    def invalidate(self, *tags: str) -> None:
+        if self.enabled:
+            self.backend.invalidate_tags(tags)
+
+    def clear(self) -> None:
+        if self.enabled:
+            self.backend.clear()
@@ -0,0 +1,126 @@
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
+
+class LikedSetCache:
+    """Per-user index of liked post ids for answering feed-page membership checks in memory.
+
+    A user's ids are loaded once and kept as a sorted int32 array that toggles update in place.
+    Memory is bounded by the total number of ids held: least recently used users are evicted
+    beyond LIKED_SET_MAX_IDS, and entries expire after LIKED_SET_TTL_SECONDS. When the feed
+    cache has a shared backend, a per-user version token stored there lets every process notice
+    toggles made by the others and reload. The cache is a no-op until init_app enables it.
+    """
+
+    VERSION_KEY = "liked-set:{}"
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.ttl = 300
+        self.max_ids = 2_000_000
+        self.version_backend = None
+        # user_id -> (expires_at, version token, sorted post ids)
+        self._entries: "OrderedDict[int, Tuple[float, Optional[bytes], array]]" = OrderedDict()
+        self._total_ids = 0
+        self._toggles = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        self.enabled = bool(app.config.get('LIKED_SET_CACHE_ENABLED', True))
+        self.ttl = int(app.config.get('LIKED_SET_TTL_SECONDS', 300))
+        self.max_ids = int(app.config.get('LIKED_SET_MAX_IDS', 2_000_000))
+        feed_cache = app.extensions.get('feed_cache')
+        backend = getattr(feed_cache, 'backend', None)
+        self.version_backend = backend if getattr(backend, 'shared', False) else None
+        app.extensions['liked_set_cache'] = self
+
+    def _version(self, user_id: int) -> Optional[bytes]:
+        if self.version_backend is None:
+            return None
+        return self.version_backend.get(self.VERSION_KEY.format(user_id))
+
+    def _remove(self, user_id: int) -> None:
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._total_ids -= len(entry[2])
+
+    def liked_among(self, user_id: int, post_ids: Iterable[int]) -> Optional[List[int]]:
+        """The subset of post_ids the user liked, or None when the user's set is not cached"""
+        if not self.enabled:
+            return None
+        user_id = int(user_id)
+        version = self._version(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, cached_version, liked = entry
+            if expires_at <= time.monotonic() or cached_version != version:
+                self._remove(user_id)
+                return None
+            self._entries.move_to_end(user_id)
+            result = []
+            for post_id in post_ids:
+                i = bisect_left(liked, post_id)
+                if i < len(liked) and liked[i] == post_id:
+                    result.append(post_id)
+            return result
+
+    def begin_load(self, user_id: int) -> Tuple[int, Optional[bytes]]:
+        """Snapshot to pass to store() so a load that raced with a toggle is discarded"""
+        return self._toggles, self._version(int(user_id))
+
+    def store(self, user_id: int, post_ids: Iterable[int], snapshot: Tuple[int, Optional[bytes]]) -> None:
+        """Cache a user's complete liked set as loaded from the database"""
+        if not self.enabled:
+            return
+        user_id = int(user_id)
+        liked = array('i', sorted(post_ids))
+        if len(liked) > self.max_ids:
+            return
+        toggles, version = snapshot
+        with self._lock:
+            if toggles != self._toggles:
+                return
+            self._remove(user_id)
+            self._entries[user_id] = (time.monotonic() + self.ttl, version, liked)
+            self._total_ids += len(liked)
+            # Evict the least recently used users beyond the id budget
+            while self._total_ids > self.max_ids:
+                self._remove(next(iter(self._entries)))
+
+    def apply_toggle(self, user_id: int, post_id: int, liked: bool) -> None:
+        """Update a cached set in place after the user liked or unliked a post"""
+        if not self.enabled:
+            return
+        user_id, post_id = int(user_id), int(post_id)
+        version = None
+        if self.version_backend is not None:
+            version = os.urandom(8).hex().encode("ascii")
+            self.version_backend.set(self.VERSION_KEY.format(user_id), version, self.ttl)
+        with self._lock:
+            self._toggles += 1
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return
+            expires_at, _, ids = entry
+            i = bisect_left(ids, post_id)
+            present = i < len(ids) and ids[i] == post_id
+            if liked and not present:
+                ids.insert(i, post_id)
+                self._total_ids += 1
+            elif not liked and present:
+                del ids[i]
+                self._total_ids -= 1
+            self._entries[user_id] = (expires_at, version, ids)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_ids = 0
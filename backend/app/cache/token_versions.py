@@ -0,0 +1,86 @@
+from datetime import timedelta
+from typing import Optional
+
+from flask import jsonify
+
+from .backends import InMemoryCacheBackend
+from app.utils.user_context import ACCESS_TOKEN_MAX_MINUTES, CONTEXT_CLAIM, context_from_claims
+
+class TokenVersionCache:
+    """Latest users.token_version of recently changed users, for rejecting stale access tokens.
+
+    Access tokens carry a user context (membership, TOTP state, username) with the token_version
+    it was read at. Services record the new version here after changing one of those fields, and
+    an access token with an older context is answered with 401 so the client refreshes it and
+    gets claims read from the database. Only bumps are stored, so checking a token never queries
+    the database. Entries outlive every access token: they are kept for the longest of
+    JWT_ACCESS_TOKEN_EXPIRES, the lifetime AuthService gives tokens and TOKEN_VERSION_TTL_SECONDS.
+    When the feed cache has a shared backend every process sees every bump; otherwise a bump is
+    only seen by the process that made it, and other processes serve the old claims until the
+    token expires.
+    """
+
+    KEY = "token-version:{}"
+
+    def __init__(self, app=None, jwt=None):
+        self.enabled = False
+        self.ttl = ACCESS_TOKEN_MAX_MINUTES * 60
+        self.backend = None
+        if app is not None:
+            self.init_app(app, jwt)
+
+    def init_app(self, app, jwt=None) -> None:
+        self.enabled = bool(app.config.get('TOKEN_VERSION_CHECK', True))
+        self.ttl = self._ttl(app.config)
+        feed_cache = app.extensions.get('feed_cache')
+        backend = getattr(feed_cache, 'backend', None)
+        if getattr(backend, 'shared', False):
+            self.backend = backend
+        else:
+            self.backend = InMemoryCacheBackend(int(app.config.get('TOKEN_VERSION_MAX_ENTRIES', 10000)))
+        app.extensions['token_versions'] = self
+        if jwt is not None and self.enabled:
+            jwt.token_in_blocklist_loader(self._is_stale_token)
+            jwt.revoked_token_loader(self._stale_token_response)
+
+    @staticmethod
+    def _ttl(config) -> int:
+        seconds = [ACCESS_TOKEN_MAX_MINUTES * 60, int(config.get('TOKEN_VERSION_TTL_SECONDS') or 0)]
+        access_expires = config.get('JWT_ACCESS_TOKEN_EXPIRES')
+        if isinstance(access_expires, timedelta):
+            seconds.append(int(access_expires.total_seconds()))
+        elif isinstance(access_expires, (int, float)) and not isinstance(access_expires, bool):
+            seconds.append(int(access_expires))
+        return max(seconds)
+
+    def latest(self, user_id: int) -> Optional[int]:
+        if self.backend is None:
+            return None
+        value = self.backend.get(self.KEY.format(int(user_id)))
+        return int(value) if value is not None else None
+
+    def bump(self, user_id: int, token_version: int) -> None:
+        """Record that claims older than token_version are out of date"""
+        if not self.enabled or self.backend is None:
+            return
+        self.backend.set(self.KEY.format(int(user_id)), str(int(token_version)).encode("ascii"), self.ttl)
+
+    def is_stale(self, user_id: int, token_version: int) -> bool:
+        if not self.enabled:
+            return False
+        latest = self.latest(user_id)
+        return latest is not None and token_version < latest
+
+    def _is_stale_token(self, jwt_header, jwt_payload) -> bool:
+        if CONTEXT_CLAIM not in jwt_payload:
+            return False
+        context = context_from_claims(jwt_payload.get("sub"), jwt_payload)
+        return context is not None and self.is_stale(context.user_id, context.token_version)
+
+    @staticmethod
+    def _stale_token_response(jwt_header, jwt_payload):
+        return jsonify({"msg": "Token claims are out of date", "error": "token_stale"}), 401
+
+    def clear(self) -> None:
+        if self.backend is not None and not getattr(self.backend, 'shared', False):
+            self.backend.clear()
@@ -0,0 +1,69 @@
+import click
+from flask.cli import AppGroup
+from app.repositories.post_repository import PostRepository
+from app.repositories.media_repository import MediaRepository
+from app.repositories.email_outbox_repository import EmailOutboxRepository, utcnow
+from datetime import timedelta
+
+counters_cli = AppGroup('counters', help="Maintain the denormalized like/comment counters on posts.")
+
+@counters_cli.command('backfill')
+@click.option('--batch-size', default=1000, show_default=True, help="Posts rewritten per transaction.")
+def backfill_counters(batch_size):
+    """Recompute likes_count/comments_count for every post."""
+    rewritten = PostRepository().reconcile_counters(only_drifted=False, batch_size=batch_size)
+    click.echo(f"Backfilled counters for {rewritten} posts")
+
+@counters_cli.command('reconcile')
+@click.option('--batch-size', default=1000, show_default=True, help="Posts checked per transaction.")
+def reconcile_counters(batch_size):
+    """Repair posts whose counters drifted from the likes/comments tables (run from cron)."""
+    repaired = PostRepository().reconcile_counters(only_drifted=True, batch_size=batch_size)
+    click.echo(f"Repaired counters for {repaired} posts")
+
+media_cli = AppGroup('media', help="Maintain the content-addressed media store.")
+
+@media_cli.command('variants')
+@click.option('--batch-size', default=100, show_default=True, help="Media rows listed per query.")
+def generate_variants(batch_size):
+    """Write missing resized variants for every stored image (after upgrading, or adding widths)."""
+    from app.extensions import variant_worker
+    repository = MediaRepository()
+    generated, last = 0, None
+    while True:
+        names = repository.get_names_after(last, batch_size)
+        if not names:
+            break
+        for name in names:
+            try:
+                generated += len(variant_worker.generate(name))
+            except Exception as e:
+                click.echo(f"Skipped {name}: {e}", err=True)
+        last = names[-1].split('.', 1)[0]
+    click.echo(f"Generated {generated} variants")
+
+outbox_cli = AppGroup('outbox', help="Inspect and deliver the email outbox.")
+
+@outbox_cli.command('drain')
+def drain_outbox():
+    """Send every due email now over the configured SMTP server."""
+    from app.extensions import email_sender
+    try:
+        sent, failed = email_sender.drain()
+    finally:
+        email_sender.stop()
+    click.echo(f"Sent {sent} emails, {failed} failed permanently")
+
+@outbox_cli.command('status')
+def outbox_status():
+    """Show the number of emails per status."""
+    counts = EmailOutboxRepository().count_by_status()
+    for status in ('pending', 'sent', 'failed'):
+        click.echo(f"{status}: {counts.get(status, 0)}")
+
+@outbox_cli.command('purge')
+@click.option('--days', default=30, show_default=True, help="Keep sent and failed emails this many days.")
+def purge_outbox(days):
+    """Delete sent and failed emails older than --days (run from cron)."""
+    deleted = EmailOutboxRepository().purge(utcnow() - timedelta(days=days))
+    click.echo(f"Deleted {deleted} emails")
@@ -4,6 +4,8 @@ from app.interfaces.services.IAuthService import IAuthService
 from app.services.auth_service import AuthService
 import pyotp
 from app.utils.validation import is_valid_email, is_strong_password, is_valid_username
+from app.workers import PasswordHasherBusy, BUSY_MESSAGE, BUSY_RETRY_AFTER
+from app.utils.user_context import context_of, get_user_context
 from flask_jwt_extended import (
     jwt_required,
     get_jwt_identity,
@@ -59,12 +61,17 @@ class AuthController:
             if not is_valid:
                 return jsonify({"error": message}), 400
 
-            user   = self.auth_service.create_user(payload)
-            response = jsonify({
+            # The verification email is queued with the user and sent in the background
+            _, error = self.auth_service.create_user(payload)
+            if error:
+                return jsonify({"error": error}), 400
+            return jsonify({
                 "message": "Sign up successful! Please Verify email."
-            })
-            self.auth_service.send_verification_email(user)
-            return response, 201
+            }), 201
+
+        except PasswordHasherBusy as e:
+            current_app.logger.warning(f"Rejected signup, password hashing is saturated: {e}")
+            return jsonify({"error": BUSY_MESSAGE}), 503, {"Retry-After": str(BUSY_RETRY_AFTER)}
 
         except Exception as e:
             current_app.logger.error(f"Error during signup: {e}")
@@ -95,8 +102,7 @@ class AuthController:
             if not user.email_verified:
                 return jsonify({"error": "Email not verified. Please check your inbox."}), 401
             
-            totp_verified = user.totp_verified
-            tokens = self.auth_service.generate_tokens(user.user_id, totp_verified=totp_verified)
+            tokens = self.auth_service.generate_tokens(user)
             response = jsonify({
                 "message": "Login successful",
                 "access_token": tokens["access_token"]
@@ -104,6 +110,10 @@ class AuthController:
             set_refresh_cookies(response, tokens["refresh_token"])
             return response, 200
 
+        except PasswordHasherBusy as e:
+            current_app.logger.warning(f"Rejected login, password hashing is saturated: {e}")
+            return jsonify({"error": BUSY_MESSAGE}), 503, {"Retry-After": str(BUSY_RETRY_AFTER)}
+
         except Exception as e:
             current_app.logger.error(f"Error during login: {e}")
             return jsonify({"error": ERROR_MESSAGE}), 500
@@ -115,6 +125,8 @@ class AuthController:
             user_id = get_jwt_identity()
             current_app.logger.info(f"Refreshing token for user {user_id}")
             tokens = self.auth_service.refresh_access_token(user_id)
+            if not tokens:
+                return jsonify({"error": "User not found"}), 401
             return jsonify(tokens), 200
 
         except Exception as e:
@@ -135,12 +147,20 @@ class AuthController:
     @jwt_required()
     def get_totp_setup(self):
         """Return provisioning URI and showQr flag based on TOTP state"""
+        # 1) If they’ve already verified TOTP, skip QR (known from the token, without a query)
+        context = get_user_context()
+        if context and context.totp_verified:
+            return jsonify({
+                "message": "TOTP already verified",
+                "showQr": False,
+                "otpUrl": None
+            }), 200
+
         user_id = int(get_jwt_identity())
         user = self.auth_service.get_user(user_id)
         if not user:
             return jsonify({"error": "User not found"}), 404
 
-        # 1) If they’ve already verified TOTP, skip QR
         if user.totp_verified:
             return jsonify({
                 "message": "TOTP already verified",
@@ -163,11 +183,15 @@ class AuthController:
     @jwt_required()
     def verify_totp(self):
         """Verify the OTP code entered by the user"""
+        # Tokens are minted from the row, never from the claims: a deleted user or one whose
+        # claims changed must not be able to keep renewing an old token here
         user_id = int(get_jwt_identity())
         user = self.auth_service.get_user(user_id)
+        if not user:
+            return jsonify({"error": "User not found"}), 404
 
         if user.totp_verified:
-            new_tokens = self.auth_service.generate_tokens(user.user_id, totp_verified=True)
+            new_tokens = self.auth_service.issue_access_token(context_of(user))
             return jsonify({
                 "message": "TOTP already verified",
                 "access_token": new_tokens["access_token"]
@@ -187,8 +211,7 @@ class AuthController:
         if is_valid:
             self.auth_service.update_totp_verified(user_id, True)
             current_app.logger.info(f"TOTP verified for user {user_id}")
-            user_id = int(get_jwt_identity())
-            new_tokens = self.auth_service.generate_tokens(user_id, totp_verified=True)
+            new_tokens = self.auth_service.generate_tokens(self.auth_service.get_user(user_id))
             return jsonify({
                 "message": "TOTP Verified!",
                 "access_token": new_tokens["access_token"]
@@ -207,7 +230,11 @@ class AuthController:
         if not success:
             return jsonify({"error": "Invalid or expired token"}), 400
 
-        tokens = self.auth_service.generate_tokens(success)
+        user = self.auth_service.get_user(success)
+        if not user:
+            return jsonify({"error": "Invalid or expired token"}), 400
+
+        tokens = self.auth_service.generate_tokens(user)
         response = jsonify({
             "message": "Email verified successfully!",
             "access_token": tokens["access_token"]
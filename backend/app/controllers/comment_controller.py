@@ -2,31 +2,64 @@ import re
 from flask import request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.utils import secure_filename
-from app.services.comment_service import CommentService
+from app.services.comment_service import CommentService, COMMENT_NOT_FOUND_ERROR, COMMENT_PAGE_SIZE, MAX_FILE_SIZE, ALLOWED_MIME_TYPES
 from app.interfaces.services.ICommentService import ICommentService
-from app.utils.validation import is_valid_id
+from app.models.comments import MAX_COMMENT_DEPTH
+from app.utils.validation import is_valid_id, is_valid_image_width
+from app.utils.conditional import is_conditional, is_not_modified, not_modified_response, with_validators
+from app.utils.pagination import MAX_PAGE_LIMIT
+from app.services.media_service import MEDIA_STAGING_FOLDER
+from app.utils.uploads import stream_uploads
 
 # --- Validation constants & regexes ---
 INT_REGEX          = r"^[1-9]\d*$"          # positive integers (no leading zero)
 MAX_CONTENT_LENGTH = 500                    # max characters in a comment
 ALLOWED_IMAGE_EXTS  = {"png", "jpg", "jpeg", "gif"}
 FILENAME_REGEX     = r"^[A-Za-z0-9_\-]+\.(?:png|jpg|jpeg|gif)$"
+CURSOR_MAX_LENGTH  = 200                    # max chars for an opaque pagination cursor
 
 class CommentController:
     def __init__(self, comment_service: ICommentService = None):
         self.comment_service = comment_service or CommentService()
 
+    def _parse_page_args(self):
+        """Validate ?limit=&cursor=; returns ((limit, cursor), None) or (None, error response)"""
+        raw_limit = request.args.get("limit", str(COMMENT_PAGE_SIZE))
+        cursor = request.args.get("cursor") or None
+
+        # Validate limit (capped server-side)
+        if not re.match(INT_REGEX, raw_limit):
+            return None, (jsonify({"error": "limit must be a positive integer"}), 400)
+        limit = min(int(raw_limit), MAX_PAGE_LIMIT)
+
+        if cursor is not None and len(cursor) > CURSOR_MAX_LENGTH:
+            return None, (jsonify({"error": "Invalid cursor"}), 400)
+        return (limit, cursor), None
+
     @jwt_required()
     def get_comments_by_post(self, post_id):
-        """GET /posts/<post_id>/comments"""
+        """GET /comments/<post_id>?limit=&cursor= (top-level comments only)"""
         try:
             # Validate post_id is a positive integer
             if not is_valid_id(post_id):
                 return jsonify({"error": "Invalid post ID"}), 400
 
-            comments = self.comment_service.get_comments_by_post(int(post_id))
-            return jsonify({"comments": comments}), 200
+            page_args, error = self._parse_page_args()
+            if error:
+                return error
+            limit, cursor = page_args
+
+            # Count + newest id change on every insert and delete in the post's comments
+            if is_conditional():
+                etag = self.comment_service.get_comments_etag(int(post_id))
+                if is_not_modified(etag):
+                    return not_modified_response(etag)
+
+            page, etag = self.comment_service.get_comments_page(int(post_id), limit=limit, cursor=cursor)
+            return with_validators(jsonify(page), etag), 200
 
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
         except Exception as e:
             current_app.logger.error(
                 f"Error fetching comments for post {post_id}: {e}"
@@ -34,6 +67,80 @@ class CommentController:
             return jsonify({"error": "Internal server error"}), 500
 
     @jwt_required()
+    def get_replies(self, post_id, parent_id):
+        """GET /comments/<post_id>/replies/<parent_id>?limit=&cursor="""
+        try:
+            if not is_valid_id(post_id):
+                return jsonify({"error": "Invalid post ID"}), 400
+            if not is_valid_id(parent_id):
+                return jsonify({"error": "Invalid parent comment ID"}), 400
+
+            page_args, error = self._parse_page_args()
+            if error:
+                return error
+            limit, cursor = page_args
+
+            if is_conditional():
+                etag = self.comment_service.get_comments_etag(int(post_id))
+                if is_not_modified(etag):
+                    return not_modified_response(etag)
+
+            page, etag = self.comment_service.get_comments_page(int(post_id), int(parent_id), limit=limit, cursor=cursor)
+            return with_validators(jsonify(page), etag), 200
+
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
+        except Exception as e:
+            current_app.logger.error(
+                f"Error fetching replies to comment {parent_id} on post {post_id}: {e}"
+            )
+            return jsonify({"error": "Internal server error"}), 500
+
+    @jwt_required()
+    def get_thread(self, comment_id):
+        """GET /comments/thread/<comment_id>?depth="""
+        try:
+            if not is_valid_id(comment_id):
+                return jsonify({"error": "Invalid comment ID"}), 400
+
+            # Validate optional depth (levels below the comment; 0 returns the comment alone)
+            raw_depth = request.args.get("depth", None)
+            max_depth = None
+            if raw_depth is not None:
+                if not re.match(r"^\d+$", raw_depth):
+                    return jsonify({"error": "depth must be a non-negative integer"}), 400
+                max_depth = min(int(raw_depth), MAX_COMMENT_DEPTH)
+
+            thread = self.comment_service.get_thread(int(comment_id), max_depth=max_depth)
+            if thread is None:
+                return jsonify({"error": "Comment not found"}), 404
+            return jsonify({"thread": thread}), 200
+
+        except Exception as e:
+            current_app.logger.error(f"Error fetching thread of comment {comment_id}: {e}")
+            return jsonify({"error": "Internal server error"}), 500
+
+    @jwt_required()
+    def delete_comment(self, comment_id):
+        """DELETE /comments/delete/<comment_id> (removes all replies under it too)"""
+        try:
+            if not is_valid_id(comment_id):
+                return jsonify({"error": "Invalid comment ID"}), 400
+            user_id = int(get_jwt_identity())
+
+            success, message = self.comment_service.delete_comment(int(comment_id), user_id)
+            if not success:
+                status = 404 if message == COMMENT_NOT_FOUND_ERROR else 403
+                return jsonify({"error": message}), status
+
+            return jsonify({"message": message}), 200
+
+        except Exception as e:
+            current_app.logger.error(f"Error deleting comment: {e}")
+            return jsonify({"error": "Internal server error"}), 500
+
+    @jwt_required()
+    @stream_uploads(MAX_FILE_SIZE, MEDIA_STAGING_FOLDER, ALLOWED_MIME_TYPES)
     def create_comment(self, post_id):
         """POST /posts/<post_id>/comments"""
         try:
@@ -94,4 +201,9 @@ class CommentController:
         if not re.match(FILENAME_REGEX, filename):
             return jsonify({"error": "Invalid image filename"}), 400
 
-        return self.comment_service.get_comment_image(filename)
\ No newline at end of file
+        raw_width = request.args.get("w")
+        if raw_width is not None and not is_valid_image_width(raw_width):
+            return jsonify({"error": "w must be a positive integer below 10000"}), 400
+        width = int(raw_width) if raw_width is not None else None
+
+        return self.comment_service.get_comment_image(filename, width)
\ No newline at end of file
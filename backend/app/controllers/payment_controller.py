@@ -2,6 +2,7 @@ from flask import request, jsonify, current_app
 from app.interfaces.services.IPaymentService import IPaymentService
 from app.services.payment_service import PaymentService
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.utils.user_context import get_user_context
 import stripe
 import os
 
@@ -18,7 +19,7 @@ class PaymentController:
             user_id = get_jwt_identity()
             
             # Create checkout session
-            session_data, error = self.payment_service.create_checkout_session(user_id)
+            session_data, error = self.payment_service.create_checkout_session(user_id, get_user_context())
             
             if error:
                 return jsonify({"error": error}), 400
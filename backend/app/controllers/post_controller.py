@@ -3,14 +3,21 @@ from flask import request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.utils import secure_filename
 from app.interfaces.services.IPostService import IPostService
-from app.services.post_service import PostService
+from app.services.post_service import PostService, MAX_FILE_SIZE, ALLOWED_MIME_TYPES
+from app.utils.pagination import MAX_PAGE_LIMIT
+from app.utils.conditional import is_conditional, is_not_modified, not_modified_response, with_validators
+from app.services.media_service import MEDIA_STAGING_FOLDER
+from app.utils.uploads import stream_uploads
+from app.utils.validation import is_valid_image_width
+from app.utils.user_context import get_user_context
 from openai import OpenAI
 import os
 
 # --- Validation constants & regexes ---
-SORT_OPTIONS        = {"recent", "likes", "comments"}
+SORT_OPTIONS        = {"recent", "likes", "comments", "relevance"}
 INT_REGEX = r"^\d+$"  # Accepts 0 and all non-negative integers
 SEARCH_MAX_LENGTH   = 100                   # max chars for search query
+CURSOR_MAX_LENGTH   = 200                   # max chars for an opaque pagination cursor
 TITLE_MAX_LENGTH    = 100                   # max chars for post title
 CONTENT_MAX_LENGTH  = 2000                  # max chars for post content
 ALLOWED_IMAGE_EXTS  = {"png", "jpg", "jpeg", "gif"}
@@ -26,14 +33,16 @@ class PostController:
 
     @jwt_required()
     def fetch_posts(self):
-        """GET /posts?sort_by=&offset=&limit=&search=&user_id="""
+        """GET /posts?sort_by=&offset=&limit=&search=&user_id=&cursor=&preview_chars="""
         try:
             args     = request.args
             sort_by  = args.get("sort_by", "recent")
             raw_offset = args.get("offset", "0")
             raw_limit  = args.get("limit", "10")
+            cursor   = args.get("cursor") or None
             search   = args.get("search", None)
             raw_user_id = args.get("user_id", None)
+            raw_preview = args.get("preview_chars", None)
 
             # Validate sort_by
             if sort_by not in SORT_OPTIONS:
@@ -44,10 +53,14 @@ class PostController:
                 return jsonify({"error": "offset must be a non-negative integer"}), 400
             offset = int(raw_offset)
 
-            # Validate limit
-            if not re.match(INT_REGEX, raw_limit):
+            # Validate limit (capped server-side)
+            if not re.match(INT_REGEX, raw_limit) or int(raw_limit) == 0:
                 return jsonify({"error": "limit must be a positive integer"}), 400
-            limit = int(raw_limit)
+            limit = min(int(raw_limit), MAX_PAGE_LIMIT)
+
+            # Validate cursor; when present it takes precedence over offset
+            if cursor is not None and len(cursor) > CURSOR_MAX_LENGTH:
+                return jsonify({"error": "Invalid cursor"}), 400
 
             # Validate search length
             if search is not None:
@@ -55,6 +68,10 @@ class PostController:
                 if len(search) > SEARCH_MAX_LENGTH:
                     return jsonify({"error": f"search cannot exceed {SEARCH_MAX_LENGTH} characters"}), 400
 
+            # Relevance ranking only makes sense for a search
+            if sort_by == "relevance" and not search:
+                return jsonify({"error": "sort_by=relevance requires a search term"}), 400
+
             # Validate user_id if provided
             user_id = None
             if raw_user_id is not None:
@@ -62,10 +79,17 @@ class PostController:
                     return jsonify({"error": "user_id must be a positive integer"}), 400
                 user_id = int(raw_user_id)
 
+            # Validate preview length; content is never longer than CONTENT_MAX_LENGTH anyway
+            preview_chars = None
+            if raw_preview is not None:
+                if not re.match(INT_REGEX, raw_preview) or int(raw_preview) == 0:
+                    return jsonify({"error": "preview_chars must be a positive integer"}), 400
+                preview_chars = min(int(raw_preview), CONTENT_MAX_LENGTH)
+
             current_user_id = get_jwt_identity()
             current_app.logger.info(
                 f"Fetching posts: sort_by={sort_by}, offset={offset}, limit={limit}, "
-                f"search={search!r}, user_id={user_id}"
+                f"search={search!r}, user_id={user_id}, cursor={cursor!r}"
             )
 
             result = self.post_service.get_posts(
@@ -73,16 +97,17 @@ class PostController:
                 offset=offset,
                 limit=limit,
                 search=search,
-                user_id=user_id
+                user_id=user_id,
+                cursor=cursor,
+                viewer_id=current_user_id,
+                preview_chars=preview_chars
             )
 
-            # Fetch liked posts
-            post_ids = [post["post_id"] for post in result.get("posts", [])]
-            liked = self.post_service.get_user_liked_posts(current_user_id, post_ids)
-            result["liked_post_ids"] = liked
-
+            # Each post carries "liked" and the page carries liked_post_ids for the viewer
             return jsonify(result), 200
 
+        except ValueError as ve:
+            return jsonify({"error": str(ve)}), 400
         except Exception as e:
             current_app.logger.error(f"Error getting posts: {e}")
             return jsonify({"error": INTERNAL_SERVER_ERROR}), 500
@@ -134,17 +159,28 @@ class PostController:
             pid = int(post_id)
             user_id = get_jwt_identity()
 
+            # Answer revalidations from a cheap version probe before loading the post
+            if is_conditional():
+                etag = self.post_service.get_post_etag(pid, user_id)
+                if etag is None:
+                    return jsonify({"error": POST_NOT_FOUND_ERROR}), 404
+                if is_not_modified(etag):
+                    return not_modified_response(etag)
+
             detail = self.post_service.get_post_detail(pid, user_id)
             if not detail:
                 return jsonify({"error": POST_NOT_FOUND_ERROR}), 404
 
-            return jsonify(detail), 200
+            # The loaded detail carries every field of the tag
+            etag = self.post_service.get_detail_etag(detail)
+            return with_validators(jsonify(detail), etag), 200
 
         except Exception as e:
             current_app.logger.error(f"Error fetching post detail: {e}")
             return jsonify({"error": INTERNAL_SERVER_ERROR}), 500
 
     @jwt_required()
+    @stream_uploads(MAX_FILE_SIZE, MEDIA_STAGING_FOLDER, ALLOWED_MIME_TYPES)
     def create_post(self):
         """POST /posts (form-data: title, content, optional image)"""
         try:
@@ -212,6 +248,7 @@ class PostController:
             return jsonify({"error": INTERNAL_SERVER_ERROR}), 500
 
     @jwt_required()
+    @stream_uploads(MAX_FILE_SIZE, MEDIA_STAGING_FOLDER, ALLOWED_MIME_TYPES)
     def edit_post(self, post_id):
         """PUT /posts/<post_id> (form-data: title, content, optional image)"""
         try:
@@ -260,11 +297,16 @@ class PostController:
             return jsonify({"error": INTERNAL_SERVER_ERROR}), 500
 
     def get_post_image(self, filename):
-        """GET /posts/images/<filename>"""
+        """GET /posts/post_uploads/<filename>?w= (w picks the narrowest resized copy at least that wide)"""
         if not re.match(FILENAME_REGEX, filename):
             return jsonify({"error": "Invalid image filename"}), 400
 
-        return self.post_service.get_post_image(filename)
+        raw_width = request.args.get("w")
+        if raw_width is not None and not is_valid_image_width(raw_width):
+            return jsonify({"error": "w must be a positive integer below 10000"}), 400
+        width = int(raw_width) if raw_width is not None else None
+
+        return self.post_service.get_post_image(filename, width)
     
     @jwt_required()
     def summarize_post(self, post_id):
@@ -315,7 +357,10 @@ class PostController:
             user_id = int(get_jwt_identity())
             # If unlimited, just return success with no limit info
             post_service = PostService()
-            has_reached_limit = post_service.has_reached_daily_post_limit(user_id)
+            context = get_user_context()
+            has_reached_limit = post_service.has_reached_daily_post_limit(
+                user_id, context.membership if context else None
+            )
 
             return jsonify({
                 "has_reached_limit": has_reached_limit
@@ -3,7 +3,11 @@ from flask import request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.utils import secure_filename
 from app.interfaces.services.IProfileService import IProfileService
-from app.services.profile_service import ProfileService
+from app.services.profile_service import ProfileService, MAX_FILE_SIZE, ALLOWED_MIME_TYPES
+from app.services.media_service import MEDIA_STAGING_FOLDER
+from app.utils.uploads import stream_uploads
+from app.utils.validation import is_valid_image_width
+from app.workers import PasswordHasherBusy, BUSY_MESSAGE, BUSY_RETRY_AFTER
 
 # --- Validation constants & regexes ---
 SORT_OPTIONS     = {"recent", "oldest", "popular"}
@@ -94,11 +98,16 @@ class ProfileController:
                 "message": "Profile updated successfully"
             }), 200
 
+        except PasswordHasherBusy as e:
+            current_app.logger.warning(f"Rejected profile update, password hashing is saturated: {e}")
+            return jsonify({"error": BUSY_MESSAGE}), 503, {"Retry-After": str(BUSY_RETRY_AFTER)}
+
         except Exception as e:
             current_app.logger.error(f"Error in update_profile: {e}")
             return jsonify({"error": "Failed to update profile"}), 500
 
     @jwt_required()
+    @stream_uploads(MAX_FILE_SIZE, MEDIA_STAGING_FOLDER, ALLOWED_MIME_TYPES)
     def update_profile_picture(self):
         """Handle POST request for uploading profile picture with validation."""
         try:
@@ -137,8 +146,13 @@ class ProfileController:
         if not re.match(FILENAME_REGEX, filename):
             return jsonify({"error": "Invalid image filename"}), 400
 
+        raw_width = request.args.get("w")
+        if raw_width is not None and not is_valid_image_width(raw_width):
+            return jsonify({"error": "w must be a positive integer below 10000"}), 400
+        width = int(raw_width) if raw_width is not None else None
+
         # Assuming your service returns the directory path and you want to serve directly:
-        return self.profile_service.get_profile_image(filename)
+        return self.profile_service.get_profile_image(filename, width)
         
     @jwt_required()
     def delete_profile(self):
@@ -1,6 +1,10 @@
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask import request
+from app.cache import FeedCache, LikedSetCache, TokenVersionCache
+from app.buffers import LikeWriteBuffer
+from app.workers import VariantWorker, PasswordHasher, EmailSender
+from app.ratelimit import SharedMemoryStorage  # noqa: F401 (registers sharedmem:// for RATELIMIT_STORAGE_URI)
 
 # Define a custom key function that exempts OPTIONS requests
 def limiter_key_func():
@@ -8,9 +12,30 @@ def limiter_key_func():
         return None
     return get_remote_address()
 
-# Initialize limiter without attaching to an app yet
+# Initialize limiter without attaching to an app yet; storage and strategy come from
+# RATELIMIT_STORAGE_URI and RATELIMIT_STRATEGY
 limiter = Limiter(
     key_func=limiter_key_func,
-    default_limits=[],
-    strategy="fixed-window"
-)
\ No newline at end of file
+    default_limits=[]
+)
+
+# Feed response cache, configured in create_app
+feed_cache = FeedCache()
+
+# Per-user liked post ids for feed overlays, configured in create_app
+liked_set_cache = LikedSetCache()
+
+# Latest token_version of users whose access token claims changed, configured in create_app
+token_versions = TokenVersionCache()
+
+# Optional write-behind buffer for like toggles, configured in create_app
+like_buffer = LikeWriteBuffer(feed_cache=feed_cache)
+
+# Background generation of resized image variants, configured in create_app
+variant_worker = VariantWorker()
+
+# Password hashing in a process pool, configured in create_app
+password_hasher = PasswordHasher()
+
+# Delivery of queued emails from the outbox, configured in create_app
+email_sender = EmailSender()
@@ -0,0 +1,77 @@
+import time
+from flask import g, request, has_request_context, current_app
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Longest statement text kept for the slow query log
+STATEMENT_LOG_LENGTH = 300
+
+class RequestQueryStats:
+    """SQL statements issued while handling one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_statement = None
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms >= self.slowest_ms:
+            self.slowest_ms = elapsed_ms
+            self.slowest_statement = statement
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Stored on the per-statement execution context so failed statements leave nothing behind
+    context._query_started_at = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_query_started_at', None)
+    if started is not None and has_request_context() and 'query_stats' in g:
+        g.query_stats.record(statement, (time.perf_counter() - started) * 1000)
+
+def init_query_instrumentation(app) -> None:
+    """Count SQL statements and database time per request.
+
+    Totals are logged for every request, exposed in a Server-Timing header when
+    SQL_SERVER_TIMING is on, and a warning is logged when a request issues more than
+    SQL_QUERY_WARN_THRESHOLD statements (a typical N+1 symptom).
+    """
+    if not app.config.get('SQL_INSTRUMENTATION_ENABLED', True):
+        return
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.before_request
+    def start_query_stats():
+        g.query_stats = RequestQueryStats()
+
+    @app.after_request
+    def report_query_stats(response):
+        stats = g.pop('query_stats', None)
+        if stats is None:
+            return response
+
+        if current_app.config.get('SQL_SERVER_TIMING', True):
+            response.headers.add(
+                'Server-Timing',
+                f'db;dur={stats.total_ms:.2f};desc="{stats.count} queries", db-slowest;dur={stats.slowest_ms:.2f}'
+            )
+
+        current_app.logger.info(
+            f"request_sql method={request.method} path={request.path} status={response.status_code} "
+            f"queries={stats.count} db_ms={stats.total_ms:.2f} slowest_ms={stats.slowest_ms:.2f}"
+        )
+
+        threshold = current_app.config.get('SQL_QUERY_WARN_THRESHOLD', 10)
+        if threshold and stats.count > threshold:
+            slowest = (stats.slowest_statement or '')[:STATEMENT_LOG_LENGTH]
+            current_app.logger.warning(
+                f"request_sql_threshold method={request.method} path={request.path} "
+                f"queries={stats.count} threshold={threshold} slowest_ms={stats.slowest_ms:.2f} "
+                f"slowest_sql={' '.join(slowest.split())!r}"
+            )
+        return response
@@ -1,5 +1,6 @@
 from abc import abstractmethod
-from typing import List, Optional
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
 from app.interfaces.repositories.IBaseRepository import IBaseRepository
 from app.models.comments import Comment
 
@@ -7,10 +8,25 @@ class ICommentRepository(IBaseRepository[Comment]):
     """Interface for comment repository operations"""
     
     @abstractmethod
-    def get_by_post_id(self, post_id: int) -> List[Comment]:
-        """Get all comments for a specific post"""
+    def get_page(self, post_id: int, parent_id: Optional[int] = None, limit: int = 20, cursor: Optional[Tuple[datetime, int]] = None) -> List[Any]:
+        """Get one keyset page of a post's top-level comments, or of the direct replies of parent_id"""
+        pass
+    
+    @abstractmethod
+    def get_subtree(self, comment_id: int, max_depth: Optional[int] = None) -> List[Any]:
+        """Get a comment and its descendants in thread order, optionally limited in depth"""
+        pass
+    
+    @abstractmethod
+    def get_thread_version(self, post_id: int) -> Any:
+        """Get the comment count and newest comment id stored on a post, or None"""
         pass
     
     @abstractmethod
     def create_comment(self, comment: Comment) -> Comment:
-        pass
\ No newline at end of file
+        pass
+    
+    @abstractmethod
+    def delete_subtree(self, comment_id: int) -> Optional[Tuple[int, List[str]]]:
+        """Delete a comment and all its replies; returns (deleted count, image paths) or None"""
+        pass
@@ -0,0 +1,44 @@
+from abc import abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from app.interfaces.repositories.IBaseRepository import IBaseRepository
+from app.models.email_outbox import EmailOutbox
+
+class IEmailOutboxRepository(IBaseRepository[EmailOutbox]):
+    """Interface for the transactional email outbox"""
+
+    @abstractmethod
+    def add(self, recipient: str, subject: str, body: str) -> EmailOutbox:
+        """Stage an email in the current transaction without committing"""
+        pass
+
+    @abstractmethod
+    def enqueue(self, recipient: str, subject: str, body: str) -> EmailOutbox:
+        """Queue an email and commit"""
+        pass
+
+    @abstractmethod
+    def claim_due(self, limit: int, lease_seconds: int) -> List[Any]:
+        """Lease due emails to the calling sender"""
+        pass
+
+    @abstractmethod
+    def mark_sent(self, email_ids: List[int]) -> None:
+        """Record emails as delivered to the mail server"""
+        pass
+
+    @abstractmethod
+    def mark_failed(self, email_id: int, error: str, retry_at: Optional[datetime] = None,
+                    attempted: bool = True) -> None:
+        """Record a failed attempt, to be retried at retry_at or given up on; attempted=False refunds the claimed attempt"""
+        pass
+
+    @abstractmethod
+    def count_by_status(self) -> Dict[str, int]:
+        """Number of emails per status"""
+        pass
+
+    @abstractmethod
+    def purge(self, before: datetime) -> int:
+        """Delete finished emails created before the given time"""
+        pass
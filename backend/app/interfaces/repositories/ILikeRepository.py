@@ -1,5 +1,5 @@
 from abc import abstractmethod
-from typing import Optional, List
+from typing import Dict, Optional, List, Tuple
 from app.interfaces.repositories.IBaseRepository import IBaseRepository
 from app.models.likes import Like
 
@@ -16,6 +16,21 @@ class ILikeRepository(IBaseRepository[Like]):
         """Get IDs of posts liked by a specific user"""
         pass
 
+    @abstractmethod
+    def toggle(self, user_id: int, post_id: int) -> Optional[Tuple[bool, int]]:
+        """Atomically like or unlike a post and return (liked, new like count), or None if the post is missing"""
+        pass
+
+    @abstractmethod
+    def get_like_state(self, user_id: int, post_id: int) -> Optional[Tuple[bool, int]]:
+        """Get (liked, like count) for a user and post, or None if the post is missing"""
+        pass
+
+    @abstractmethod
+    def apply_like_states(self, states: Dict[Tuple[int, int], bool]) -> List[int]:
+        """Apply final liked states in bulk and return the touched post ids"""
+        pass
+
     @abstractmethod
     def count_likes_for_post(self, post_id: int) -> int:
         """Count likes for a specific post"""
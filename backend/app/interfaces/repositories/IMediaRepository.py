@@ -0,0 +1,32 @@
+from abc import abstractmethod
+from typing import Any, Callable, Dict, List, Optional
+from app.interfaces.repositories.IBaseRepository import IBaseRepository
+from app.models.media import Media
+
+class IMediaRepository(IBaseRepository[Media]):
+    """Interface for content-addressed media operations"""
+
+    @abstractmethod
+    def acquire(self, sha256: str, ext: str, mime_type: str, size: int, place: Callable[[bool], None]) -> int:
+        """Add a reference to a file, creating its row if needed, and return the new ref_count"""
+        pass
+
+    @abstractmethod
+    def release(self, sha256: str, remove: Callable[[], None]) -> Optional[int]:
+        """Drop a reference to a file and return the remaining ref_count, or None if the file is unknown"""
+        pass
+
+    @abstractmethod
+    def get_variants(self, sha256s: List[str], format: Optional[str] = None) -> List[Any]:
+        """Get the recorded variants of the given files"""
+        pass
+
+    @abstractmethod
+    def add_variants(self, sha256: str, variants: List[Dict[str, Any]]) -> bool:
+        """Record generated variants of a file; False if the file no longer exists"""
+        pass
+
+    @abstractmethod
+    def get_names_after(self, last_sha256: Optional[str], limit: int) -> List[str]:
+        """Get a batch of media names in hash order"""
+        pass
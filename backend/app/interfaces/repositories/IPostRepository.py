@@ -1,5 +1,5 @@
 from abc import abstractmethod
-from typing import List, Optional
+from typing import Any, List, Optional, Tuple
 from app.interfaces.repositories.IBaseRepository import IBaseRepository
 from app.models.posts import Post
 
@@ -7,12 +7,17 @@ class IPostRepository(IBaseRepository[Post]):
     """Interface for post repository operations"""
     
     @abstractmethod
-    def get_posts(self, sort_by: str = 'recent', limit: int = 10, offset: int = 0, search: Optional[str] = None, user_id: Optional[int] = None) -> List[Post]:
-        """Get posts with filtering, sorting and pagination"""
+    def get_posts(self, sort_by: str = 'recent', limit: int = 10, offset: int = 0, search: Optional[str] = None, user_id: Optional[int] = None, cursor: Optional[Tuple[Any, int]] = None, viewer_id: Optional[int] = None, preview_chars: Optional[int] = None) -> List[Any]:
+        """Get lightweight post rows with filtering, sorting and pagination"""
         pass
     
     @abstractmethod
-    def get_post_by_id(self, post_id: int) -> Optional[Post]:
+    def get_post_by_id(self, post_id: int, viewer_id: Optional[int] = None) -> Optional[Post]:
+        pass
+    
+    @abstractmethod
+    def get_post_version(self, post_id: int, viewer_id: Optional[int] = None) -> Optional[Any]:
+        """Get the fields a post detail's cache validators depend on"""
         pass
     
     @abstractmethod
@@ -24,7 +29,27 @@ class IPostRepository(IBaseRepository[Post]):
         """Update the post's content and optionally the image"""
         pass
 
+    @abstractmethod
+    def get_media_references(self, post_id: int) -> List[str]:
+        """Get the stored image paths of a post and its comments"""
+        pass
+
     @abstractmethod
     def count_user_posts_today(self, user_id: int) -> int:
         """Retrieve count of posts made by user today"""
+        pass
+
+    @abstractmethod
+    def adjust_counters(self, post_id: int, likes_delta: int = 0, comments_delta: int = 0, last_comment_id: Optional[int] = None) -> None:
+        """Stage an increment of the post's like/comment counters in the current transaction"""
+        pass
+
+    @abstractmethod
+    def recount_likes(self, post_ids: List[int]) -> None:
+        """Recompute likes_count for the given posts in the current transaction"""
+        pass
+    
+    @abstractmethod
+    def reconcile_counters(self, only_drifted: bool = True, batch_size: int = 1000) -> int:
+        """Recompute like/comment counters from the source tables"""
         pass
\ No newline at end of file
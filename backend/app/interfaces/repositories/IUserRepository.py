@@ -1,16 +1,27 @@
 from abc import abstractmethod
-from typing import Optional
+from typing import Any, Callable, Dict, List, Optional, Set
 from app.interfaces.repositories.IBaseRepository import IBaseRepository
 from app.models.users import User
 
 class IUserRepository(IBaseRepository[User]):
     """Interface for user repository operations"""
     
+    @abstractmethod
+    def create_with_email(self, data: Dict[str, Any], compose: Callable[[User], Dict[str, str]]) -> User:
+        """Create a user and queue an email to them in one transaction"""
+        pass
+
     @abstractmethod
     def get_by_email(self, email: str) -> Optional[User]:
         """Get user by email"""
         pass
 
+    @abstractmethod
+    def find_conflicts(self, username: Optional[str] = None, email: Optional[str] = None,
+                       exclude_user_id: Optional[int] = None) -> Set[str]:
+        """Which of username and email already belong to another user, in one query"""
+        pass
+
     @abstractmethod
     def check_email_exists(self, email: str) -> bool:
         """Check if email already exists"""
@@ -34,4 +45,9 @@ class IUserRepository(IBaseRepository[User]):
     @abstractmethod
     def get_by_id(self, user_id: int) -> Optional[User]:
         """Get user by ID"""
-        pass
\ No newline at end of file
+        pass
+
+    @abstractmethod
+    def get_media_references(self, user_id: int) -> List[str]:
+        """Get the stored image paths of the user's profile, posts and comments"""
+        pass
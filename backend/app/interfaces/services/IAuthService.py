@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 from typing import Dict, Tuple, Any, Optional
 from app.models.users import User
+from app.utils.user_context import UserContext
 
 class IAuthService(ABC):
     """Interface for authentication service operations"""
@@ -11,8 +12,8 @@ class IAuthService(ABC):
         pass
     
     @abstractmethod
-    def create_user(self, data: Dict[str, Any]) -> User:
-        """Create a new user"""
+    def create_user(self, data: Dict[str, Any]) -> Tuple[Optional[User], Optional[str]]:
+        """Create a new user and queue their verification email"""
         pass
     
     @abstractmethod
@@ -21,18 +22,23 @@ class IAuthService(ABC):
         pass
     
     @abstractmethod
-    def generate_tokens(self, user_id: int, totp_verified: bool = False) -> Dict[str, str]:
+    def generate_tokens(self, user: User) -> Dict[str, str]:
         """Generate access and refresh tokens"""
         pass
     
     @abstractmethod
-    def refresh_access_token(self, user_id: int) -> Dict[str, str]:
+    def issue_access_token(self, context: UserContext) -> Dict[str, str]:
+        """Generate a new access token carrying the given user context"""
+        pass
+    
+    @abstractmethod
+    def refresh_access_token(self, user_id: int) -> Optional[Dict[str, str]]:
         """Generate a new access token using a refresh token"""
         pass
 
     @abstractmethod
     def send_verification_email(self, user: User) ->  None:
-        """Send verification email to the user"""
+        """Queue a verification email to the user"""
         pass
 
     @abstractmethod
@@ -1,11 +1,32 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from app.models.comments import Comment
 
 class ICommentService(ABC):
     
     @abstractmethod
-    def get_comments_by_post(self, post_id: int) -> List[Dict[str, Any]]:
+    def get_comments_by_post(self, post_id: int, limit: int = 20, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Get one cursor page of a post's top-level comments"""
+        pass
+    
+    @abstractmethod
+    def get_replies(self, post_id: int, parent_id: int, limit: int = 20, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Get one cursor page of the direct replies of a comment"""
+        pass
+    
+    @abstractmethod
+    def get_comments_page(self, post_id: int, parent_id: Optional[int] = None, limit: int = 20, cursor: Optional[str] = None) -> Tuple[Dict[str, Any], str]:
+        """Get one cursor page of comments with the ETag of the post's comment lists"""
+        pass
+    
+    @abstractmethod
+    def get_thread(self, comment_id: int, max_depth: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Get a comment with its replies nested, optionally limited in depth"""
+        pass
+    
+    @abstractmethod
+    def get_comments_etag(self, post_id: int) -> str:
+        """Get the ETag of a post's comment lists without loading them"""
         pass
     
     @abstractmethod
@@ -13,6 +34,11 @@ class ICommentService(ABC):
         pass
 
     @abstractmethod
-    def get_comment_image(self, filename: str) -> Any:
+    def delete_comment(self, comment_id: int, user_id: int) -> Tuple[bool, str]:
+        """Delete a comment and its replies if the user wrote it"""
+        pass
+
+    @abstractmethod
+    def get_comment_image(self, filename: str, width: Optional[int] = None) -> Any:
         """Serve comment image by filename"""
         pass
\ No newline at end of file
@@ -0,0 +1,34 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional
+
+class IMediaService(ABC):
+
+    @abstractmethod
+    def store(self, file, max_bytes: int, allowed_mimes) -> str:
+        """Validate an uploaded file, add a reference to its content and return its media name"""
+        pass
+
+    @abstractmethod
+    def release(self, stored: Optional[str]) -> bool:
+        """Drop the reference held by a stored image path; False if it is not a media name"""
+        pass
+
+    @abstractmethod
+    def release_all(self, stored: Iterable[Optional[str]]) -> None:
+        """Drop the references held by several stored image paths"""
+        pass
+
+    @abstractmethod
+    def generate_variants(self, stored: Optional[str]) -> None:
+        """Queue generation of the resized variants of a stored image"""
+        pass
+
+    @abstractmethod
+    def get_variants(self, stored: Iterable[Optional[str]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Get the variant URLs and dimensions of several stored image paths"""
+        pass
+
+    @abstractmethod
+    def send(self, filename: str, legacy_folder: str, width: Optional[int] = None):
+        """Serve a media name (or its variant closest to width) from the store, or an older upload from its legacy folder"""
+        pass
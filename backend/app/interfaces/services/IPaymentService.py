@@ -1,11 +1,12 @@
 from abc import ABC, abstractmethod
 from typing import Dict, Tuple, Any, Optional
+from app.utils.user_context import UserContext
 
 class IPaymentService(ABC):
     """Interface for payment service operations"""
     
     @abstractmethod
-    def create_checkout_session(self, user_id: int) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    def create_checkout_session(self, user_id: int, context: Optional[UserContext] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
         """Create a new checkout session"""
         pass
     
@@ -11,8 +11,8 @@ class IPostService(ABC):
         pass
 
     @abstractmethod
-    def get_posts(self, sort_by: str = 'recent', offset: int = 0, limit: int = 10, search: Optional[str] = None, user_id: Optional[int] = None) -> Dict[str, Any]:
-        """Get posts with pagination, filtering and sorting"""
+    def get_posts(self, sort_by: str = 'recent', offset: int = 0, limit: int = 10, search: Optional[str] = None, user_id: Optional[int] = None, cursor: Optional[str] = None, viewer_id: Optional[int] = None, preview_chars: Optional[int] = None) -> Any:
+        """Get an encoded page of posts with pagination, filtering and sorting"""
         pass
     
     @abstractmethod
@@ -34,6 +34,16 @@ class IPostService(ABC):
     def get_post_detail(self, post_id: int, current_user_id: int) -> Optional[Dict[str, Any]]:
         pass
 
+    @abstractmethod
+    def get_post_etag(self, post_id: int, current_user_id: int) -> Optional[str]:
+        """Get the ETag of a post detail without loading the post"""
+        pass
+
+    @abstractmethod
+    def get_detail_etag(self, detail: Dict[str, Any]) -> str:
+        """Get the ETag of a post detail that is already loaded"""
+        pass
+
     @abstractmethod
     def create_post(self, title: str, content: str, image_file, user_id: int) -> Post:
         pass
@@ -44,11 +54,11 @@ class IPostService(ABC):
         pass
 
     @abstractmethod
-    def get_post_image(self, filename: str) -> Any:
+    def get_post_image(self, filename: str, width: Optional[int] = None) -> Any:
         """Serve post image by filename"""
         pass
 
     @abstractmethod
-    def has_reached_daily_post_limit(self, user_id: int) -> bool:
+    def has_reached_daily_post_limit(self, user_id: int, membership: Optional[str] = None) -> bool:
         """Check if user has reached the daily post limit."""
         pass
\ No newline at end of file
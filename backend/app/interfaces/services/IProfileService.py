@@ -20,7 +20,7 @@ class IProfileService(ABC):
         pass
 
     @abstractmethod
-    def get_profile_image(self, filename: str) -> Any:
+    def get_profile_image(self, filename: str, width: Optional[int] = None) -> Any:
         """Serve the user's profile picture by filename"""
         pass
 
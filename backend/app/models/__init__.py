@@ -2,3 +2,5 @@ from .users import User
 from .posts import Post
 from .comments import Comment
 from .likes import Like
+from .media import Media, MediaVariant
+from .email_outbox import EmailOutbox
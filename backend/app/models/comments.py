@@ -1,5 +1,15 @@
 from app.db import db
 
+# Materialized path: the zero-padded hex id of every ancestor and of the comment itself,
+# each followed by '/', so a subtree is a path prefix and ORDER BY path is thread order
+PATH_SEGMENT_LENGTH = 9
+PATH_MAX_LENGTH = 255
+# Deepest depth (0 = top level) whose path still fits; deeper replies become siblings of their parent
+MAX_COMMENT_DEPTH = PATH_MAX_LENGTH // PATH_SEGMENT_LENGTH - 1
+
+def path_segment(comment_id: int) -> str:
+    return f"{comment_id:08x}/"
+
 class Comment(db.Model):
     __tablename__ = 'comments'
 
@@ -10,11 +20,22 @@ class Comment(db.Model):
     content = db.Column(db.Text, nullable=False)
     image = db.Column(db.String(255), nullable=True)
     created_at = db.Column(db.DateTime, server_default=db.func.current_timestamp())
+    path = db.Column(db.String(PATH_MAX_LENGTH), nullable=False, default='')
+    depth = db.Column(db.SmallInteger, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        # Comments are paged per post and parent (NULL for top level) in creation order
+        db.Index('ix_comments_post_id_parent_id_created_at', 'post_id', 'parent_id', 'created_at', 'comment_id'),
+        # Subtree reads and deletes are prefix ranges on path within a post
+        db.Index('ix_comments_post_id_path', 'post_id', 'path'),
+    )
     
-    # Relationships
+    # Relationships; subtrees are removed by the database (ON DELETE CASCADE) or by path,
+    # never by loading the replies into the session
     replies = db.relationship(
         'Comment', 
         backref=db.backref('parent', remote_side=[comment_id]),
         lazy=True, 
-        cascade="all, delete-orphan"
-    )
\ No newline at end of file
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
@@ -0,0 +1,24 @@
+from app.db import db
+
+class EmailOutbox(db.Model):
+    """An email waiting to be sent, written in the same transaction as the change that caused it.
+
+    The sender claims due rows by pushing next_attempt_at forward (a lease), so a message whose
+    sender died becomes due again. Rows are kept with status 'sent' or 'failed' until purged.
+    """
+    __tablename__ = 'email_outbox'
+    __table_args__ = (
+        db.Index('ix_email_outbox_due', 'status', 'next_attempt_at'),
+    )
+
+    email_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    recipient = db.Column(db.String(255), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(16), nullable=False, default='pending', server_default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Naive UTC, compared with the sender's clock
+    next_attempt_at = db.Column(db.DateTime, nullable=False)
+    last_error = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, server_default=db.func.current_timestamp())
+    sent_at = db.Column(db.DateTime, nullable=True)
@@ -8,7 +8,8 @@ class Like(db.Model):
     post_id = db.Column(db.Integer, db.ForeignKey('posts.post_id', ondelete='CASCADE'), nullable=False)
     created_at = db.Column(db.DateTime, server_default=db.func.current_timestamp())
     
-    # Add unique constraint for user-post combination
+    # Add unique constraint for user-post combination; its (user_id, post_id) index
+    # also serves lookups of the posts a user has liked
     __table_args__ = (
         db.UniqueConstraint('user_id', 'post_id', name='user_post_uc'),
     )
\ No newline at end of file
@@ -0,0 +1,26 @@
+from app.db import db
+
+class Media(db.Model):
+    """A stored file, keyed by the SHA-256 of its content.
+
+    Posts, comments and users reference the file by name (<sha256>.<ext>); ref_count is the
+    number of those references, and the file is removed when it drops to zero.
+    """
+    __tablename__ = 'media'
+
+    sha256 = db.Column(db.String(64), primary_key=True)
+    ext = db.Column(db.String(8), nullable=False)
+    mime_type = db.Column(db.String(64), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    created_at = db.Column(db.DateTime, server_default=db.func.current_timestamp())
+
+class MediaVariant(db.Model):
+    """A resized, re-encoded copy of a stored image, written next to it as <sha256>_<width>.<ext>"""
+    __tablename__ = 'media_variants'
+
+    sha256 = db.Column(db.String(64), db.ForeignKey('media.sha256', ondelete='CASCADE'), primary_key=True)
+    width = db.Column(db.SmallInteger, primary_key=True)
+    format = db.Column(db.String(8), primary_key=True)
+    height = db.Column(db.Integer, nullable=False)
+    size = db.Column(db.Integer, nullable=False)
@@ -11,7 +11,23 @@ class Post(db.Model):
     image = db.Column(db.String(255), nullable=True)
     created_at = db.Column(db.DateTime, server_default=db.func.current_timestamp())
     updated_at = db.Column(db.DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+
+    # Denormalized counters, maintained on write and repaired by the reconcile job
+    likes_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    comments_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Newest comment id ever added; with comments_count it versions the post's comment lists
+    last_comment_id = db.Column(db.Integer, nullable=True)
     
+    # Indexes backing the feed orderings, profile listings, daily post limit and search
+    __table_args__ = (
+        db.Index('ix_posts_updated_at_post_id', 'updated_at', 'post_id'),
+        db.Index('ix_posts_likes_count_post_id', 'likes_count', 'post_id'),
+        db.Index('ix_posts_comments_count_post_id', 'comments_count', 'post_id'),
+        db.Index('ix_posts_user_id_updated_at_post_id', 'user_id', 'updated_at', 'post_id'),
+        db.Index('ix_posts_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ft_posts_title_content', 'title', 'content', mysql_prefix='FULLTEXT'),
+    )
+
     # Relationships
     likes = db.relationship('Like', backref='post', lazy=True, cascade="all, delete-orphan")
     comments = db.relationship('Comment', backref='post', lazy=True, cascade="all, delete-orphan")
\ No newline at end of file
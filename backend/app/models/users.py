@@ -14,6 +14,8 @@ class User(db.Model):
     totp_secret = db.Column(db.String(255), nullable=True)
     email_verified = db.Column(db.Boolean, default=False)
     totp_verified = db.Column(db.Boolean, default=False)
+    # Bumped whenever a field copied into access token claims changes
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     # Relationships
     posts = db.relationship('Post', backref='author', lazy=True, cascade="all, delete-orphan")
@@ -0,0 +1,6 @@
+# Importing the storage registers the sharedmem:// scheme with the limits library
+from .shared_memory import SharedMemoryStorage
+
+__all__ = [
+    'SharedMemoryStorage',
+]
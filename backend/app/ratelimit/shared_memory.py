@@ -0,0 +1,249 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from math import floor
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from limits.storage import SlidingWindowCounterSupport, Storage
+
+MAGIC = b'LRLSHM01'
+# magic, slot count, slots per bucket, evictions
+HEADER = struct.Struct('<8sIIQ')
+HEADER_SIZE = 64
+# key hash (0 = free), expires_at, sliding window number, current count, previous window count
+SLOT = struct.Struct('<QdqII')
+
+DEFAULT_SLOTS = 65536
+DEFAULT_BUCKET_SIZE = 8
+DEFAULT_FILENAME = 'leonardo-ratelimit'
+
+Slot = Tuple[int, float, int, int, int]
+EMPTY_SLOT = SLOT.pack(0, 0.0, 0, 0, 0)
+
+def default_path() -> str:
+    directory = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(directory, DEFAULT_FILENAME)
+
+def key_hash(key: str) -> int:
+    # 0 marks a free slot
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little') or 1
+
+class SharedMemoryStorage(Storage, SlidingWindowCounterSupport):
+    """Rate limit storage in a memory-mapped file shared by every process on the machine.
+
+    Select it with RATELIMIT_STORAGE_URI=sharedmem://<path>?slots=<n>; without a path the table
+    lives in /dev/shm (or the temp directory). The file is a fixed-size hash table of
+    `slots` 32-byte slots in buckets of `bucket_size`, each bucket guarded by an fcntl record
+    lock on its own byte (plus a thread lock within the process), so gunicorn workers share
+    counters and they survive worker restarts.
+
+    Each key uses one slot. For the sliding window counter strategy a slot holds the counts of
+    the current and the previous window; for the fixed window strategy it holds one count and
+    its expiry. When every slot of a bucket is live, the one closest to expiry is evicted, which
+    can only let its key through earlier than configured; size `slots` above the number of keys
+    active within the longest limit period. Moving window limits are not supported.
+    """
+
+    STORAGE_SCHEME = ['sharedmem']
+
+    def __init__(self, uri: Optional[str] = None, wrap_exceptions: bool = False, **options):
+        parsed = urlparse(uri or 'sharedmem://')
+        query = {name: values[-1] for name, values in parse_qs(parsed.query).items()}
+        path = (parsed.netloc + parsed.path) or options.get('path') or default_path()
+        slots = int(query.get('slots', options.get('slots', DEFAULT_SLOTS)))
+        bucket_size = int(query.get('bucket_size', options.get('bucket_size', DEFAULT_BUCKET_SIZE)))
+        self.path = path
+        self._fd = None
+        self._map = None
+        self._open(path, slots, bucket_size)
+        self._thread_locks = [threading.Lock() for _ in range(min(self.buckets, 1024))]
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    def _open(self, path: str, slots: int, bucket_size: int) -> None:
+        if slots < bucket_size or slots % bucket_size:
+            raise ValueError("slots must be a positive multiple of bucket_size")
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            # The first process creates the table; the others use its size
+            fcntl.lockf(fd, fcntl.LOCK_EX)
+            try:
+                header = os.pread(fd, HEADER.size, 0)
+                if len(header) == HEADER.size and header[:len(MAGIC)] == MAGIC:
+                    _, slots, bucket_size, _ = HEADER.unpack(header)
+                else:
+                    os.ftruncate(fd, HEADER_SIZE + slots * SLOT.size)
+                    os.pwrite(fd, HEADER.pack(MAGIC, slots, bucket_size, 0), 0)
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN)
+            self._map = mmap.mmap(fd, HEADER_SIZE + slots * SLOT.size)
+        except Exception:
+            os.close(fd)
+            raise
+        self._fd = fd
+        self.slots = slots
+        self.bucket_size = bucket_size
+        self.buckets = slots // bucket_size
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    @property
+    def base_exceptions(self):
+        return (OSError, ValueError)
+
+    @property
+    def evictions(self) -> int:
+        return HEADER.unpack_from(self._map, 0)[3]
+
+    # Slot table
+
+    @contextmanager
+    def _locked(self, bucket: int):
+        with self._thread_locks[bucket % len(self._thread_locks)]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, bucket)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, bucket)
+
+    def _bucket(self, hashed: int) -> int:
+        return hashed % self.buckets
+
+    def _offsets(self, bucket: int):
+        start = HEADER_SIZE + bucket * self.bucket_size * SLOT.size
+        return range(start, start + self.bucket_size * SLOT.size, SLOT.size)
+
+    def _find(self, bucket: int, hashed: int) -> Tuple[Optional[int], Optional[Slot]]:
+        for offset in self._offsets(bucket):
+            slot = SLOT.unpack_from(self._map, offset)
+            if slot[0] == hashed:
+                return offset, slot
+        return None, None
+
+    def _claim(self, bucket: int, hashed: int, now: float) -> Tuple[int, Optional[Slot]]:
+        """Offset of the key's slot and its live contents (None for a new slot)"""
+        free = oldest = None
+        oldest_expiry = None
+        for offset in self._offsets(bucket):
+            slot = SLOT.unpack_from(self._map, offset)
+            if slot[0] == hashed:
+                return offset, slot
+            if free is None and (slot[0] == 0 or slot[1] <= now):
+                free = offset
+            if oldest_expiry is None or slot[1] < oldest_expiry:
+                oldest, oldest_expiry = offset, slot[1]
+        if free is not None:
+            return free, None
+        magic, slots, bucket_size, evictions = HEADER.unpack_from(self._map, 0)
+        HEADER.pack_into(self._map, 0, magic, slots, bucket_size, evictions + 1)
+        return oldest, None
+
+    def _live(self, hashed: int, now: float) -> Optional[Slot]:
+        bucket = self._bucket(hashed)
+        with self._locked(bucket):
+            _, slot = self._find(bucket, hashed)
+        return slot if slot is not None and slot[1] > now else None
+
+    # Fixed window
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        hashed, now = key_hash(key), time.time()
+        bucket = self._bucket(hashed)
+        with self._locked(bucket):
+            offset, slot = self._claim(bucket, hashed, now)
+            if slot is None or slot[1] <= now:
+                expires_at, count = now + expiry, amount
+            else:
+                expires_at, count = slot[1], slot[3] + amount
+            SLOT.pack_into(self._map, offset, hashed, expires_at, 0, count, 0)
+        return count
+
+    def get(self, key: str) -> int:
+        slot = self._live(key_hash(key), time.time())
+        return slot[3] if slot is not None else 0
+
+    def get_expiry(self, key: str) -> float:
+        now = time.time()
+        slot = self._live(key_hash(key), now)
+        return slot[1] if slot is not None else now
+
+    def clear(self, key: str) -> None:
+        hashed = key_hash(key)
+        bucket = self._bucket(hashed)
+        with self._locked(bucket):
+            offset, _ = self._find(bucket, hashed)
+            if offset is not None:
+                self._map[offset:offset + SLOT.size] = EMPTY_SLOT
+
+    def check(self) -> bool:
+        return self._map is not None and not self._map.closed
+
+    def reset(self) -> Optional[int]:
+        now = time.time()
+        fcntl.lockf(self._fd, fcntl.LOCK_EX)
+        try:
+            cleared = 0
+            for offset in range(HEADER_SIZE, HEADER_SIZE + self.slots * SLOT.size, SLOT.size):
+                hashed, expires_at = SLOT.unpack_from(self._map, offset)[:2]
+                if hashed and expires_at > now:
+                    cleared += 1
+            self._map[HEADER_SIZE:] = bytes(self.slots * SLOT.size)
+            return cleared
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+    # Sliding window counter
+
+    @staticmethod
+    def _window(now: float, expiry: int) -> Tuple[int, float]:
+        """Number of the current window and the elapsed fraction of it"""
+        position = now / expiry
+        window = int(position)
+        return window, position - window
+
+    @staticmethod
+    def _counts(slot: Optional[Slot], window: int) -> Tuple[int, int]:
+        """(previous, current) window counts of a slot as of window"""
+        if slot is None or slot[2] < window - 1:
+            return 0, 0
+        if slot[2] == window - 1:
+            return slot[3], 0
+        return slot[4], slot[3]
+
+    def acquire_sliding_window_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        if amount > limit:
+            return False
+        hashed, now = key_hash(key), time.time()
+        window, elapsed = self._window(now, expiry)
+        bucket = self._bucket(hashed)
+        with self._locked(bucket):
+            offset, slot = self._claim(bucket, hashed, now)
+            previous, current = self._counts(slot, window)
+            if floor(previous * (1 - elapsed) + current) + amount > limit:
+                return False
+            # The slot is needed until the current window stops counting as the previous one
+            SLOT.pack_into(self._map, offset, hashed, (window + 2) * expiry, window, current + amount, previous)
+        return True
+
+    def get_sliding_window(self, key: str, expiry: int) -> Tuple[int, float, int, float]:
+        now = time.time()
+        window, elapsed = self._window(now, expiry)
+        previous, current = self._counts(self._live(key_hash(key), now), window)
+        previous_ttl = (1 - elapsed) * expiry if previous else 0.0
+        return previous, previous_ttl, current, (1 - elapsed) * expiry + expiry
+
+    def clear_sliding_window(self, key: str, expiry: int) -> None:
+        self.clear(key)
@@ -2,10 +2,14 @@ from .user_repository import UserRepository
 from .post_repository import PostRepository
 from .like_repository import LikeRepository
 from .comment_repository import CommentRepository
+from .media_repository import MediaRepository
+from .email_outbox_repository import EmailOutboxRepository
 
 __all__ = [
     'UserRepository', 
     'PostRepository', 
     'LikeRepository', 
     'CommentRepository',
+    'MediaRepository',
+    'EmailOutboxRepository',
 ]
\ No newline at end of file
@@ -1,41 +1,188 @@
 from .base_repository import BaseRepository
-from app.models.comments import Comment
+from .post_repository import PostRepository
+from app.models.comments import Comment, MAX_COMMENT_DEPTH, PATH_SEGMENT_LENGTH, path_segment
+from app.models.posts import Post
 from app.models.users import User
 from app.interfaces.repositories.ICommentRepository import ICommentRepository
 from flask import current_app
-from typing import List
+from datetime import datetime
+from sqlalchemy import and_, delete, func, or_, select, text
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import aliased
+from typing import List, Optional, Tuple
 
 class CommentRepository(BaseRepository[Comment], ICommentRepository):
-    def __init__(self):
+    def __init__(self, post_repository: PostRepository = None):
         super().__init__(Comment)
+        self.post_repository = post_repository or PostRepository()
     
-    def get_by_post_id(self, post_id: int) -> List[Comment]:
+    def _list_columns(self) -> list:
+        """Columns comment lists serialize, with the number of direct replies of each row"""
+        reply = aliased(Comment)
+        reply_count = (
+            select(func.count(reply.comment_id))
+            .where(reply.parent_id == Comment.comment_id)
+            .correlate(Comment)
+            .scalar_subquery()
+            .label("reply_count")
+        )
+        return [
+            Comment.comment_id,
+            Comment.post_id,
+            Comment.parent_id,
+            Comment.user_id,
+            Comment.content,
+            Comment.image,
+            Comment.created_at,
+            Comment.depth,
+            User.username,
+            reply_count,
+        ]
+
+    def get_page(self, post_id: int, parent_id: Optional[int] = None, limit: int = 20, cursor: Optional[Tuple[datetime, int]] = None) -> List[Row]:
+        """One page of a post's comments in creation order.
+
+        Top-level comments are listed when parent_id is None, otherwise the direct replies of parent_id.
+        cursor is the decoded (created_at, comment_id) of the last row already seen; rows are read by
+        keyset from the (post_id, parent_id, created_at, comment_id) index. Each row carries reply_count
+        and the post's comment_count and last_comment_id (the version of its comment lists).
+        """
         try:
-            # query with join but load Comment objects
-            results = (
-                self.db.session.query(Comment, User.username)
+            query = (
+                self.db.session.query(
+                    *self._list_columns(),
+                    Post.comments_count.label("comment_count"),
+                    Post.last_comment_id
+                )
                 .join(User, Comment.user_id == User.user_id)
+                .join(Post, Post.post_id == Comment.post_id)
                 .filter(Comment.post_id == post_id)
-                .order_by(Comment.created_at.asc())
-                .all()
             )
+            if parent_id is None:
+                query = query.filter(Comment.parent_id.is_(None))
+            else:
+                query = query.filter(Comment.parent_id == parent_id)
 
-            comments = []
-            for comment, username in results:
-                comment.username = username  # dynamically attach username
-                comments.append(comment)
-            return comments
+            # Seek past the last row of the previous page
+            if cursor is not None:
+                last_created_at, last_id = cursor
+                query = query.filter(or_(
+                    Comment.created_at > last_created_at,
+                    and_(Comment.created_at == last_created_at, Comment.comment_id > last_id)
+                ))
+
+            return query.order_by(Comment.created_at.asc(), Comment.comment_id.asc()).limit(limit).all()
         except Exception as e:
-            print(f"Error getting comments with usernames: {e}")
+            current_app.logger.error(f"Error getting comments for post {post_id}, parent {parent_id}: {str(e)}")
             raise
     
+    def get_subtree(self, comment_id: int, max_depth: Optional[int] = None) -> List[Row]:
+        """A comment and its descendants in thread order (depth first, siblings oldest first).
+
+        One statement: the root is joined by primary key and its subtree is the prefix range of its
+        path on the (post_id, path) index. With max_depth, only descendants at most max_depth levels
+        below the root are returned; reply_count tells which of the deepest rows have more.
+        """
+        try:
+            root = aliased(Comment)
+            query = (
+                self.db.session.query(*self._list_columns())
+                .join(User, Comment.user_id == User.user_id)
+                .join(root, and_(
+                    root.comment_id == comment_id,
+                    Comment.post_id == root.post_id,
+                    Comment.path.startswith(root.path)
+                ))
+            )
+            if max_depth is not None:
+                query = query.filter(Comment.depth <= root.depth + max_depth)
+            return query.order_by(Comment.path.asc()).all()
+        except Exception as e:
+            current_app.logger.error(f"Error getting thread of comment {comment_id}: {str(e)}")
+            raise
+
+    def get_thread_version(self, post_id: int) -> Optional[Row]:
+        """Count and newest id of a post's comments, read from the post row (None if there is no post).
+
+        Ids are never reused, so any insert raises the newest id and any delete lowers the count.
+        """
+        try:
+            return self.db.session.query(
+                Post.comments_count.label("comment_count"),
+                Post.last_comment_id
+            ).filter(Post.post_id == post_id).first()
+        except Exception as e:
+            current_app.logger.error(f"Error getting comment version for post {post_id}: {str(e)}")
+            raise
+
     def create_comment(self, comment: Comment) -> Comment:
+        """Insert a comment and set its materialized path from its parent's, in one transaction.
+
+        Replies to a comment already at MAX_COMMENT_DEPTH are attached to that comment's parent.
+        """
         try:
+            parent = None
+            if comment.parent_id is not None:
+                parent = self.db.session.query(
+                    Comment.post_id, Comment.parent_id, Comment.path, Comment.depth
+                ).filter(Comment.comment_id == comment.parent_id).first()
+                if parent is None or parent.post_id != comment.post_id:
+                    raise ValueError("Parent comment not found")
+
+            # The path ends with the comment's own id, which is only known after the insert
+            comment.path = ''
             self.db.session.add(comment)
+            self.db.session.flush()
+
+            segment = path_segment(comment.comment_id)
+            if parent is None:
+                comment.path, comment.depth = segment, 0
+            elif parent.depth >= MAX_COMMENT_DEPTH:
+                comment.parent_id = parent.parent_id
+                comment.path = parent.path[:-PATH_SEGMENT_LENGTH] + segment
+                comment.depth = parent.depth
+            else:
+                comment.path, comment.depth = parent.path + segment, parent.depth + 1
+
+            self.post_repository.adjust_counters(comment.post_id, comments_delta=1, last_comment_id=comment.comment_id)
             self.db.session.commit()
             current_app.logger.info(f"Created comment with id {comment.comment_id}")
             return comment
         except Exception as e:
             self.db.session.rollback()
             current_app.logger.error(f"Error creating comment: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    def delete_subtree(self, comment_id: int) -> Optional[Tuple[int, List[str]]]:
+        """Delete a comment with all its replies and decrement the post's comments_count.
+
+        A fixed number of statements regardless of subtree size: nothing is loaded into the
+        session. Returns (deleted count, image paths of the deleted comments), or None when the
+        comment does not exist.
+        """
+        try:
+            root = self.db.session.query(Comment.post_id, Comment.path)\
+                .filter(Comment.comment_id == comment_id).first()
+            if root is None:
+                return None
+
+            in_subtree = and_(Comment.post_id == root.post_id, Comment.path.startswith(root.path))
+            images = [row.image for row in self.db.session.query(Comment.image)
+                      .filter(in_subtree, Comment.image.isnot(None))]
+
+            statement = delete(Comment).where(in_subtree).execution_options(synchronize_session=False)
+            if self.db.session.get_bind().dialect.name == 'mysql':
+                # Deepest rows first, so InnoDB has no parent_id cascades to follow (it stops at 15 levels)
+                statement = text(
+                    "DELETE FROM comments WHERE post_id = :post_id AND path LIKE :prefix ORDER BY depth DESC"
+                ).bindparams(post_id=root.post_id, prefix=root.path + '%')
+            deleted = self.db.session.execute(statement).rowcount
+
+            self.post_repository.adjust_counters(root.post_id, comments_delta=-deleted)
+            self.db.session.commit()
+            current_app.logger.info(f"Deleted comment {comment_id} and {deleted - 1} replies")
+            return deleted, images
+        except Exception as e:
+            self.db.session.rollback()
+            current_app.logger.error(f"Error deleting comment {comment_id}: {str(e)}")
+            raise
@@ -0,0 +1,149 @@
+from .base_repository import BaseRepository
+from app.models.email_outbox import EmailOutbox
+from app.interfaces.repositories.IEmailOutboxRepository import IEmailOutboxRepository
+from flask import current_app
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, func, select, update
+from typing import Dict, List, NamedTuple, Optional
+
+# Longest error message kept on a row
+MAX_ERROR_LENGTH = 500
+
+class ClaimedEmail(NamedTuple):
+    email_id: int
+    recipient: str
+    subject: str
+    body: str
+    attempts: int
+
+def utcnow() -> datetime:
+    """Naive UTC timestamp, the form outbox times are stored in"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+class EmailOutboxRepository(BaseRepository[EmailOutbox], IEmailOutboxRepository):
+    def __init__(self):
+        super().__init__(EmailOutbox)
+
+    def add(self, recipient: str, subject: str, body: str) -> EmailOutbox:
+        """Stage an email in the current transaction; the caller owns the commit.
+
+        The message is only sent if the change it belongs to is committed with it.
+        """
+        email = EmailOutbox(recipient=recipient, subject=subject, body=body, next_attempt_at=utcnow())
+        self.db.session.add(email)
+        return email
+
+    def enqueue(self, recipient: str, subject: str, body: str) -> EmailOutbox:
+        """Queue an email on its own"""
+        try:
+            email = self.add(recipient, subject, body)
+            self.db.session.commit()
+            return email
+        except Exception as e:
+            self.db.session.rollback()
+            current_app.logger.error(f"Error queueing email to {recipient}: {str(e)}")
+            raise
+
+    def claim_due(self, limit: int, lease_seconds: int) -> List[ClaimedEmail]:
+        """Lease up to limit due emails to the calling sender, oldest first.
+
+        Rows locked by another sender are skipped (FOR UPDATE SKIP LOCKED on MySQL). Claimed rows
+        have their attempt counted and become due again after lease_seconds, so an email whose
+        sender died is picked up by the next one. Returned emails carry the updated attempts.
+        """
+        try:
+            now = utcnow()
+            rows = self.db.session.execute(
+                select(EmailOutbox.email_id, EmailOutbox.recipient, EmailOutbox.subject,
+                       EmailOutbox.body, EmailOutbox.attempts)
+                .where(EmailOutbox.status == 'pending', EmailOutbox.next_attempt_at <= now)
+                .order_by(EmailOutbox.next_attempt_at, EmailOutbox.email_id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+            ).all()
+            claimed = [ClaimedEmail(row.email_id, row.recipient, row.subject, row.body, row.attempts + 1) for row in rows]
+            if not claimed:
+                self.db.session.commit()
+                return []
+
+            self.db.session.execute(
+                update(EmailOutbox)
+                .where(EmailOutbox.email_id.in_([email.email_id for email in claimed]))
+                .values(attempts=EmailOutbox.attempts + 1,
+                        next_attempt_at=now + timedelta(seconds=lease_seconds))
+                .execution_options(synchronize_session=False)
+            )
+            self.db.session.commit()
+            return claimed
+        except Exception as e:
+            self.db.session.rollback()
+            current_app.logger.error(f"Error claiming outbox emails: {str(e)}")
+            raise
+
+    def mark_sent(self, email_ids: List[int]) -> None:
+        if not email_ids:
+            return
+        try:
+            self.db.session.execute(
+                update(EmailOutbox)
+                .where(EmailOutbox.email_id.in_(email_ids))
+                .values(status='sent', sent_at=utcnow(), last_error=None)
+                .execution_options(synchronize_session=False)
+            )
+            self.db.session.commit()
+        except Exception as e:
+            self.db.session.rollback()
+            current_app.logger.error(f"Error marking outbox emails {email_ids} sent: {str(e)}")
+            raise
+
+    def mark_failed(self, email_id: int, error: str, retry_at: Optional[datetime] = None,
+                    attempted: bool = True) -> None:
+        """Record a failed attempt: retried at retry_at, or given up on when it is None.
+
+        attempted=False is for a claimed email that was never handed to the mail server; the
+        attempt claim_due counted for it is taken back.
+        """
+        try:
+            values = {"last_error": error[:MAX_ERROR_LENGTH]}
+            if not attempted:
+                values["attempts"] = EmailOutbox.attempts - 1
+            if retry_at is None:
+                values["status"] = 'failed'
+            else:
+                values["next_attempt_at"] = retry_at
+            self.db.session.execute(
+                update(EmailOutbox)
+                .where(EmailOutbox.email_id == email_id)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            self.db.session.commit()
+        except Exception as e:
+            self.db.session.rollback()
+            current_app.logger.error(f"Error recording failure of outbox email {email_id}: {str(e)}")
+            raise
+
+    def count_by_status(self) -> Dict[str, int]:
+        try:
+            rows = self.db.session.execute(
+                select(EmailOutbox.status, func.count(EmailOutbox.email_id)).group_by(EmailOutbox.status)
+            ).all()
+            return {status: count for status, count in rows}
+        except Exception as e:
+            current_app.logger.error(f"Error counting outbox emails: {str(e)}")
+            raise
+
+    def purge(self, before: datetime) -> int:
+        """Delete sent and failed emails created before the given time; returns the number deleted"""
+        try:
+            deleted = self.db.session.execute(
+                delete(EmailOutbox)
+                .where(EmailOutbox.status.in_(('sent', 'failed')), EmailOutbox.created_at < before)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            self.db.session.commit()
+            return deleted
+        except Exception as e:
+            self.db.session.rollback()
+            current_app.logger.error(f"Error purging outbox emails: {str(e)}")
+            raise
@@ -1,12 +1,24 @@
 from .base_repository import BaseRepository
+from .post_repository import PostRepository
 from app.models.likes import Like
+from app.models.posts import Post
 from app.interfaces.repositories.ILikeRepository import ILikeRepository
 from flask import current_app
-from typing import Optional, List
+from sqlalchemy import select, insert, delete, exists, tuple_
+from sqlalchemy.exc import OperationalError
+from typing import Dict, Optional, List, Tuple
+
+# MySQL error code for "Deadlock found when trying to get lock"
+MYSQL_DEADLOCK = 1213
+DEADLOCK_RETRIES = 3
+
+# Rows per statement when applying buffered like states
+APPLY_BATCH_SIZE = 1000
 
 class LikeRepository(BaseRepository[Like], ILikeRepository):
-    def __init__(self):
+    def __init__(self, post_repository: PostRepository = None):
         super().__init__(Like)
+        self.post_repository = post_repository or PostRepository()
     
     def get_by_user_and_post(self, user_id: int, post_id: int) -> Optional[Like]:
         """Get like by user_id and post_id"""
@@ -19,19 +31,105 @@ class LikeRepository(BaseRepository[Like], ILikeRepository):
     def get_user_liked_post_ids(self, user_id: int, post_ids: Optional[List[int]] = None) -> List[int]:
         """Get IDs of posts liked by a specific user"""
         try:
-            query = self.model.query.filter_by(user_id=user_id)
+            # Only post_id is needed, so no Like entities are hydrated (served by user_post_uc)
+            query = self.db.session.query(Like.post_id).filter(Like.user_id == user_id)
             if post_ids:
-                query = query.filter(self.model.post_id.in_(post_ids))
-            likes = query.all()
-            return [like.post_id for like in likes]
+                query = query.filter(Like.post_id.in_(post_ids))
+            return [post_id for (post_id,) in query.all()]
         except Exception as e:
             current_app.logger.error(f"Error getting user liked post IDs: {str(e)}")
             raise
         
+    def toggle(self, user_id: int, post_id: int) -> Optional[Tuple[bool, int]]:
+        """Like the post if the user has not, unlike it otherwise, and return (liked, new like count).
+
+        The post row is locked first, so concurrent toggles of one post serialize on it instead of
+        racing on user_post_uc; the new count is derived from the locked value, so no COUNT(*) runs.
+        Returns None when the post does not exist.
+        """
+        for attempt in range(1, DEADLOCK_RETRIES + 1):
+            try:
+                current = self.db.session.execute(
+                    select(Post.likes_count).where(Post.post_id == post_id).with_for_update()
+                ).first()
+                if current is None:
+                    self.db.session.rollback()
+                    return None
+
+                deleted = self.db.session.execute(
+                    delete(Like).where(Like.user_id == user_id, Like.post_id == post_id)
+                ).rowcount
+                if deleted:
+                    delta = -deleted
+                else:
+                    delta = self.db.session.execute(
+                        insert(Like).values(user_id=user_id, post_id=post_id)
+                        .prefix_with('IGNORE', dialect='mysql')
+                        .prefix_with('OR IGNORE', dialect='sqlite')
+                    ).rowcount
+
+                self.post_repository.adjust_counters(post_id, likes_delta=delta)
+                self.db.session.commit()
+                return not deleted, current.likes_count + delta
+            except OperationalError as e:
+                self.db.session.rollback()
+                # Gap locks on user_post_uc can still deadlock toggles of different posts by one user
+                deadlock = getattr(e.orig, 'args', (None,))[0] == MYSQL_DEADLOCK
+                if not deadlock or attempt == DEADLOCK_RETRIES:
+                    current_app.logger.error(f"Error toggling like: {str(e)}")
+                    raise
+                current_app.logger.warning(f"Deadlock toggling like of post {post_id}, retrying")
+            except Exception as e:
+                self.db.session.rollback()
+                current_app.logger.error(f"Error toggling like: {str(e)}")
+                raise
+
+    def get_like_state(self, user_id: int, post_id: int) -> Optional[Tuple[bool, int]]:
+        """Whether the user likes the post and its like count, in one read; None if the post is missing"""
+        try:
+            row = self.db.session.query(
+                exists().where(Like.user_id == user_id, Like.post_id == post_id).label("liked"),
+                Post.likes_count
+            ).filter(Post.post_id == post_id).first()
+            return (bool(row.liked), row.likes_count) if row else None
+        except Exception as e:
+            current_app.logger.error(f"Error getting like state: {str(e)}")
+            raise
+
+    def apply_like_states(self, states: Dict[Tuple[int, int], bool]) -> List[int]:
+        """Bring likes in line with final (user_id, post_id) -> liked states in one transaction.
+
+        Inserts and deletes are batched and idempotent; like counters of the touched posts are
+        recounted rather than adjusted. Returns the ids of the touched posts.
+        """
+        try:
+            to_insert = [{"user_id": user_id, "post_id": post_id} for (user_id, post_id), liked in states.items() if liked]
+            to_delete = [key for key, liked in states.items() if not liked]
+
+            for i in range(0, len(to_insert), APPLY_BATCH_SIZE):
+                self.db.session.execute(
+                    insert(Like).prefix_with('IGNORE', dialect='mysql').prefix_with('OR IGNORE', dialect='sqlite'),
+                    to_insert[i:i + APPLY_BATCH_SIZE]
+                )
+            for i in range(0, len(to_delete), APPLY_BATCH_SIZE):
+                self.db.session.execute(
+                    delete(Like).where(tuple_(Like.user_id, Like.post_id).in_(to_delete[i:i + APPLY_BATCH_SIZE]))
+                )
+
+            post_ids = sorted({post_id for _, post_id in states})
+            self.post_repository.recount_likes(post_ids)
+            self.db.session.commit()
+            return post_ids
+        except Exception as e:
+            self.db.session.rollback()
+            current_app.logger.error(f"Error applying buffered likes: {str(e)}")
+            raise
+
     def count_likes_for_post(self, post_id: int) -> int:
-        """Count likes for a specific post"""
+        """Count likes for a specific post (read from the denormalized counter)"""
         try:
-            return self.model.query.filter_by(post_id=post_id).count()
+            count = self.db.session.query(Post.likes_count).filter(Post.post_id == post_id).scalar()
+            return count or 0
         except Exception as e:
             current_app.logger.error(f"Error counting likes for post: {str(e)}")
             raise
\ No newline at end of file
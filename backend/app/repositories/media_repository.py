@@ -0,0 +1,122 @@
+from .base_repository import BaseRepository
+from app.models.media import Media, MediaVariant
+from app.interfaces.repositories.IMediaRepository import IMediaRepository
+from flask import current_app
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.engine import Row
+from typing import Any, Callable, Dict, List, Optional
+
+class MediaRepository(BaseRepository[Media], IMediaRepository):
+    def __init__(self):
+        super().__init__(Media)
+
+    def acquire(self, sha256: str, ext: str, mime_type: str, size: int, place: Callable[[bool], None]) -> int:
+        """Add a reference to the file with this hash and return its new ref_count.
+
+        The row is created if needed and locked before place(exists) runs, so placing the file
+        on disk cannot race with the last release() of the same content removing it. exists is
+        True when the row was already there. The reference is committed only after place() returns.
+        """
+        try:
+            self.db.session.execute(
+                insert(Media).values(sha256=sha256, ext=ext, mime_type=mime_type, size=size, ref_count=0)
+                .prefix_with('IGNORE', dialect='mysql')
+                .prefix_with('OR IGNORE', dialect='sqlite')
+            )
+            ref_count = self.db.session.execute(
+                select(Media.ref_count).where(Media.sha256 == sha256).with_for_update()
+            ).scalar_one()
+
+            place(ref_count > 0)
+
+            self.db.session.execute(
+                update(Media).where(Media.sha256 == sha256).values(ref_count=Media.ref_count + 1)
+            )
+            self.db.session.commit()
+            return ref_count + 1
+        except Exception as e:
+            self.db.session.rollback()
+            current_app.logger.error(f"Error acquiring media {sha256}: {str(e)}")
+            raise
+
+    def release(self, sha256: str, remove: Callable[[], None]) -> Optional[int]:
+        """Drop a reference to the file with this hash and return the remaining ref_count.
+
+        When the last reference goes the row and its variants are deleted and remove() runs while
+        it is still locked, before the commit. Returns None when no row exists for the hash.
+        """
+        try:
+            ref_count = self.db.session.execute(
+                select(Media.ref_count).where(Media.sha256 == sha256).with_for_update()
+            ).scalar()
+            if ref_count is None:
+                self.db.session.rollback()
+                return None
+
+            if ref_count <= 1:
+                self.db.session.execute(delete(MediaVariant).where(MediaVariant.sha256 == sha256))
+                self.db.session.execute(delete(Media).where(Media.sha256 == sha256))
+                remove()
+                remaining = 0
+            else:
+                self.db.session.execute(
+                    update(Media).where(Media.sha256 == sha256).values(ref_count=Media.ref_count - 1)
+                )
+                remaining = ref_count - 1
+            self.db.session.commit()
+            return remaining
+        except Exception as e:
+            self.db.session.rollback()
+            current_app.logger.error(f"Error releasing media {sha256}: {str(e)}")
+            raise
+
+    def get_variants(self, sha256s: List[str], format: Optional[str] = None) -> List[Row]:
+        """Recorded variants of the given files, optionally of one format, narrowest first"""
+        try:
+            if not sha256s:
+                return []
+            query = select(MediaVariant.sha256, MediaVariant.width, MediaVariant.format, MediaVariant.height)\
+                .where(MediaVariant.sha256.in_(sha256s))
+            if format is not None:
+                query = query.where(MediaVariant.format == format)
+            return self.db.session.execute(query.order_by(MediaVariant.sha256, MediaVariant.width)).all()
+        except Exception as e:
+            current_app.logger.error(f"Error getting media variants: {str(e)}")
+            raise
+
+    def add_variants(self, sha256: str, variants: List[Dict[str, Any]]) -> bool:
+        """Record generated variants of a file; False if the file was released in the meantime.
+
+        The media row is locked first, so this cannot interleave with the release() that
+        deletes the file and its variants.
+        """
+        try:
+            exists = self.db.session.execute(
+                select(Media.sha256).where(Media.sha256 == sha256).with_for_update()
+            ).first()
+            if exists is None:
+                self.db.session.rollback()
+                return False
+            if variants:
+                self.db.session.execute(
+                    insert(MediaVariant).prefix_with('IGNORE', dialect='mysql').prefix_with('OR IGNORE', dialect='sqlite'),
+                    [dict(variant, sha256=sha256) for variant in variants]
+                )
+            self.db.session.commit()
+            return True
+        except Exception as e:
+            self.db.session.rollback()
+            current_app.logger.error(f"Error recording variants of media {sha256}: {str(e)}")
+            raise
+
+    def get_names_after(self, last_sha256: Optional[str], limit: int) -> List[str]:
+        """Media names (<sha256>.<ext>) in hash order, for walking the whole store in batches"""
+        try:
+            query = select(Media.sha256, Media.ext)
+            if last_sha256 is not None:
+                query = query.where(Media.sha256 > last_sha256)
+            rows = self.db.session.execute(query.order_by(Media.sha256).limit(limit)).all()
+            return [f"{row.sha256}.{row.ext}" for row in rows]
+        except Exception as e:
+            current_app.logger.error(f"Error listing media: {str(e)}")
+            raise
@@ -5,59 +5,117 @@ from app.models.likes import Like
 from app.models.comments import Comment
 from app.interfaces.repositories.IPostRepository import IPostRepository
 from flask import current_app
-from sqlalchemy import func, distinct
+from sqlalchemy import func, or_, and_, select, update, literal, false, exists
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.engine import Row
 from typing import Optional
+import re
 from datetime import datetime, timezone
 from typing import List
 
+# Relevance scores are rounded so cursors can compare them exactly
+RELEVANCE_PRECISION = 6
+
 class PostRepository(BaseRepository[Post], IPostRepository):
     def __init__(self):
         super().__init__(Post)
 
-    def get_posts(self, sort_by='recent', limit=10, offset=0, search=None, user_id=None) -> List[Post]:
-        """Get posts with filtering, sorting and pagination"""
+    def _search_terms(self, search: str) -> str:
+        """Build a FULLTEXT boolean-mode query requiring every word as a prefix match"""
+        words = re.findall(r"\w+", search)
+        return " ".join(f"+{word}*" for word in words)
+
+    def _search_score(self, search: str):
+        """Relevance of title+content for the search, served by the FULLTEXT index on MySQL"""
+        if self.db.session.get_bind().dialect.name != 'mysql':
+            return None
+        return match(Post.title, Post.content, against=self._search_terms(search)).in_boolean_mode()
+
+    def _liked_by_viewer(self, viewer_id):
+        """Correlated EXISTS flag telling whether the viewer liked the post of the current row"""
+        return exists().where(Like.post_id == Post.post_id, Like.user_id == viewer_id).label("liked_by_viewer")
+
+    def _list_columns(self, preview_chars: Optional[int] = None) -> list:
+        """Columns serialized by list endpoints; content is cut in SQL when a preview is requested"""
+        content = Post.content
+        if preview_chars is not None:
+            # One extra character lets callers tell a truncated preview from a short post
+            content = func.substr(Post.content, 1, preview_chars + 1)
+        return [
+            Post.post_id,
+            Post.title,
+            content.label("content"),
+            Post.image,
+            Post.created_at,
+            Post.updated_at,
+            Post.user_id,
+            Post.likes_count,
+            Post.comments_count,
+            User.username,
+            User.profile_picture,
+        ]
+
+    def get_posts(self, sort_by='recent', limit=10, offset=0, search=None, user_id=None, cursor=None, viewer_id=None, preview_chars=None) -> List[Row]:
+        """Get posts with filtering, sorting and pagination.
+
+        Only the columns list endpoints serialize are selected and plain rows are returned,
+        so no entities (or user credentials) are hydrated into the session. With preview_chars,
+        content holds at most preview_chars + 1 characters.
+        When cursor (the decoded (sort value, post_id) of the last row already seen) is given,
+        rows are paged by keyset instead of offset so deep pages do not scan earlier rows.
+        When viewer_id is given every post carries liked_by_viewer, computed in the same statement.
+        """
         try:
-            # Define sort criteria as tuples (primary, tiebreaker)
+            score = self._search_score(search) if search else None
+
+            # Define sort key for each mode; post_id is always the tiebreaker
             sort_map = {
-                'recent': (Post.updated_at.desc(), Post.post_id.desc()),
-                'likes': (func.count(distinct(Like.like_id)).desc(), Post.post_id.desc()),
-                'comments': (func.count(distinct(Comment.comment_id)).desc(), Post.post_id.desc())
+                'recent': Post.updated_at,
+                'likes': Post.likes_count,
+                'comments': Post.comments_count,
+                'relevance': func.round(score, RELEVANCE_PRECISION) if score is not None else literal(0.0)
             }
-            primary_sort, tiebreak_sort = sort_map.get(sort_by, (Post.updated_at.desc(), Post.post_id.desc()))
-
-            # Build query
-            query = self.db.session.query(
-                Post,
-                User,
-                func.count(distinct(Comment.comment_id)).label("comments_count"),
-                func.count(distinct(Like.like_id)).label("likes_count")
-            )\
-            .join(User, Post.user_id == User.user_id)\
-            .outerjoin(Comment, Post.post_id == Comment.post_id)\
-            .outerjoin(Like, Post.post_id == Like.post_id)\
-            .group_by(Post.post_id, User.user_id)
+            sort_key = sort_map.get(sort_by, Post.updated_at)
+
+            # Counters are denormalized on posts, so no join on likes/comments is needed
+            columns = self._list_columns(preview_chars)
+            if sort_by == 'relevance':
+                columns.append(sort_key.label("relevance"))
+            if viewer_id is not None:
+                columns.append(self._liked_by_viewer(viewer_id))
+            query = self.db.session.query(*columns)\
+                .join(User, Post.user_id == User.user_id)
 
             # Apply filters if provided
             if search:
-                query = query.filter(Post.title.ilike(f'%{search}%'))
+                if score is None:
+                    # Databases without FULLTEXT support fall back to a substring scan
+                    query = query.filter(or_(Post.title.ilike(f'%{search}%'), Post.content.ilike(f'%{search}%')))
+                elif self._search_terms(search):
+                    query = query.filter(score)
+                else:
+                    # Nothing searchable left once punctuation is stripped
+                    query = query.filter(false())
             if user_id:
                 query = query.filter(Post.user_id == user_id)
 
+            # Seek past the last row of the previous page
+            if cursor is not None:
+                last_value, last_id = cursor
+                query = query.filter(or_(
+                    sort_key < last_value,
+                    and_(sort_key == last_value, Post.post_id < last_id)
+                ))
+                offset = 0
+
             # Apply sorting and pagination
-            query = query.order_by(primary_sort, tiebreak_sort)\
+            query = query.order_by(sort_key.desc(), Post.post_id.desc())\
                 .offset(offset)\
                 .limit(limit)
 
-            current_app.logger.info(f"Fetching posts with sort: {sort_by}, limit: {limit}, offset: {offset}")
+            current_app.logger.info(f"Fetching posts with sort: {sort_by}, limit: {limit}, offset: {offset}, cursor: {cursor}")
 
-            # Get results and add counts as attributes to the Post objects
-            results = []
-            for post_tuple in query.all():
-                post, user, comments_count, likes_count = post_tuple
-                post.user = user
-                post.comments_count = comments_count
-                post.likes_count = likes_count
-                results.append(post)
+            results = query.all()
 
             current_app.logger.info(f"Posts returned: {[p.post_id for p in results]}")
 
@@ -67,29 +125,22 @@ class PostRepository(BaseRepository[Post], IPostRepository):
             current_app.logger.error(f"Error retrieving posts: {str(e)}")
             raise
 
-    def get_post_by_id(self, post_id: int) -> Optional[Post]:
+    def get_post_by_id(self, post_id: int, viewer_id: Optional[int] = None) -> Optional[Post]:
         try:
-            # Query Post joined with User, and count comments and likes
-            query = self.db.session.query(
-                Post,
-                func.count(distinct(Comment.comment_id)).label("comments_count"),
-                func.count(distinct(Like.like_id)).label("likes_count"),
-                User
-            )\
-            .join(User, Post.user_id == User.user_id)\
-            .outerjoin(Comment, Post.post_id == Comment.post_id)\
-            .outerjoin(Like, Post.post_id == Like.post_id)\
-            .filter(Post.post_id == post_id)\
-            .group_by(Post.post_id, User.user_id)
-            
-            result = query.first()
+            # Query Post joined with User; like and comment counts are read from the post row
+            columns = [Post, User]
+            if viewer_id is not None:
+                columns.append(self._liked_by_viewer(viewer_id))
+            result = self.db.session.query(*columns)\
+                .join(User, Post.user_id == User.user_id)\
+                .filter(Post.post_id == post_id)\
+                .first()
             if not result:
                 return None
             
-            post, comments_count, likes_count, user = result
-            post.comments_count = comments_count
-            post.likes_count = likes_count
+            post, user = result[0], result[1]
             post.user = user
+            post.liked_by_viewer = bool(result.liked_by_viewer) if viewer_id is not None else False
             
             return post
         
@@ -97,6 +148,26 @@ class PostRepository(BaseRepository[Post], IPostRepository):
             current_app.logger.error(f"Error retrieving post {post_id}: {str(e)}")
             raise
 
+    def get_post_version(self, post_id: int, viewer_id: Optional[int] = None) -> Optional[Row]:
+        """Fetch only the fields the post detail's validators depend on (a primary key lookup on each table)"""
+        try:
+            columns = [
+                Post.updated_at,
+                Post.likes_count,
+                Post.comments_count,
+                User.username,
+                User.profile_picture,
+            ]
+            if viewer_id is not None:
+                columns.append(self._liked_by_viewer(viewer_id))
+            return self.db.session.query(*columns)\
+                .join(User, Post.user_id == User.user_id)\
+                .filter(Post.post_id == post_id)\
+                .first()
+        except Exception as e:
+            current_app.logger.error(f"Error retrieving version of post {post_id}: {str(e)}")
+            raise
+
     def create_post(self, title: str, content: str, image_url: Optional[str], user_id: int) -> Post:
         new_post = Post(
             title=title,
@@ -128,6 +199,17 @@ class PostRepository(BaseRepository[Post], IPostRepository):
             current_app.logger.error(f"Error updating post {post_id}: {str(e)}")
             raise
 
+    def get_media_references(self, post_id: int) -> List[str]:
+        """Stored image paths of a post and of the comments deleted with it"""
+        try:
+            query = select(Post.image).where(Post.post_id == post_id).union_all(
+                select(Comment.image).where(Comment.post_id == post_id, Comment.image.isnot(None))
+            )
+            return [image for (image,) in self.db.session.execute(query) if image]
+        except Exception as e:
+            current_app.logger.error(f"Error getting media references of post {post_id}: {str(e)}")
+            raise
+
     def count_user_posts_today(self, user_id: int) -> int:
         try:
             today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
@@ -138,4 +220,71 @@ class PostRepository(BaseRepository[Post], IPostRepository):
             return count
         except Exception as e:
             current_app.logger.error(f"Error counting posts for user {user_id}: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    def adjust_counters(self, post_id: int, likes_delta: int = 0, comments_delta: int = 0, last_comment_id: Optional[int] = None) -> None:
+        """Stage an atomic increment of a post's denormalized counters in the current transaction.
+
+        The caller owns the commit so the counter changes together with the like/comment row.
+        last_comment_id is recorded when a comment is added.
+        """
+        values = dict(
+            likes_count=Post.likes_count + likes_delta,
+            comments_count=Post.comments_count + comments_delta,
+            # Counter changes must not bump the post's position in the recent feed
+            updated_at=Post.updated_at
+        )
+        if last_comment_id is not None:
+            values['last_comment_id'] = last_comment_id
+        self.db.session.execute(update(Post).where(Post.post_id == post_id).values(**values))
+
+    def recount_likes(self, post_ids: List[int]) -> None:
+        """Stage a recount of likes_count for the given posts in the current transaction"""
+        if not post_ids:
+            return
+        likes_actual = select(func.count(Like.like_id))\
+            .where(Like.post_id == Post.post_id)\
+            .scalar_subquery()
+        self.db.session.execute(
+            update(Post)
+            .where(Post.post_id.in_(post_ids))
+            .values(likes_count=likes_actual, updated_at=Post.updated_at)
+        )
+
+    def reconcile_counters(self, only_drifted: bool = True, batch_size: int = 1000) -> int:
+        """Recompute denormalized counters from likes/comments in post_id batches.
+
+        Returns the number of posts whose counters were rewritten. With only_drifted=False
+        every row is rewritten, which is what the backfill command uses.
+        """
+        try:
+            likes_actual = select(func.count(Like.like_id))\
+                .where(Like.post_id == Post.post_id)\
+                .scalar_subquery()
+            comments_actual = select(func.count(Comment.comment_id))\
+                .where(Comment.post_id == Post.post_id)\
+                .scalar_subquery()
+
+            max_id = self.db.session.query(func.max(Post.post_id)).scalar() or 0
+            repaired = 0
+            for lower in range(0, max_id + 1, batch_size):
+                stmt = update(Post).where(Post.post_id >= lower, Post.post_id < lower + batch_size)
+                if only_drifted:
+                    stmt = stmt.where(or_(
+                        Post.likes_count != likes_actual,
+                        Post.comments_count != comments_actual
+                    ))
+                stmt = stmt.values(
+                    likes_count=likes_actual,
+                    comments_count=comments_actual,
+                    updated_at=Post.updated_at
+                )
+                repaired += self.db.session.execute(stmt).rowcount
+                self.db.session.commit()
+
+            current_app.logger.info(f"Reconciled post counters: {repaired} posts rewritten")
+            return repaired
+        except Exception as e:
+            self.db.session.rollback()
+            current_app.logger.error(f"Error reconciling post counters: {str(e)}")
+            raise
@@ -1,12 +1,53 @@
 from .base_repository import BaseRepository
+from .email_outbox_repository import EmailOutboxRepository
 from app.models.users import User
+from app.models.posts import Post
+from app.models.comments import Comment
 from app.interfaces.repositories.IUserRepository import IUserRepository
+from app.utils.user_context import CONTEXT_FIELDS
 from flask import current_app
-from typing import Optional
+from sqlalchemy import and_, exists, or_, select, union_all
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
+from typing import Any, Callable, Dict, List, Optional, Set
+
+# Columns with a unique index that users choose themselves, in the order conflicts are reported
+UNIQUE_FIELDS = ('username', 'email')
+
+class UserConflictError(ValueError):
+    """A username or email taken by another user, found when the row was written"""
+
+    def __init__(self, fields: Set[str]):
+        self.fields = fields
+        super().__init__(f"Already in use: {', '.join(field for field in UNIQUE_FIELDS if field in fields)}")
 
 class UserRepository(BaseRepository[User], IUserRepository):
-    def __init__(self):
+    def __init__(self, email_outbox_repository: EmailOutboxRepository = None):
         super().__init__(User)
+        self.email_outbox_repository = email_outbox_repository or EmailOutboxRepository()
+
+    def create_with_email(self, data: Dict[str, Any], compose: Callable[[User], Dict[str, str]]) -> User:
+        """Create a user and queue an email to them in one transaction.
+
+        compose receives the flushed user (with its user_id) and returns the recipient, subject
+        and body of the email. Either both rows are committed or neither is.
+        """
+        try:
+            user = self.model(**data)
+            self.db.session.add(user)
+            self.db.session.flush()
+            self.email_outbox_repository.add(**compose(user))
+            self.db.session.commit()
+            return user
+        except IntegrityError as e:
+            self.db.session.rollback()
+            self._raise_conflict(data.get('username'), data.get('email'))
+            current_app.logger.error(f"Error creating user with email: {str(e)}")
+            raise
+        except Exception as e:
+            self.db.session.rollback()
+            current_app.logger.error(f"Error creating user with email: {str(e)}")
+            raise
     
     def get_by_email(self, email: str) -> Optional[User]:
         """Get user by email"""
@@ -16,27 +57,80 @@ class UserRepository(BaseRepository[User], IUserRepository):
             current_app.logger.error(f"Error getting user by email: {str(e)}")
             raise
 
-    def check_email_exists(self, email: str) -> bool:
-        """Check if email already exists"""
+    def find_conflicts(self, username: Optional[str] = None, email: Optional[str] = None,
+                       exclude_user_id: Optional[int] = None) -> Set[str]:
+        """Which of username and email already belong to a user other than exclude_user_id.
+
+        One round trip: an EXISTS probe per given value, each answered from its unique index
+        without reading any user row. Returns a subset of {'username', 'email'}.
+        """
         try:
-            return self.model.query.filter_by(email=email).first() is not None
+            probes = []
+            for field, value in (('username', username), ('email', email)):
+                if value is None:
+                    continue
+                condition = getattr(User, field) == value
+                if exclude_user_id is not None:
+                    condition = condition & (User.user_id != exclude_user_id)
+                probes.append(exists().where(condition).label(field))
+            if not probes:
+                return set()
+            row = self.db.session.execute(select(*probes)).one()
+            return {field for field, taken in row._mapping.items() if taken}
         except Exception as e:
-            current_app.logger.error(f"Error checking if email exists: {str(e)}")
+            current_app.logger.error(f"Error checking username/email conflicts: {str(e)}")
             raise
-    
-    def check_username_exists(self, username: str) -> bool:
-        """Check if username already exists"""
+
+    def _raise_conflict(self, username: Optional[str], email: Optional[str], exclude_user_id: Optional[int] = None) -> None:
+        """After a unique index rejected a write, raise UserConflictError for the fields that collided.
+
+        Returns without raising when neither value is taken, i.e. the error came from something else.
+        """
+        conflicts = self.find_conflicts(username, email, exclude_user_id)
+        if conflicts:
+            current_app.logger.warning(f"Lost a race for {', '.join(sorted(conflicts))}")
+            raise UserConflictError(conflicts)
+
+    @staticmethod
+    def _bump_token_version_if_needed(user: User, data: Dict[str, Any]) -> None:
+        if any(field in data and data[field] != getattr(user, field) for field in CONTEXT_FIELDS):
+            user.token_version = (user.token_version or 0) + 1
+
+    def update(self, user: User, data: Dict[str, Any]) -> User:
+        """Update a user; a username or email taken concurrently raises UserConflictError.
+
+        Changing a field copied into access token claims bumps user.token_version.
+        """
         try:
-            return self.model.query.filter_by(username=username).first() is not None
+            self._bump_token_version_if_needed(user, data)
+            for key, value in data.items():
+                setattr(user, key, value)
+            self.db.session.commit()
+            return user
+        except IntegrityError as e:
+            self.db.session.rollback()
+            self._raise_conflict(data.get('username'), data.get('email'), user.user_id)
+            current_app.logger.error(f"Error updating User: {str(e)}")
+            raise
         except Exception as e:
-            current_app.logger.error(f"Error checking if username exists: {str(e)}")
+            self.db.session.rollback()
+            current_app.logger.error(f"Error updating User: {str(e)}")
             raise
 
+    def check_email_exists(self, email: str) -> bool:
+        """Check if email already exists"""
+        return 'email' in self.find_conflicts(email=email)
+    
+    def check_username_exists(self, username: str) -> bool:
+        """Check if username already exists"""
+        return 'username' in self.find_conflicts(username=username)
+
     def update_membership(self, user_id: int, is_premium: str) -> User:
-        """Update user membership status"""
+        """Update user membership status, bumping user.token_version when it changes"""
         try:
             user = self.get_by_id(user_id)
             if user:
+                self._bump_token_version_if_needed(user, {"membership": is_premium})
                 user.membership = is_premium
                 self.db.session.commit()
                 current_app.logger.info(f"User {user_id} membership updated to {is_premium}")
@@ -69,4 +163,34 @@ class UserRepository(BaseRepository[User], IUserRepository):
             return self.model.query.get(user_id)
         except Exception as e:
             current_app.logger.error(f"Error getting user by ID: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    def get_media_references(self, user_id: int) -> List[str]:
+        """Stored image paths of everything deleting the user removes.
+
+        That is the profile picture, the user's posts and comments, the comments other users
+        left on those posts (they go with the posts) and the replies under the user's comments
+        on other posts (they go with the comments they answer).
+        """
+        try:
+            own_posts = select(Post.post_id).where(Post.user_id == user_id)
+            own = aliased(Comment)
+            # Every comment in the subtree of one of the user's comments, the user's own included
+            in_own_subtree = exists().where(
+                own.user_id == user_id,
+                own.post_id == Comment.post_id,
+                Comment.path.startswith(own.path)
+            )
+            commented_posts = select(own.post_id).where(own.user_id == user_id)
+            query = union_all(
+                select(User.profile_picture.label("image")).where(User.user_id == user_id),
+                select(Post.image).where(Post.user_id == user_id),
+                select(Comment.image).where(Comment.image.isnot(None), or_(
+                    Comment.post_id.in_(own_posts),
+                    and_(Comment.post_id.in_(commented_posts), in_own_subtree)
+                )),
+            )
+            return [image for (image,) in self.db.session.execute(query) if image]
+        except Exception as e:
+            current_app.logger.error(f"Error getting media references of user {user_id}: {str(e)}")
+            raise
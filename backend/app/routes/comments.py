@@ -10,5 +10,14 @@ comments_bp.route("/comments/create/<int:post_id>", methods=["POST"])(comment_co
 # Get comment by ID
 comments_bp.route("/comments/<int:post_id>", methods=["GET"])(comment_controller.get_comments_by_post)
 
+# Get replies to a comment
+comments_bp.route("/comments/<int:post_id>/replies/<int:parent_id>", methods=["GET"])(comment_controller.get_replies)
+
+# Get a comment with its nested replies
+comments_bp.route("/comments/thread/<int:comment_id>", methods=["GET"])(comment_controller.get_thread)
+
+# Delete a comment and its replies
+comments_bp.route("/comments/delete/<int:comment_id>", methods=["DELETE"])(comment_controller.delete_comment)
+
 # Get post images 
 comments_bp.route('/comments/comment_uploads/<filename>', methods=['GET'])(comment_controller.get_comment_image)
\ No newline at end of file
@@ -34,5 +34,5 @@ limiter.limit("2 per minute")(profile_bp.route('/profile', methods=['DELETE'])(p
 limiter.limit("10 per minute")(profile_bp.route('/profile/posts', methods=['GET'])(profile_controller.get_user_posts))
 
 # Get profile images
-# Allows for media loading while preventing excessive requests
-limiter.limit("10 per minute")(profile_bp.route('/profile/uploads/<filename>', methods=['GET'])(profile_controller.get_profile_image))
\ No newline at end of file
+# Files are sent by nginx and cached by clients, so the limit only guards against scraping
+limiter.limit("300 per minute")(profile_bp.route('/profile/uploads/<filename>', methods=['GET'])(profile_controller.get_profile_image))
\ No newline at end of file
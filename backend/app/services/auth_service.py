@@ -1,22 +1,36 @@
 from app.interfaces.services.IAuthService import IAuthService
 from app.interfaces.repositories.IUserRepository import IUserRepository
-from app.repositories.user_repository import UserRepository
+from app.repositories.user_repository import UserRepository, UserConflictError, UNIQUE_FIELDS
 from app.models.users import User
 from flask import current_app
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.interfaces.repositories.IEmailOutboxRepository import IEmailOutboxRepository
+from app.repositories.email_outbox_repository import EmailOutboxRepository
+from app.workers import PasswordHasher, EmailSender
+from app.cache import TokenVersionCache
+from app.extensions import password_hasher as default_password_hasher, email_sender as default_email_sender, token_versions as default_token_versions
 from app.utils.validation import is_valid_email, is_strong_password
+from app.utils.user_context import ACCESS_TOKEN_MAX_MINUTES, UserContext, context_of, context_claims
 from flask_jwt_extended import create_access_token, create_refresh_token
 import datetime
 from itsdangerous import URLSafeTimedSerializer
 import secrets
-from flask_mail import Message
-from app import mail
 from typing import Dict, Tuple, Optional
 import pyotp
 
+SIGNUP_CONFLICT_ERRORS = {
+    'username': "Username already exists",
+    'email': "Email already exists",
+}
+
 class AuthService(IAuthService):
-    def __init__(self, user_repository: IUserRepository = None):
+    def __init__(self, user_repository: IUserRepository = None, password_hasher: PasswordHasher = None,
+                 email_outbox_repository: IEmailOutboxRepository = None, email_sender: EmailSender = None,
+                 token_versions: TokenVersionCache = None):
         self.user_repository = user_repository or UserRepository()
+        self.password_hasher = password_hasher or default_password_hasher
+        self.email_outbox_repository = email_outbox_repository or EmailOutboxRepository()
+        self.email_sender = email_sender or default_email_sender
+        self.token_versions = token_versions or default_token_versions
     
     def validate_signup_data(self, data: Dict[str, str]) -> Tuple[bool, str]:
         """Validate user signup data"""
@@ -30,17 +44,14 @@ class AuthService(IAuthService):
         if len(data['username']) < 3:
             return False, "Username must be at least 3 characters"
         
-        # Check if username already exists
-        if self.user_repository.check_username_exists(data['username']):
-            return False, "Username already exists"
-        
         # Validate email
         if not is_valid_email(data['email']):
             return False, "Invalid email format"
         
-        # Check if email already exists
-        if self.user_repository.check_email_exists(data['email']):
-            return False, "Email already exists"
+        # Check both unique fields in one query
+        conflicts = self.user_repository.find_conflicts(username=data['username'], email=data['email'])
+        if conflicts:
+            return False, self._conflict_error(conflicts)
         
         # Validate password
         if not is_strong_password(data['password']):
@@ -48,10 +59,17 @@ class AuthService(IAuthService):
         
         return True, ""
     
-    def create_user(self, data: Dict[str, str]) -> User:
-        """Create a new user"""
+    def _conflict_error(self, conflicts) -> str:
+        return next(SIGNUP_CONFLICT_ERRORS[field] for field in UNIQUE_FIELDS if field in conflicts)
+    
+    def create_user(self, data: Dict[str, str]) -> Tuple[Optional[User], Optional[str]]:
+        """Create a new user and queue their verification email in the same transaction.
+
+        A username or email registered since validate_signup_data is reported like a failed
+        validation.
+        """
         # Hash the password
-        hashed_password = generate_password_hash(data['password'])
+        hashed_password = self.password_hasher.hash(data['password'])
         
         totp = pyotp.TOTP(pyotp.random_base32())
         totp_secret = totp.secret
@@ -67,10 +85,14 @@ class AuthService(IAuthService):
         }
         
         # Create user
-        user = self.user_repository.create(user_data)
+        try:
+            user = self.user_repository.create_with_email(user_data, self._verification_email)
+        except UserConflictError as e:
+            return None, self._conflict_error(e.fields)
+        self.email_sender.notify()
         current_app.logger.info(f"Created new user with username: {user.username}")
         
-        return user
+        return user, None
     
     def login(self, email: str, password: str) -> Tuple[Optional[User], Optional[str]]:
         """Authenticate a user"""
@@ -81,36 +103,40 @@ class AuthService(IAuthService):
             return None, "Invalid email or password"
         
         # Check password
-        if not check_password_hash(user.password, password):
+        if not self.password_hasher.verify(user.password, password):
             current_app.logger.warning(f"Failed login attempt for user: {user.username}")
             return None, "Invalid email or password"
         
+        if self.password_hasher.needs_rehash(user.password):
+            self._rehash_password(user, password)
+        
         current_app.logger.info(f"Successful login for user: {user.username}")
         return user, None
     
-    def generate_tokens(self, user_id: int, totp_verified: bool = False) -> Dict[str, str]:
-        """Generate access and refresh tokens"""
-        # Convert user_id to string
-        str_user_id = str(user_id)
-        additional_claims = {"totp_verified": totp_verified}
-
-        if not totp_verified:
-            access_token = create_access_token(
-                identity=str_user_id,
-                expires_delta=datetime.timedelta(minutes=3),
-                additional_claims=additional_claims
-            )
-        else:
-            # Create access token with 15-minute expiry
-            access_token = create_access_token(
-                identity=str_user_id,
-                expires_delta=datetime.timedelta(minutes=15),
-                additional_claims=additional_claims
-            )
+    def _rehash_password(self, user: User, password: str) -> None:
+        """Store the password again under the configured hash parameters; the login succeeds regardless"""
+        try:
+            self.user_repository.update(user, {"password": self.password_hasher.hash(password)})
+            current_app.logger.info(f"Upgraded password hash for user: {user.username}")
+        except Exception as e:
+            current_app.logger.warning(f"Could not upgrade password hash for user {user.username}: {str(e)}")
+    
+    def _access_token(self, context: UserContext) -> str:
+        # Until TOTP is verified the token only lives long enough to finish the setup
+        minutes = ACCESS_TOKEN_MAX_MINUTES if context.totp_verified else 3
+        return create_access_token(
+            identity=str(context.user_id),
+            expires_delta=datetime.timedelta(minutes=minutes),
+            additional_claims=context_claims(context)
+        )
+    
+    def generate_tokens(self, user: User) -> Dict[str, str]:
+        """Generate access and refresh tokens; the access token carries the user's context claims"""
+        access_token = self._access_token(context_of(user))
         
         # Create refresh token with 30-day expiry
         refresh_token = create_refresh_token(
-            identity=str_user_id,
+            identity=str(user.user_id),
             expires_delta=datetime.timedelta(days=30)
         )
         
@@ -119,19 +145,21 @@ class AuthService(IAuthService):
             'refresh_token': refresh_token
         }
     
-    def refresh_access_token(self, user_id: int) -> Dict[str, str]:
-        """Generate a new access token using a refresh token"""
-        # Convert user_id to string
-        str_user_id = str(user_id)
-        
-        # Create new access token with 15-minute expiry
-        access_token = create_access_token(
-            identity=str_user_id,
-            expires_delta=datetime.timedelta(minutes=15)
-        )
+    def issue_access_token(self, context: UserContext) -> Dict[str, str]:
+        """Generate a new access token carrying the given user context"""
+        return {
+            'access_token': self._access_token(context)
+        }
+    
+    def refresh_access_token(self, user_id: int) -> Optional[Dict[str, str]]:
+        """Generate a new access token using a refresh token, with context claims read from the database"""
+        user = self.user_repository.get_by_id(int(user_id))
+        if not user:
+            current_app.logger.warning(f"Token refresh for non-existent user {user_id}")
+            return None
         
         return {
-            'access_token': access_token
+            'access_token': self._access_token(context_of(user))
         }
     
     # Send verification email to user
@@ -142,25 +170,23 @@ class AuthService(IAuthService):
         token = serializer.dumps({'user_id': user.user_id}, salt=salt)
         return token, salt
 
-    def send_verification_email(self, user: User) -> None:
+    def _verification_email(self, user: User) -> Dict[str, str]:
         token, salt = self.generate_email_token(user)
-
-        current_app.logger.info(f"Generated token: {token}")
-        current_app.logger.info(f"Token salt: {salt}")
-
         verification_url = (
             f"{current_app.config['FRONTEND_ROUTE']}/verify_email?"
             f"token={token}&salt={salt}"
         )
+        return {
+            "recipient": user.email,
+            "subject": "Verify Your Email",
+            "body": f"Hi {user.username},\n\nClick the link to verify your email:\n\n{verification_url}"
+        }
 
-        current_app.logger.info(f"Verification URL: {verification_url}")
-
-        msg = Message(
-            subject="Verify Your Email",
-            recipients=[user.email],
-            body=f"Hi {user.username},\n\nClick the link to verify your email:\n\n{verification_url}"
-        )
-        mail.send(msg)
+    def send_verification_email(self, user: User) -> None:
+        """Queue a new verification email; the outbox sender delivers it"""
+        self.email_outbox_repository.enqueue(**self._verification_email(user))
+        self.email_sender.notify()
+        current_app.logger.info(f"Queued verification email for user: {user.username}")
 
     def verify_email_token(self, token: str, salt: str, max_age: int = 3600) -> bool:
         """Verify email token with externally passed salt"""
@@ -196,6 +222,6 @@ class AuthService(IAuthService):
             current_app.logger.warning(f"User with ID {user_id} not found for TOTP update")
             raise ValueError("User not found")
         
-        user.totp_verified = totp_verified
         self.user_repository.update(user, {"totp_verified": totp_verified})
+        self.token_versions.bump(user.user_id, user.token_version)
         current_app.logger.info(f"TOTP verification status updated for user {user.username}")
\ No newline at end of file
@@ -1,40 +1,102 @@
 from app.interfaces.services.ICommentService import ICommentService
 from app.interfaces.repositories.ICommentRepository import ICommentRepository
 from app.repositories.comment_repository import CommentRepository
+from app.interfaces.services.IMediaService import IMediaService
+from app.services.media_service import MediaService
 from app.models.comments import Comment
-from typing import List, Optional, Dict, Any
-from flask import current_app, send_from_directory
+from app.cache import FeedCache
+from app.extensions import feed_cache as default_feed_cache
+from app.utils.conditional import make_etag
+from app.utils.pagination import encode_cursor, decode_cursor
+from typing import Optional, Dict, Any, List, Tuple
+from flask import current_app
 import os
-import time
-import magic
 
 ALLOWED_MIME_TYPES = {'image/jpeg', 'image/png'}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+UPLOAD_FOLDER = '/data/comment_uploads'
+
+# Default page size for comment lists; cursors are tagged so feed cursors are rejected
+COMMENT_PAGE_SIZE = 20
+THREAD_CURSOR_KEY = 'thread'
+COMMENT_NOT_FOUND_ERROR = "Comment not found"
 
 class CommentService(ICommentService):
-    def __init__(self, comment_repository: ICommentRepository = None):
+    def __init__(self, comment_repository: ICommentRepository = None, feed_cache: FeedCache = None, media_service: IMediaService = None):
         self.comment_repository = comment_repository or CommentRepository()
-        self.UPLOAD_FOLDER = '/data/comment_uploads'
+        self.feed_cache = feed_cache or default_feed_cache
+        self.media_service = media_service or MediaService()
+        self.UPLOAD_FOLDER = UPLOAD_FOLDER
+
+    def _get_page(self, post_id: int, parent_id: Optional[int], limit: int, cursor: Optional[str]) -> Tuple[Dict[str, Any], List[Any]]:
+        seek = decode_cursor(cursor, THREAD_CURSOR_KEY, datetime_value=True) if cursor else None
+
+        # Fetch one extra row to know whether another page follows
+        rows = self.comment_repository.get_page(post_id, parent_id=parent_id, limit=limit + 1, cursor=seek)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        comments = [{
+            "comment_id": c.comment_id,
+            "post_id": c.post_id,
+            "parent_id": c.parent_id,
+            "user_id": c.user_id,
+            "username": c.username,
+            "content": c.content,
+            "image": c.image,
+            "created_at": c.created_at,
+            "reply_count": c.reply_count
+        } for c in rows]
+
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            next_cursor = encode_cursor(THREAD_CURSOR_KEY, last.created_at, last.comment_id)
+
+        return {
+            "comments": comments,
+            "has_more": has_more,
+            "next_cursor": next_cursor
+        }, rows
+
+    def get_comments_page(self, post_id: int, parent_id: Optional[int] = None, limit: int = COMMENT_PAGE_SIZE, cursor: Optional[str] = None) -> Tuple[Dict[str, Any], str]:
+        """A page of top-level comments (or of the replies to parent_id) with the ETag of the post's comment lists"""
+        try:
+            page, rows = self._get_page(post_id, parent_id, limit, cursor)
+            # Rows carry the post's comment list version; only an empty page needs the probe
+            etag = self._comments_etag(post_id, rows[0]) if rows else self.get_comments_etag(post_id)
+            return page, etag
+        except Exception as e:
+            current_app.logger.error(f"Error getting comments for post {post_id}, parent {parent_id}: {str(e)}")
+            raise
 
-    def _is_valid_mime(self, file) -> bool:
-        file.seek(0)
-        mime = magic.from_buffer(file.read(2048), mime=True)
-        file.seek(0)
-        return mime in ALLOWED_MIME_TYPES
+    def get_comments_by_post(self, post_id: int, limit: int = COMMENT_PAGE_SIZE, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """One page of a post's top-level comments, oldest first, each with its reply_count"""
+        try:
+            return self._get_page(post_id, None, limit, cursor)[0]
+        except Exception as e:
+            current_app.logger.error(f"Error getting comments for post {post_id}: {str(e)}")
+            raise
 
-    def _is_valid_size(self, file) -> bool:
-        file.seek(0, os.SEEK_END)
-        size = file.tell()
-        file.seek(0)
-        return size <= MAX_FILE_SIZE
+    def get_replies(self, post_id: int, parent_id: int, limit: int = COMMENT_PAGE_SIZE, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """One page of the direct replies of a comment, oldest first, each with its reply_count"""
+        try:
+            return self._get_page(post_id, parent_id, limit, cursor)[0]
+        except Exception as e:
+            current_app.logger.error(f"Error getting replies to comment {parent_id} on post {post_id}: {str(e)}")
+            raise
 
-    def get_comments_by_post(self, post_id: int) -> List[Dict[str, Any]]:
+    def get_thread(self, comment_id: int, max_depth: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """A comment with its replies nested under "replies", at most max_depth levels deep"""
         try:
-            comments = self.comment_repository.get_by_post_id(post_id)
-            # Format comments (handle nested, lazy loading etc. outside this method)
-            result = []
-            for c in comments:
-                result.append({
+            rows = self.comment_repository.get_subtree(comment_id, max_depth=max_depth)
+            if not rows:
+                return None
+
+            # Rows arrive in path order, so every parent is placed before its replies
+            nodes = {}
+            for c in rows:
+                nodes[c.comment_id] = {
                     "comment_id": c.comment_id,
                     "post_id": c.post_id,
                     "parent_id": c.parent_id,
@@ -42,13 +104,32 @@ class CommentService(ICommentService):
                     "username": c.username,
                     "content": c.content,
                     "image": c.image,
-                    "created_at": c.created_at.isoformat()
-                })
-            return result
+                    "created_at": c.created_at,
+                    "depth": c.depth,
+                    "reply_count": c.reply_count,
+                    "replies": []
+                }
+                if c.comment_id != comment_id:
+                    nodes[c.parent_id]["replies"].append(nodes[c.comment_id])
+            return nodes[comment_id]
         except Exception as e:
-            current_app.logger.error(f"Error getting comments for post {post_id}: {str(e)}")
+            current_app.logger.error(f"Error getting thread of comment {comment_id}: {str(e)}")
+            raise
+
+    def get_comments_etag(self, post_id: int) -> str:
+        """ETag of a post's comment lists, from a read of the post row"""
+        try:
+            return self._comments_etag(post_id, self.comment_repository.get_thread_version(post_id))
+        except Exception as e:
+            current_app.logger.error(f"Error getting comments ETag for post {post_id}: {str(e)}")
             raise
 
+    @staticmethod
+    def _comments_etag(post_id: int, version) -> str:
+        if version is None:
+            return make_etag(post_id, 0, None)
+        return make_etag(post_id, version.comment_count, version.last_comment_id)
+
     def create_comment(self, post_id: int, user_id: int, content: str, parent_id: Optional[int] = None, image_file=None) -> Comment:
         try:
             image_url = None
@@ -58,21 +139,10 @@ class CommentService(ICommentService):
                 if '.' not in image_file.filename or image_file.filename.rsplit('.', 1)[1].lower() not in allowed_extensions:
                     raise ValueError("File type not allowed")
                 
-                if not self._is_valid_mime(image_file):
-                    raise ValueError("Invalid file content")
-        
-                if not self._is_valid_size(image_file):
-                    raise ValueError("File too large")
-                
-                # Save image file
-                filename = f"user_{user_id}_comment_{int(time.time())}.{image_file.filename.rsplit('.', 1)[1].lower()}"
-                filepath = os.path.join(self.UPLOAD_FOLDER, filename)
-                os.makedirs(self.UPLOAD_FOLDER, exist_ok=True)
-                image_file.save(filepath)
+                # Store image file; content type and size are checked as it is written
+                filename = self.media_service.store(image_file, MAX_FILE_SIZE, ALLOWED_MIME_TYPES)
                 image_url = f"/comment_uploads/{filename}"
 
-                current_app.logger.info(f"Saved comment image to {filepath}")
-
             comment = Comment(
                 post_id=post_id,
                 user_id=user_id,
@@ -80,19 +150,64 @@ class CommentService(ICommentService):
                 parent_id=parent_id,
                 image=image_url
             )
-            return self.comment_repository.create_comment(comment)
+            try:
+                comment = self.comment_repository.create_comment(comment)
+            except Exception:
+                self.media_service.release(image_url)
+                raise
+
+            # Comment counts are shown in the feed and drive the comments ordering
+            self.feed_cache.invalidate(self.feed_cache.post_tag(post_id), self.feed_cache.sort_tag('comments'))
+            self.media_service.generate_variants(image_url)
+            return comment
         except Exception as e:
             current_app.logger.error(f"Error creating comment: {str(e)}")
             raise
 
-    def get_comment_image(self, filename):
+    def delete_comment(self, comment_id: int, user_id: int) -> Tuple[bool, str]:
+        """Delete a comment and all replies under it if the user wrote the comment"""
+        try:
+            comment = self.comment_repository.get_by_id(comment_id)
+            if not comment:
+                current_app.logger.warning(f"Delete attempt on non-existent comment {comment_id}")
+                return False, COMMENT_NOT_FOUND_ERROR
+
+            if comment.user_id != user_id:
+                current_app.logger.warning(f"Unauthorized delete attempt on comment {comment_id} by user {user_id}")
+                return False, "Unauthorized: You can only delete your own comments"
+
+            post_id = comment.post_id
+            result = self.comment_repository.delete_subtree(comment_id)
+            if result is None:
+                return False, COMMENT_NOT_FOUND_ERROR
+            deleted, images = result
+
+            for image in images:
+                if self.media_service.release(image):
+                    continue
+                # Uploads from before the media store live in the comment upload folder
+                filepath = os.path.join(self.UPLOAD_FOLDER, os.path.basename(image))
+                try:
+                    os.remove(filepath)
+                except OSError as e:
+                    current_app.logger.warning(f"Could not remove comment image {filepath}: {str(e)}")
+
+            self.feed_cache.invalidate(self.feed_cache.post_tag(post_id), self.feed_cache.sort_tag('comments'))
+
+            current_app.logger.info(f"Comment {comment_id} and {deleted - 1} replies deleted by user {user_id}")
+            return True, "Comment deleted successfully"
+        except Exception as e:
+            current_app.logger.error(f"Error deleting comment: {str(e)}")
+            raise
+
+    def get_comment_image(self, filename, width: Optional[int] = None):
         """Serve comment image from comment_uploads folder"""
         try:
             # Security check - prevent directory traversal
             if '..' in filename or filename.startswith('/'):
                 raise ValueError("Invalid filename")
                 
-            return send_from_directory(self.UPLOAD_FOLDER, filename)
+            return self.media_service.send(filename, self.UPLOAD_FOLDER, width)
         except Exception as e:
             current_app.logger.error(f"Error serving file {filename}: {str(e)}")
             raise 
\ No newline at end of file
@@ -0,0 +1,163 @@
+from app.interfaces.services.IMediaService import IMediaService
+from app.interfaces.repositories.IMediaRepository import IMediaRepository
+from app.repositories.media_repository import MediaRepository
+from app.utils.uploads import prepare_upload, INVALID_CONTENT_ERROR
+from app.utils.media_paths import (
+    MEDIA_ROOT, MIME_EXTENSIONS, VARIANT_FORMATS, VARIANT_WIDTHS, media_name, media_relative_path, variant_name
+)
+from app.workers import VariantWorker
+from app.extensions import variant_worker as default_variant_worker
+from app.utils.file_delivery import send_internal_file, IMMUTABLE_MAX_AGE
+from flask import current_app, request
+from typing import Any, Dict, Iterable, List, Optional
+import os
+
+# Uploads are streamed here, on the same filesystem as the store, so storing them is a rename
+MEDIA_STAGING_FOLDER = os.path.join(MEDIA_ROOT, '.staging')
+# Internal nginx location of the store (see MEDIA_ACCEL_REDIRECT)
+MEDIA_LOCATION = 'media'
+# Uploads from before the store keep their names; ?w= answers without a variant may change soon
+LEGACY_MAX_AGE = 3600
+PENDING_VARIANT_MAX_AGE = 60
+
+class MediaService(IMediaService):
+    """Content-addressed store shared by post, comment and profile images.
+
+    Identical uploads are stored once under the SHA-256 of their content and counted in the
+    media table. References are always taken before the row using a file is written and
+    dropped after it is deleted, so a crash in between can only leave a file behind, never
+    remove one that is still in use.
+    """
+
+    def __init__(self, media_repository: IMediaRepository = None, media_root: str = MEDIA_ROOT, variant_worker: VariantWorker = None):
+        self.media_repository = media_repository or MediaRepository()
+        self.media_root = media_root
+        self.variant_worker = variant_worker or default_variant_worker
+        self.staging_folder = os.path.join(media_root, '.staging')
+
+    def path_for(self, name: str) -> str:
+        return os.path.join(self.media_root, media_relative_path(name))
+
+    def store(self, file, max_bytes: int, allowed_mimes) -> str:
+        """Validate an upload (raises ValueError) and return the media name it is stored under"""
+        upload = prepare_upload(file, self.staging_folder, max_bytes, allowed_mimes)
+        try:
+            ext = MIME_EXTENSIONS.get(upload.mime)
+            if ext is None:
+                raise ValueError(INVALID_CONTENT_ERROR)
+            name = f"{upload.sha256}.{ext}"
+            path = self.path_for(name)
+
+            def place(exists: bool) -> None:
+                # Content already in the store is kept; the staged copy is deleted on close
+                if exists and os.path.exists(path):
+                    return
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                upload.commit(path)
+
+            ref_count = self.media_repository.acquire(upload.sha256, ext, upload.mime, upload.size, place)
+            current_app.logger.info(f"Stored media {name} ({ref_count} references)")
+            return name
+        finally:
+            upload.close()
+
+    def release(self, stored: Optional[str]) -> bool:
+        """Drop the reference held by a stored image path, deleting the file with the last one.
+
+        Returns False for paths that do not name a media file (uploads from before the store),
+        which callers clean up as before. Errors are logged rather than raised: the row holding
+        the reference is already gone, and a leaked reference only keeps a file on disk.
+        """
+        name = media_name(stored)
+        if name is None:
+            return False
+
+        path = self.path_for(name)
+        variant_paths = [
+            os.path.join(os.path.dirname(path), variant_name(name, width, format))
+            for width in VARIANT_WIDTHS for format in VARIANT_FORMATS
+        ]
+
+        def remove() -> None:
+            for file_path in [path] + variant_paths:
+                try:
+                    os.remove(file_path)
+                except FileNotFoundError:
+                    pass
+
+        try:
+            remaining = self.media_repository.release(name.split('.', 1)[0], remove)
+            if remaining == 0:
+                current_app.logger.info(f"Removed media {name}")
+        except Exception as e:
+            current_app.logger.error(f"Error releasing media {name}: {str(e)}")
+        return True
+
+    def release_all(self, stored: Iterable[Optional[str]]) -> None:
+        for image in stored:
+            self.release(image)
+
+    def generate_variants(self, stored: Optional[str]) -> None:
+        """Queue the resized variants of a stored image; called once the row using it is committed"""
+        name = media_name(stored)
+        if name is not None:
+            self.variant_worker.submit(name)
+
+    def get_variants(self, stored: Iterable[Optional[str]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Variant URLs (narrowest first) with their dimensions for each stored image path, in one query"""
+        names = {image: media_name(image) for image in stored}
+        hashes = {image: name.split('.', 1)[0] for image, name in names.items() if name is not None}
+        if not hashes:
+            return {}
+
+        # Every width is written in all formats; the URL picks one from the Accept header
+        by_hash: Dict[str, List[Dict[str, Any]]] = {}
+        for row in self.media_repository.get_variants(sorted(set(hashes.values())), format='jpeg'):
+            by_hash.setdefault(row.sha256, []).append({"width": row.width, "height": row.height})
+        return {
+            image: [dict(variant, url=f"{image}?w={variant['width']}") for variant in by_hash[sha256]]
+            for image, sha256 in hashes.items() if sha256 in by_hash
+        }
+
+    def _accepts_webp(self) -> bool:
+        # Wildcards do not count: clients that list image/webp explicitly are known to decode it
+        return any(value == 'image/webp' and quality > 0 for value, quality in request.accept_mimetypes)
+
+    def _find_variant(self, name: str, width: int) -> Optional[str]:
+        """The narrowest existing variant at least width pixels wide, in the best accepted format"""
+        formats = [format for format in VARIANT_FORMATS if format != 'webp' or self._accepts_webp()]
+        folder = os.path.dirname(self.path_for(name))
+        for variant_width in VARIANT_WIDTHS:
+            if variant_width < width:
+                continue
+            for format in formats:
+                candidate = variant_name(name, variant_width, format)
+                if os.path.exists(os.path.join(folder, candidate)):
+                    return candidate
+        return None
+
+    def send(self, filename: str, legacy_folder: str, width: Optional[int] = None):
+        """Serve an image by the file name in its URL.
+
+        Media names are read from the sharded store and cached as immutable, with the served
+        file name as strong ETag. Other names are uploads from before it that the media migration
+        could not move, still served from their original folder (whose name is also its internal
+        nginx location). With width, the narrowest variant at least that wide is sent instead
+        when one exists (WebP to clients that accept it), falling back to the original.
+        """
+        if media_name(filename) is None:
+            return send_internal_file(legacy_folder, os.path.basename(legacy_folder), filename, max_age=LEGACY_MAX_AGE)
+        if width is None:
+            return send_internal_file(
+                self.media_root, MEDIA_LOCATION, media_relative_path(filename),
+                etag=filename, max_age=IMMUTABLE_MAX_AGE, immutable=True
+            )
+
+        variant = self._find_variant(filename, width)
+        served = variant or filename
+        response = send_internal_file(
+            self.media_root, MEDIA_LOCATION, media_relative_path(served), etag=served,
+            max_age=IMMUTABLE_MAX_AGE if variant else PENDING_VARIANT_MAX_AGE, immutable=variant is not None
+        )
+        response.vary.add('Accept')
+        return response
@@ -1,21 +1,33 @@
 from app.interfaces.services.IPaymentService import IPaymentService
 from app.interfaces.repositories.IUserRepository import IUserRepository
 from app.repositories.user_repository import UserRepository
+from app.cache import TokenVersionCache
+from app.extensions import token_versions as default_token_versions
+from app.utils.user_context import UserContext
 from flask import current_app
 import stripe
 import os
 from typing import Dict, Tuple, Optional, Any
 
 class PaymentService(IPaymentService):
-    def __init__(self, user_repository: IUserRepository = None):
+    def __init__(self, user_repository: IUserRepository = None, token_versions: TokenVersionCache = None):
         self.user_repository = user_repository or UserRepository()
+        self.token_versions = token_versions or default_token_versions
         stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
         self.price_id = os.environ.get('STRIPE_PRICE_ID')
         self.domain_url = os.environ.get('FRONTEND_ROUTE')
     
-    def create_checkout_session(self, user_id: int) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
-        """Create a new checkout session"""
+    def create_checkout_session(self, user_id: int, context: Optional[UserContext] = None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Create a new checkout session.
+
+        A token context claiming premium is rejected without a query; otherwise membership is
+        re-checked in the database, since the claims may predate an upgrade.
+        """
         try:
+            if context is not None and context.membership == 'premium':
+                current_app.logger.warning(f"User {user_id} already has premium membership")
+                return None, "User already has premium membership"
+            
             # Check if user exists
             user = self.user_repository.get_by_id(user_id)
             if not user:
@@ -83,6 +95,8 @@ class PaymentService(IPaymentService):
             if not user:
                 current_app.logger.error(f"Failed to update membership for user {user_id}")
                 return False, user_id, "Failed to update user membership"
+            # Access tokens still claiming the old membership are refreshed
+            self.token_versions.bump(user_id, user.token_version)
             
             current_app.logger.info(f"User {user_id} membership upgraded to premium")
             return True, user_id, None
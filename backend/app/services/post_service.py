@@ -5,75 +5,151 @@ from app.interfaces.repositories.IUserRepository import IUserRepository
 from app.repositories.post_repository import PostRepository
 from app.repositories.like_repository import LikeRepository
 from app.repositories.user_repository import UserRepository
+from app.interfaces.services.IMediaService import IMediaService
+from app.services.media_service import MediaService
 from app.models.posts import Post
-from flask import current_app, send_from_directory
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.json_provider import RawJSON, dumps_bytes
+from app.utils.conditional import make_etag
+from app.cache import FeedCache, LikedSetCache
+from app.buffers import LikeWriteBuffer
+from app.extensions import feed_cache as default_feed_cache, liked_set_cache as default_liked_set_cache, like_buffer as default_like_buffer
+from flask import current_app
 from typing import Dict, List, Optional, Any, Tuple
-import os
-import time
-import magic
+import re
 
 ALLOWED_MIME_TYPES = {'image/jpeg', 'image/png'}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+UPLOAD_FOLDER = '/data/post_uploads'
+
+# Every encoded feed post starts with its (viewer-independent) liked flag followed by its id
+FEED_LIKED_POST_PREFIX = b'{"liked":true,"post_id":%d,'
+FEED_POST_ID_RE = re.compile(rb'\{"liked":false,"post_id":(\d+),')
 
 class PostService(IPostService):
-    def __init__(self, user_repository: IUserRepository = None, post_repository: IPostRepository = None, like_repository: ILikeRepository = None):
+    def __init__(self, user_repository: IUserRepository = None, post_repository: IPostRepository = None, like_repository: ILikeRepository = None, feed_cache: FeedCache = None, like_buffer: LikeWriteBuffer = None, liked_set_cache: LikedSetCache = None, media_service: IMediaService = None):
         self.post_repository = post_repository or PostRepository()
         self.like_repository = like_repository or LikeRepository()
         self.user_repository = user_repository or UserRepository()
-        self.UPLOAD_FOLDER = '/data/post_uploads'
+        self.feed_cache = feed_cache or default_feed_cache
+        self.like_buffer = like_buffer or default_like_buffer
+        self.liked_set_cache = liked_set_cache or default_liked_set_cache
+        self.media_service = media_service or MediaService()
+        self.UPLOAD_FOLDER = UPLOAD_FOLDER
     
     def _is_allowed_file(self, filename: str) -> bool:
         allowed_extensions = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
         return '.' in filename and filename.rsplit('.', 1)[1].lower() in allowed_extensions
     
-    def _is_valid_mime(self, file) -> bool:
-        file.seek(0)
-        mime = magic.from_buffer(file.read(2048), mime=True)
-        file.seek(0)
-        return mime in ALLOWED_MIME_TYPES
-
-    def _is_valid_size(self, file) -> bool:
-        file.seek(0, os.SEEK_END)
-        size = file.tell()
-        file.seek(0)
-        return size <= MAX_FILE_SIZE
-
-    def get_posts(self, sort_by: str = 'recent', offset: int = 0, limit: int = 10, search: Optional[str] = None, user_id: Optional[int] = None) -> Dict[str, Any]:
+    def _with_viewer_likes(self, page: bytes, liked_post_ids: List[int]) -> RawJSON:
+        """Splice the viewer's liked flags into an encoded, viewer-independent feed page"""
+        liked = set(liked_post_ids)
+        liked_in_page = []
+
+        def mark(match):
+            post_id = int(match.group(1))
+            if post_id not in liked:
+                return match.group(0)
+            liked_in_page.append(post_id)
+            return FEED_LIKED_POST_PREFIX % post_id
+
+        if liked:
+            page = FEED_POST_ID_RE.sub(mark, page)
+        return RawJSON(page[:-1] + b',"liked_post_ids":' + dumps_bytes(liked_in_page) + b'}')
+
+    def get_posts(self, sort_by: str = 'recent', offset: int = 0, limit: int = 10, search: Optional[str] = None, user_id: Optional[int] = None, cursor: Optional[str] = None, viewer_id: Optional[int] = None, preview_chars: Optional[int] = None) -> RawJSON:
         try:
+            # Cursors are opaque to clients; an invalid one raises ValueError
+            seek = decode_cursor(cursor, sort_by, datetime_value=(sort_by == 'recent')) if cursor else None
+
+            # Serve the page straight from the shared cache when possible
+            cache_key = self.feed_cache.make_key(sort_by, cursor, offset, limit, search, user_id, preview_chars)
+            cached = self.feed_cache.get(cache_key)
+            if cached is not None:
+                current_app.logger.info(f"Feed cache hit for sort {sort_by}, offset {offset}, cursor {cursor}")
+                post_ids = [int(pid) for pid in FEED_POST_ID_RE.findall(cached)]
+                liked = self.get_user_liked_posts(viewer_id, post_ids) if viewer_id is not None and post_ids else []
+                if viewer_id is not None:
+                    liked = self.like_buffer.overlay_liked(viewer_id, post_ids, liked)
+                return self._with_viewer_likes(cached, liked)
+
+            # Fetch one extra row to find out whether another page exists
             posts = self.post_repository.get_posts(
                 sort_by=sort_by,
-                limit=limit,
+                limit=limit + 1,
                 offset=offset,
                 search=search,
-                user_id=user_id
+                user_id=user_id,
+                cursor=seek,
+                viewer_id=viewer_id,
+                preview_chars=preview_chars
             )
+            has_more = len(posts) > limit
+            posts = posts[:limit]
             
+            # Resized copies of the page's images, in one query
+            image_variants = self.media_service.get_variants(post.image for post in posts if post.image)
+
             # Format response
             formatted_posts = []
             for post in posts:
+                # Previews come back one character long when the content was cut
+                content = post.content
+                truncated = preview_chars is not None and len(content) > preview_chars
                 formatted_post = {
+                    "liked": False,
                     "post_id": post.post_id,
                     "title": post.title,
-                    "content": post.content,
-                    "created_at": post.created_at.isoformat(),
-                    "updated_at": post.updated_at.isoformat() if post.updated_at else None,
+                    "content": content[:preview_chars] if truncated else content,
+                    "content_truncated": truncated,
+                    "created_at": post.created_at,
+                    "updated_at": post.updated_at,
                     "user_id": post.user_id,
-                    "username": post.user.username,
-                    "profile_picture": post.user.profile_picture,
+                    "username": post.username,
+                    "profile_picture": post.profile_picture,
                     "image": post.image,
-                    "likes": post.likes_count if hasattr(post, 'likes_count') else 0,
-                    "comments": post.comments_count if hasattr(post, 'comments_count') else 0
+                    "image_variants": image_variants.get(post.image, []),
+                    "likes": post.likes_count,
+                    "comments": post.comments_count
                 }
                 formatted_posts.append(formatted_post)
+
+            next_cursor = None
+            if has_more:
+                last = posts[-1]
+                if sort_by == 'likes':
+                    sort_value = last.likes_count
+                elif sort_by == 'comments':
+                    sort_value = last.comments_count
+                elif sort_by == 'relevance':
+                    sort_value = last.relevance
+                else:
+                    sort_value = last.updated_at
+                next_cursor = encode_cursor(sort_by, sort_value, last.post_id)
             
             result = {
                 "posts": formatted_posts,
                 "offset": offset,
                 "limit": limit,
-                "has_more": len(posts) == limit
+                "has_more": has_more,
+                "next_cursor": next_cursor
             }
-            current_app.logger.info(f"Retrieved {len(posts)} posts for offset {offset}")
-            return result
+            current_app.logger.info(f"Retrieved {len(posts)} posts for offset {offset}, cursor {cursor}")
+
+            # Tag the page so writes can drop exactly the pages they affect
+            tags = [self.feed_cache.scope_tag(user_id), self.feed_cache.sort_tag(sort_by)]
+            tags += [self.feed_cache.post_tag(post["post_id"]) for post in formatted_posts]
+            tags += [self.feed_cache.author_tag(author) for author in {post["user_id"] for post in formatted_posts}]
+            if search:
+                tags.append(FeedCache.SEARCH_TAG)
+            page = dumps_bytes(result)
+            self.feed_cache.set(cache_key, page, tags)
+
+            # The viewer's liked flags came back with the rows; they are never cached
+            liked = [post.post_id for post in posts if getattr(post, 'liked_by_viewer', False)]
+            if viewer_id is not None:
+                liked = self.like_buffer.overlay_liked(viewer_id, [post.post_id for post in posts], liked)
+            return self._with_viewer_likes(page, liked)
         except Exception as e:
             current_app.logger.error(f"Error getting posts: {str(e)}")
             raise
@@ -81,31 +157,26 @@ class PostService(IPostService):
     def toggle_like(self, post_id: int, user_id: int) -> Tuple[Dict[str, Any], Optional[str]]:
         """Toggle like status for a post"""
         try:
-            # Get post
-            post = self.post_repository.get_by_id(post_id)
-            if not post:
+            # In write-behind mode the toggle is buffered and the flusher invalidates the feed;
+            # otherwise check and write happen in one transaction that also returns the new count
+            buffered = self.like_buffer.enabled
+            if buffered:
+                result = self.like_buffer.toggle(user_id, post_id)
+            else:
+                result = self.like_repository.toggle(user_id, post_id)
+            if result is None:
                 current_app.logger.warning(f"Like attempt on non-existent post {post_id}")
                 return None, "Post not found"
-                
-            # Check if user already liked this post
-            existing_like = self.like_repository.get_by_user_and_post(user_id, post_id)
-            
-            if existing_like:
-                # Remove like
-                self.like_repository.delete(existing_like)
-                current_app.logger.info(f"User {user_id} unliked post {post_id}")
-            else:
-                # Add like
-                self.like_repository.create({
-                    'post_id': post_id,
-                    'user_id': user_id
-                })
-                current_app.logger.info(f"User {user_id} liked post {post_id}")
-                
-            # Count likes
-            likes_count = self.like_repository.count_likes_for_post(post_id)
+
+            liked, likes_count = result
+            current_app.logger.info(f"User {user_id} {'liked' if liked else 'unliked'} post {post_id}")
+            self.liked_set_cache.apply_toggle(user_id, post_id, liked)
+
+            # Like counts are shown on every page holding the post and drive the likes ordering
+            if not buffered:
+                self.feed_cache.invalidate(self.feed_cache.post_tag(post_id), self.feed_cache.sort_tag('likes'))
             
-            return {"likes": likes_count}, None
+            return {"likes": likes_count, "liked": liked}, None
             
         except Exception as e:
             current_app.logger.error(f"Error toggling like: {str(e)}")
@@ -125,8 +196,17 @@ class PostService(IPostService):
                 current_app.logger.warning(f"Unauthorized delete attempt on post {post_id} by user {user_id}")
                 return False, "Unauthorized: You can only delete your own posts"
             
-            # Now delete the post
+            # Now delete the post, then drop the references its images (and its comments') held
+            images = self.post_repository.get_media_references(post_id)
             self.post_repository.delete(post)
+
+            # Later rows shift up on every page in the post's scopes; the pages go before the images do
+            self.feed_cache.invalidate(
+                self.feed_cache.post_tag(post_id),
+                self.feed_cache.scope_tag(),
+                self.feed_cache.scope_tag(post.user_id)
+            )
+            self.media_service.release_all(images)
             
             current_app.logger.info(f"Post {post_id} deleted by user {user_id}")
             return True, "Post deleted successfully"
@@ -139,39 +219,98 @@ class PostService(IPostService):
     def get_user_liked_posts(self, user_id: int, post_ids: Optional[List[int]] = None) -> List[int]:
         """Get IDs of posts liked by a specific user"""
         try:
-            return self.like_repository.get_user_liked_post_ids(user_id, post_ids)
+            if not post_ids or not self.liked_set_cache.enabled:
+                return self.like_repository.get_user_liked_post_ids(user_id, post_ids)
+
+            # Answer page-sized lookups from the user's cached liked set, loading it once
+            liked = self.liked_set_cache.liked_among(user_id, post_ids)
+            if liked is None:
+                snapshot = self.liked_set_cache.begin_load(user_id)
+                all_liked = self.like_repository.get_user_liked_post_ids(user_id)
+                self.liked_set_cache.store(user_id, all_liked, snapshot)
+                all_liked = set(all_liked)
+                liked = [post_id for post_id in post_ids if post_id in all_liked]
+            return liked
         except Exception as e:
             current_app.logger.error(f"Error getting user liked posts: {str(e)}")
             return []
         
     def get_post_detail(self, post_id: int, current_user_id: int) -> Optional[Dict[str, Any]]:
         try:
-            post = self.post_repository.get_post_by_id(post_id)
+            # The viewer's liked flag is computed in the same statement
+            post = self.post_repository.get_post_by_id(post_id, viewer_id=current_user_id)
             if not post:
                 return None
             
-            # Check if current user liked the post
-            liked_post_ids = self.get_user_liked_posts(current_user_id, [post_id])
-            liked = post_id in liked_post_ids
+            liked = bool(getattr(post, 'liked_by_viewer', False))
+            buffered_state = self.like_buffer.liked_state(current_user_id, post_id)
+            if buffered_state is not None:
+                liked = buffered_state
             
             return {
                 "post_id": post.post_id,
                 "title": post.title,
                 "content": post.content,
-                "created_at": post.created_at.isoformat(),
-                "updated_at": post.updated_at.isoformat() if post.updated_at else None,
+                "created_at": post.created_at,
+                "updated_at": post.updated_at,
                 "user_id": post.user_id,
                 "username": post.user.username,
                 "profile_picture": post.user.profile_picture,
-                "likes": post.likes_count if hasattr(post, 'likes_count') else 0,
+                "likes": post.likes_count + self.like_buffer.likes_delta(post_id),
                 "comments": post.comments_count if hasattr(post, 'comments_count') else 0,
                 "liked": liked,
-                "image": post.image
+                "image": post.image,
+                "image_variants": self.media_service.get_variants([post.image]).get(post.image, [])
             }
         except Exception as e:
             current_app.logger.error(f"Error getting post detail {post_id}: {str(e)}")
             raise
 
+    def get_post_etag(self, post_id: int, current_user_id: int) -> Optional[str]:
+        """ETag of the post detail, from a probe that skips the full post row.
+
+        Like/comment counters do not bump updated_at, so they (and the viewer's liked flag)
+        are part of the tag; None means the post does not exist. Equal to get_detail_etag of
+        the detail served at the same moment.
+        """
+        try:
+            version = self.post_repository.get_post_version(post_id, viewer_id=current_user_id)
+            if not version:
+                return None
+            # Buffered (not yet flushed) likes change the body too
+            liked = self.like_buffer.liked_state(current_user_id, post_id)
+            if liked is None:
+                liked = bool(getattr(version, 'liked_by_viewer', False))
+            return self._detail_etag(
+                post_id,
+                version.updated_at,
+                version.likes_count + self.like_buffer.likes_delta(post_id),
+                version.comments_count,
+                version.username,
+                version.profile_picture,
+                liked
+            )
+        except Exception as e:
+            current_app.logger.error(f"Error getting post etag {post_id}: {str(e)}")
+            raise
+
+    def get_detail_etag(self, detail: Dict[str, Any]) -> str:
+        """ETag of an already loaded post detail, without another query"""
+        return self._detail_etag(
+            detail["post_id"],
+            detail["updated_at"],
+            detail["likes"],
+            detail["comments"],
+            detail["username"],
+            detail["profile_picture"],
+            detail["liked"]
+        )
+
+    @staticmethod
+    def _detail_etag(post_id: int, updated_at, likes: int, comments: int, username: str,
+                     profile_picture: Optional[str], liked: bool) -> str:
+        return make_etag(post_id, updated_at, likes, comments, username, profile_picture, liked)
+
     def create_post(self, title: str, content: str, image_file, user_id: int) -> Post:
         try:
             image_url = None
@@ -181,26 +320,21 @@ class PostService(IPostService):
                 if not self._is_allowed_file(image_file.filename):
                     raise ValueError("File type not allowed")
                 
-                if not self._is_valid_mime(image_file):
-                    raise ValueError("Invalid file content")
-            
-                if not self._is_valid_size(image_file):
-                    raise ValueError("File too large")
-                
-                # Generate unique filename
-                filename = f"user_{user_id}_{int(time.time())}.{image_file.filename.rsplit('.', 1)[1].lower()}"
-                filepath = os.path.join(self.UPLOAD_FOLDER, filename)
-
-                # Create uploads directory if it doesn't exist
-                os.makedirs(self.UPLOAD_FOLDER, exist_ok=True)
-
-                # Save image
-                image_file.save(filepath)
+                # Content type and size are checked while the file is stored; raises ValueError
+                filename = self.media_service.store(image_file, MAX_FILE_SIZE, ALLOWED_MIME_TYPES)
                 image_url = f"/post_uploads/{filename}"
-                current_app.logger.info(f"Image saved at {filepath}")
 
             # Save post using repository
-            return self.post_repository.create_post(title, content, image_url, user_id)
+            try:
+                post = self.post_repository.create_post(title, content, image_url, user_id)
+            except Exception:
+                self.media_service.release(image_url)
+                raise
+
+            # A new post shifts every page of the global and author feeds
+            self.feed_cache.invalidate(self.feed_cache.scope_tag(), self.feed_cache.scope_tag(user_id))
+            self.media_service.generate_variants(image_url)
+            return post
 
         except Exception as e:
             current_app.logger.error(f"Failed to create post: {str(e)}")
@@ -218,64 +352,74 @@ class PostService(IPostService):
                 current_app.logger.warning(f"User {user_id} unauthorized to update post {post_id}.")
                 return None
 
-            image_url = post.image  # Default to existing image
+            old_image = image_url = post.image  # Default to existing image
+            stored_image = None
             if image_file and image_file.filename:
                 # Validate file
                 if not self._is_allowed_file(image_file.filename):
                     raise ValueError("File type not allowed")
-                # Yan Cong this part not tested but should work, cause the edit not working
-                if not self._is_valid_mime(image_file):
-                    raise ValueError("Invalid file content")
-            
-                if not self._is_valid_size(image_file):
-                    raise ValueError("File too large")
-
-                # Generate new filename
-                filename = f"user_{user_id}_{int(time.time())}.{image_file.filename.rsplit('.', 1)[1].lower()}"
-                filepath = os.path.join(self.UPLOAD_FOLDER, filename)
-
-                # Ensure upload folder exists
-                os.makedirs(self.UPLOAD_FOLDER, exist_ok=True)
-
-                # Save file
-                image_file.save(filepath)
-                image_url = f"/post_uploads/{filename}"
-                current_app.logger.info(f"Updated image saved at {filepath}")
+                # Validate and store the file in one pass
+                filename = self.media_service.store(image_file, MAX_FILE_SIZE, ALLOWED_MIME_TYPES)
+                stored_image = image_url = f"/post_uploads/{filename}"
 
             # Call repository update method
-            return self.post_repository.edit_post(
-                post_id=post_id,
-                title=title,
-                content=content,
-                image_url=image_url
+            try:
+                updated = self.post_repository.edit_post(
+                    post_id=post_id,
+                    title=title,
+                    content=content,
+                    image_url=image_url
+                )
+            except Exception:
+                if stored_image is not None:
+                    self.media_service.release(stored_image)
+                raise
+
+            # Editing bumps updated_at (recent ordering) and may change search matches;
+            # pages showing the old image are dropped before it is released
+            self.feed_cache.invalidate(
+                self.feed_cache.post_tag(post_id),
+                self.feed_cache.sort_tag('recent'),
+                FeedCache.SEARCH_TAG
             )
+            if stored_image is not None:
+                # The post keeps one reference: the new image's if the edit went through, the old one's if not
+                self.media_service.release(old_image if updated is not None else stored_image)
+                if updated is not None:
+                    self.media_service.generate_variants(stored_image)
+            return updated
 
         except Exception as e:
             current_app.logger.error(f"Error updating post {post_id}: {str(e)}")
             raise
 
-    def get_post_image(self, filename):
+    def get_post_image(self, filename, width: Optional[int] = None):
         """Serve post image from post_uploads folder"""
         try:
             # Security check - prevent directory traversal
             if '..' in filename or filename.startswith('/'):
                 raise ValueError("Invalid filename")
                 
-            return send_from_directory(self.UPLOAD_FOLDER, filename)
+            return self.media_service.send(filename, self.UPLOAD_FOLDER, width)
         except Exception as e:
             current_app.logger.error(f"Error serving file {filename}: {str(e)}")
             raise
 
-    def has_reached_daily_post_limit(self, user_id: int) -> bool:
-        """Check if user has reached the daily post limit."""
+    def has_reached_daily_post_limit(self, user_id: int, membership: Optional[str] = None) -> bool:
+        """Check if user has reached the daily post limit.
+
+        membership comes from the access token's user context when the caller has it; the user
+        is only loaded without it.
+        """
         try:
-            user = self.user_repository.get_by_id(user_id)
-            if not user:
-                current_app.logger.warning(f"Profile request for non-existent user {user_id}")
-                return None, "User not found"
+            if membership is None:
+                user = self.user_repository.get_by_id(user_id)
+                if not user:
+                    current_app.logger.warning(f"Profile request for non-existent user {user_id}")
+                    return None, "User not found"
+                membership = user.membership
                 
-            # Format response
-            user_membership = user.membership
+            user_membership = membership
             # Determine daily post limit based on membership
             if user_membership == "basic":
                 daily_post_limit = 3
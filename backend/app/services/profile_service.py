@@ -1,43 +1,44 @@
 import os
-import time
-import magic
 from app.interfaces.services.IProfileService import IProfileService
 from app.interfaces.repositories.IUserRepository import IUserRepository
 from app.interfaces.repositories.IPostRepository import IPostRepository
-from app.repositories.user_repository import UserRepository
+from app.repositories.user_repository import UserRepository, UserConflictError, UNIQUE_FIELDS
 from app.repositories.post_repository import PostRepository
-from flask import current_app, send_from_directory
+from app.interfaces.services.IMediaService import IMediaService
+from app.services.media_service import MediaService
+from flask import current_app
 from app.utils.validation import is_valid_email
+from app.utils.uploads import INVALID_CONTENT_ERROR
 from typing import Dict, Tuple, Any, Optional, List
-from werkzeug.security import generate_password_hash
+from app.workers import PasswordHasher
+from app.cache import FeedCache, TokenVersionCache
+from app.extensions import feed_cache as default_feed_cache, password_hasher as default_password_hasher, token_versions as default_token_versions
 
 ALLOWED_MIME_TYPES = {'image/jpeg', 'image/png'}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
+UPLOAD_FOLDER = '/data/uploads'
 USER_NOT_FOUND_ERROR = "User not found"
+PROFILE_CONFLICT_ERRORS = {
+    'username': "Username is already in use",
+    'email': "Email is already in use",
+}
 
 class ProfileService(IProfileService):
-    def __init__(self, user_repository: IUserRepository = None, post_repository: IPostRepository = None):
+    def __init__(self, user_repository: IUserRepository = None, post_repository: IPostRepository = None, media_service: IMediaService = None, password_hasher: PasswordHasher = None,
+                 token_versions: TokenVersionCache = None, feed_cache: FeedCache = None):
         self.user_repository = user_repository or UserRepository()
         self.post_repository = post_repository or PostRepository()
-        self.UPLOAD_FOLDER = '/data/uploads'
+        self.media_service = media_service or MediaService()
+        self.password_hasher = password_hasher or default_password_hasher
+        self.token_versions = token_versions or default_token_versions
+        self.feed_cache = feed_cache or default_feed_cache
+        self.UPLOAD_FOLDER = UPLOAD_FOLDER
 
     def _is_allowed_file(self, filename: str) -> bool:
         """Check if the file extension is allowed"""
         return '.' in filename and \
                filename.rsplit('.', 1)[1].lower() in {'png', 'jpg', 'jpeg'}
     
-    def _is_valid_mime(self, file) -> bool:
-        file.seek(0)
-        mime = magic.from_buffer(file.read(2048), mime=True)
-        file.seek(0)
-        return mime in ALLOWED_MIME_TYPES
-
-    def _is_valid_size(self, file) -> bool:
-        file.seek(0, os.SEEK_END)
-        size = file.tell()
-        file.seek(0)
-        return size <= MAX_FILE_SIZE
-    
     def get_user_profile(self, user_id: int) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
         """Get user profile data"""
         try:
@@ -76,26 +77,40 @@ class ProfileService(IProfileService):
             # Validate data
             profile_data = {}
             if 'email' in data:
-                error = self._validate_email(data['email'], user)
+                error = self._validate_email(data['email'])
                 if error:
                     return None, error
                 profile_data['email'] = data['email']
             
             if 'username' in data:
-                error = self._validate_username(data['username'], user)
+                error = self._validate_username(data['username'])
                 if error:
                     return None, error
                 profile_data['username'] = data['username']
 
+            # Only changed values can collide; both are checked in one query
+            changed = {field: profile_data[field] for field in UNIQUE_FIELDS
+                       if field in profile_data and profile_data[field] != getattr(user, field)}
+            conflicts = self.user_repository.find_conflicts(exclude_user_id=user.user_id, **changed)
+            if conflicts:
+                return None, self._conflict_error(conflicts)
+
             if 'password' in data:
-                hashed_password = generate_password_hash(data['password'])
+                hashed_password = self.password_hasher.hash(data['password'])
                 profile_data['password'] = hashed_password
             
-            # Update user profile
-            updated_user = self.user_repository.update(user, profile_data)
+            # Update user profile; a value taken since the check above is reported the same way
+            try:
+                updated_user = self.user_repository.update(user, profile_data)
+            except UserConflictError as e:
+                return None, self._conflict_error(e.fields)
             if not updated_user:
                 current_app.logger.warning(f"Failed to update profile for user: {user_id}")
                 return None, "Failed to update profile"
+            if 'username' in changed:
+                # The username is part of the access token claims and of the user's cached feed posts
+                self.token_versions.bump(updated_user.user_id, updated_user.token_version)
+                self.feed_cache.invalidate(self.feed_cache.author_tag(updated_user.user_id))
                 
             # Format response
             user_data = {
@@ -114,20 +129,19 @@ class ProfileService(IProfileService):
             current_app.logger.error(f"Error updating profile: {str(e)}")
             raise
 
-    def _validate_email(self, email: str, user) -> Optional[str]:
+    def _validate_email(self, email: str) -> Optional[str]:
         if not is_valid_email(email):
             return "Invalid email format"
-        if email != user.email and self.user_repository.check_email_exists(email):
-            return "Email is already in use"
         return None
 
-    def _validate_username(self, username: str, user) -> Optional[str]:
+    def _validate_username(self, username: str) -> Optional[str]:
         if len(username) < 3:
             return "Username must be at least 3 characters"
-        if username != user.username and self.user_repository.check_username_exists(username):
-            return "Username is already in use"
         return None
 
+    def _conflict_error(self, conflicts) -> str:
+        return next(PROFILE_CONFLICT_ERRORS[field] for field in UNIQUE_FIELDS if field in conflicts)
+
     def update_profile_picture(self, user_id: int, file) -> Tuple[Optional[str], Optional[str]]:
         try:
             if not file or file.filename == '':
@@ -136,55 +150,52 @@ class ProfileService(IProfileService):
             if not self._is_allowed_file(file.filename):
                 return None, "File type not allowed"
             
-            if not self._is_valid_mime(file):
-                return None, "Invalid file content (MIME type check failed)"
-        
-            if not self._is_valid_size(file):
-                return None, "File too large"
+            # Validate and store the file in one pass
+            try:
+                filename = self.media_service.store(file, MAX_FILE_SIZE, ALLOWED_MIME_TYPES)
+            except ValueError as e:
+                if str(e) == INVALID_CONTENT_ERROR:
+                    return None, "Invalid file content (MIME type check failed)"
+                return None, str(e)
             
             # Get the user's current profile picture if it exists
             user = self.user_repository.get_by_id(user_id)
-            if user and user.profile_picture:
+            old_picture = user.profile_picture if user else None
+
+            relative_url = f"/uploads/{filename}"
+            try:
+                self.user_repository.update_profile_picture(user_id, relative_url)
+            except Exception:
+                self.media_service.release(relative_url)
+                raise
+            # Cached pages show the old picture, which may be deleted below
+            self.feed_cache.invalidate(self.feed_cache.author_tag(user_id))
+            self.media_service.generate_variants(relative_url)
+
+            # Drop the old picture's reference; uploads from before the media store are deleted directly
+            if old_picture and not self.media_service.release(old_picture):
                 try:
-                    # Extract filename from the stored path
-                    old_filename = user.profile_picture.split('/')[-1] 
-                    old_filepath = os.path.join(self.UPLOAD_FOLDER, old_filename)
-                    
-                    # Delete the old file if it exists
+                    old_filepath = os.path.join(self.UPLOAD_FOLDER, old_picture.split('/')[-1])
                     if os.path.exists(old_filepath):
                         os.remove(old_filepath)
                         current_app.logger.info(f"Deleted old profile picture: {old_filepath}")
                 except Exception as e:
                     current_app.logger.error(f"Error deleting old profile picture: {str(e)}")
             
-            # Generate a unique filename to avoid collisions
-            filename = f"user_{user_id}_{int(time.time())}.{file.filename.rsplit('.', 1)[1].lower()}"
-            filepath = os.path.join(self.UPLOAD_FOLDER, filename)
-            
-            # Ensure upload directory exists
-            os.makedirs(self.UPLOAD_FOLDER, exist_ok=True)
-            
-            # Save file
-            file.save(filepath)
-            current_app.logger.info(f"Saved new profile picture to: {filepath}")
-            
-            relative_url = f"/uploads/{filename}"  
-            self.user_repository.update_profile_picture(user_id, relative_url)
-            
             return relative_url, None
             
         except Exception as e:
             current_app.logger.error(f"Upload failed: {str(e)}")
             raise
         
-    def get_profile_image(self, filename):
+    def get_profile_image(self, filename, width: Optional[int] = None):
         """Serve profile image from uploads folder"""
         try:
             # Security check - prevent directory traversal
             if '..' in filename or filename.startswith('/'):
                 raise ValueError("Invalid filename")
                 
-            return send_from_directory(self.UPLOAD_FOLDER, filename)
+            return self.media_service.send(filename, self.UPLOAD_FOLDER, width)
         except Exception as e:
             current_app.logger.error(f"Error serving file {filename}: {str(e)}")
             raise 
@@ -196,8 +207,16 @@ class ProfileService(IProfileService):
             if not user:
                 return False, USER_NOT_FOUND_ERROR
             
-            # Delete user from database
+            # Delete user from database, then drop the references its images held
+            images = self.user_repository.get_media_references(user_id)
             self.user_repository.delete(user)
+            # Cached pages still list the deleted posts and their images, and later rows shift up
+            self.feed_cache.invalidate(
+                self.feed_cache.author_tag(user_id),
+                self.feed_cache.scope_tag(),
+                self.feed_cache.scope_tag(user_id)
+            )
+            self.media_service.release_all(images)
             return True, None
             
         except Exception as e:
@@ -228,9 +247,9 @@ class ProfileService(IProfileService):
                     "post_id": post.post_id,
                     "title": post.title,
                     "content": post.content,
-                    "created_at": post.created_at.isoformat(),
-                    "likes": post.likes_count if hasattr(post, 'likes_count') else 0,
-                    "comments": post.comments_count if hasattr(post, 'comments_count') else 0
+                    "created_at": post.created_at,
+                    "likes": post.likes_count,
+                    "comments": post.comments_count
                 }
                 formatted_posts.append(formatted_post)
             
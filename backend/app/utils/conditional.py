@@ -0,0 +1,37 @@
+import hashlib
+from datetime import datetime
+from typing import Any, Optional
+
+from flask import current_app, request
+from werkzeug.http import is_resource_modified
+
+def make_etag(*parts: Any) -> str:
+    """Build an ETag from the version fields a response depends on (not from its body bytes)"""
+    raw = "|".join(part.isoformat() if isinstance(part, datetime) else str(part) for part in parts)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:24]
+
+def is_conditional() -> bool:
+    """Whether the current request carries If-None-Match or If-Modified-Since"""
+    return "If-None-Match" in request.headers or "If-Modified-Since" in request.headers
+
+def is_not_modified(etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since of the current request against the validators"""
+    if last_modified is not None:
+        last_modified = last_modified.replace(microsecond=0)
+    return not is_resource_modified(request.environ, etag=etag, last_modified=last_modified)
+
+def with_validators(response, etag: str, last_modified: Optional[datetime] = None):
+    """Attach validators to a (200 or 304) response.
+
+    Bodies depend on the authenticated viewer, so they may only live in the client's own cache
+    and must be revalidated on every use.
+    """
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified.replace(microsecond=0)
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.update(("Authorization", "Cookie"))
+    return response
+
+def not_modified_response(etag: str, last_modified: Optional[datetime] = None):
+    return with_validators(current_app.response_class(status=304), etag, last_modified)
@@ -0,0 +1,49 @@
+import mimetypes
+from typing import Optional
+
+from flask import current_app, send_from_directory
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+from app.utils.conditional import is_not_modified
+
+# Content-addressed files never change under their name
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+def _cache_headers(response, etag: Optional[str], max_age: int, immutable: bool):
+    if etag is not None:
+        response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    if immutable:
+        response.cache_control.immutable = True
+    return response
+
+def send_internal_file(directory: str, location: str, path: str, etag: Optional[str] = None,
+                       max_age: int = 0, immutable: bool = False):
+    """Serve directory/path, through nginx when MEDIA_ACCEL_REDIRECT is enabled.
+
+    Behind nginx the view returns an empty response whose X-Accel-Redirect points at the internal
+    location MEDIA_ACCEL_PREFIX/location/path, so nginx sends the file and the Python worker is
+    free as soon as the headers are written. Conditional requests matching etag (a strong ETag,
+    for files whose name determines their content) are answered with 304 here. Without nginx the
+    file is sent from disk with the same validators and caching headers.
+    """
+    if not current_app.config.get('MEDIA_ACCEL_REDIRECT', False):
+        response = send_from_directory(directory, path, etag=etag if etag is not None else True, max_age=max_age)
+        if immutable:
+            response.cache_control.immutable = True
+        return response
+
+    internal_path = safe_join(f"{current_app.config['MEDIA_ACCEL_PREFIX'].rstrip('/')}/{location}", path)
+    if internal_path is None:
+        raise NotFound()
+
+    if etag is not None and is_not_modified(etag):
+        return _cache_headers(current_app.response_class(status=304), etag, max_age, immutable)
+
+    # nginx keeps this Content-Type (and Cache-Control) when it follows the redirect
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    response = current_app.response_class(mimetype=mimetype)
+    response.headers['X-Accel-Redirect'] = internal_path
+    return _cache_headers(response, etag, max_age, immutable)
@@ -0,0 +1,83 @@
+import json
+from datetime import date
+from typing import Any, Union
+
+from flask.json.provider import DefaultJSONProvider, _default as flask_default
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt, stdlib json is the fallback
+    orjson = None
+
+def _default(obj: Any) -> Any:
+    """Serialize what the encoder does not handle natively, keeping datetimes in ISO 8601"""
+    if isinstance(obj, RawJSON):
+        return obj.value
+    if isinstance(obj, date):
+        return obj.isoformat()
+    return flask_default(obj)
+
+def dumps_bytes(obj: Any) -> bytes:
+    """Encode obj as compact UTF-8 JSON; datetimes become ISO 8601 strings"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def loads(data: Union[str, bytes]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+class RawJSON:
+    """Already-encoded JSON that the provider writes to the response verbatim.
+
+    Services return this for payloads they encode (or cache) once. Item access decodes lazily,
+    so callers that need the values can still read the result like the dict it encodes.
+    """
+    __slots__ = ("data", "_value")
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self._value = None
+
+    @property
+    def value(self) -> Any:
+        if self._value is None:
+            self._value = loads(self.data)
+        return self._value
+
+    def __getitem__(self, key):
+        return self.value[key]
+
+    def __contains__(self, key) -> bool:
+        return key in self.value
+
+    def __iter__(self):
+        return iter(self.value)
+
+    def __len__(self) -> int:
+        return len(self.value)
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, falling back to the stdlib encoder when it is missing.
+
+    Unlike Flask's default, datetimes are written as ISO 8601 (the format the API has always
+    returned) and RawJSON payloads are passed through without being re-encoded.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs:
+            # Callers asking for specific json.dumps options get the stdlib encoder
+            kwargs.setdefault("default", _default)
+            return json.dumps(obj, **kwargs)
+        return dumps_bytes(obj).decode("utf-8")
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        if kwargs:
+            return json.loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = obj.data if isinstance(obj, RawJSON) else dumps_bytes(obj)
+        return self._app.response_class(body, mimetype=self.mimetype)
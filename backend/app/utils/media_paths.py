@@ -0,0 +1,29 @@
+import re
+from typing import Optional
+
+MEDIA_ROOT = '/data/media'
+MIME_EXTENSIONS = {'image/jpeg': 'jpg', 'image/png': 'png'}
+MEDIA_NAME_RE = re.compile(r'^([0-9a-f]{64})\.(jpg|png)$')
+
+# Widths (px) of the resized copies generated for every stored image, and their encodings
+VARIANT_WIDTHS = (128, 480, 1080)
+# format -> (file extension, content type), in order of preference
+VARIANT_FORMATS = {
+    'webp': ('webp', 'image/webp'),
+    'jpeg': ('jpg', 'image/jpeg'),
+}
+
+def media_name(stored: Optional[str]) -> Optional[str]:
+    """The media name (<sha256>.<ext>) in a stored image path, or None for older uploads"""
+    if not stored:
+        return None
+    name = stored.rsplit('/', 1)[-1]
+    return name if MEDIA_NAME_RE.match(name) else None
+
+def media_relative_path(name: str) -> str:
+    """Location of a media file below the media root, sharded by the first two hash bytes"""
+    return f"{name[:2]}/{name[2:4]}/{name}"
+
+def variant_name(name: str, width: int, format: str) -> str:
+    """File name of one variant of a media file; variants live in the same shard directory"""
+    return f"{name.split('.', 1)[0]}_{width}.{VARIANT_FORMATS[format][0]}"
@@ -0,0 +1,37 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Tuple
+
+# Hard server-side cap on page size for list endpoints
+MAX_PAGE_LIMIT = 50
+
+INVALID_CURSOR_ERROR = "Invalid cursor"
+
+def encode_cursor(sort_by: str, value: Any, last_id: int) -> str:
+    """Encode the (sort value, id) of the last row of a page into an opaque cursor"""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps({"s": sort_by, "v": value, "id": last_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, sort_by: str, datetime_value: bool = False) -> Tuple[Any, int]:
+    """Decode a cursor produced by encode_cursor, rejecting cursors issued for another sort order"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if payload["s"] != sort_by:
+            raise ValueError(INVALID_CURSOR_ERROR)
+
+        last_id = payload["id"]
+        value = payload["v"]
+        if not isinstance(last_id, int) or isinstance(last_id, bool):
+            raise ValueError(INVALID_CURSOR_ERROR)
+        if datetime_value:
+            value = datetime.fromisoformat(value)
+        elif not isinstance(value, (int, float)) or isinstance(value, bool):
+            raise ValueError(INVALID_CURSOR_ERROR)
+        return value, last_id
+    except (ValueError, TypeError, KeyError, UnicodeError, binascii.Error):
+        raise ValueError(INVALID_CURSOR_ERROR)
@@ -0,0 +1,232 @@
+import hashlib
+import os
+import tempfile
+from functools import wraps
+from typing import Callable, FrozenSet, Optional
+
+import magic
+from flask import Request, jsonify, request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+# Bytes libmagic needs to identify image formats
+SNIFF_BYTES = 2048
+# Copy size for uploads that did not arrive through the streaming request
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Room for the text fields and multipart boundaries next to the file itself
+FORM_OVERHEAD_BYTES = 64 * 1024
+
+INVALID_CONTENT_ERROR = "Invalid file content"
+FILE_TOO_LARGE_ERROR = "File too large"
+
+class UploadPolicy:
+    """Limits for the files of one upload route, and where they are staged and stored"""
+    __slots__ = ("max_bytes", "folder", "allowed_mimes")
+
+    def __init__(self, max_bytes: int, folder: str, allowed_mimes):
+        self.max_bytes = max_bytes
+        self.folder = folder
+        self.allowed_mimes: FrozenSet[str] = frozenset(allowed_mimes)
+
+class StreamedUpload:
+    """Multipart file part written straight to a temp file next to its final location.
+
+    Every chunk is hashed and counted as it is written, the content type is sniffed from the
+    first SNIFF_BYTES, and once the part is rejected the remaining chunks are dropped instead
+    of written. commit() renames the temp file into place, so the body is read exactly once;
+    an upload that is never committed is deleted when the request closes it.
+    """
+
+    def __init__(self, policy: UploadPolicy):
+        self.policy = policy
+        self.size = 0
+        self.mime: Optional[str] = None
+        self.error: Optional[str] = None
+        self.committed = False
+        self._hash = hashlib.sha256()
+        self._head = b""
+        self._finished = False
+        os.makedirs(policy.folder, exist_ok=True)
+        self._file = tempfile.NamedTemporaryFile(dir=policy.folder, prefix=".upload-", suffix=".part", delete=False)
+        self.temp_path = self._file.name
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    def _reject(self, error: str) -> None:
+        self.error = error
+        self._head = b""
+        self._discard()
+
+    def _append(self, data: bytes) -> None:
+        self._hash.update(data)
+        self._file.write(data)
+
+    def _sniff(self) -> None:
+        self.mime = magic.from_buffer(self._head[:SNIFF_BYTES], mime=True)
+        if self.mime not in self.policy.allowed_mimes:
+            self._reject(INVALID_CONTENT_ERROR)
+            return
+        self._append(self._head)
+        self._head = b""
+
+    def write(self, data: bytes) -> int:
+        written = len(data)
+        if self.error is not None:
+            return written
+
+        self.size += written
+        if self.size > self.policy.max_bytes:
+            self._reject(FILE_TOO_LARGE_ERROR)
+        elif self.mime is None:
+            # Hold the first chunks until there is enough to identify the format
+            self._head += data
+            if len(self._head) >= SNIFF_BYTES:
+                self._sniff()
+        else:
+            self._append(data)
+        return written
+
+    def _finish(self) -> None:
+        """Sniff a file shorter than SNIFF_BYTES and flush everything written"""
+        if self._finished:
+            return
+        self._finished = True
+        if self.error is None and self.mime is None:
+            if not self._head:
+                self._reject(INVALID_CONTENT_ERROR)
+            else:
+                self._sniff()
+        if self.error is None:
+            self._file.flush()
+
+    def check(self, max_bytes: int, allowed_mimes) -> None:
+        """Apply limits stricter than the policy the file was streamed under"""
+        self._finish()
+        if self.error is None and self.size > max_bytes:
+            self._reject(FILE_TOO_LARGE_ERROR)
+        elif self.error is None and self.mime not in allowed_mimes:
+            self._reject(INVALID_CONTENT_ERROR)
+
+    def commit(self, path: str) -> str:
+        """Atomically move the validated upload to path; raises ValueError if it was rejected"""
+        self._finish()
+        if self.error is not None:
+            raise ValueError(self.error)
+        if self.committed:
+            raise ValueError("Upload already stored")
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.temp_path, path)
+        self.committed = True
+        return path
+
+    def _discard(self) -> None:
+        self._file.close()
+        try:
+            os.unlink(self.temp_path)
+        except FileNotFoundError:
+            pass
+
+    # File protocol used by the multipart parser and FileStorage
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        self._finish()
+        if self._file.closed:
+            return 0
+        return self._file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self.size
+
+    def read(self, size: int = -1) -> bytes:
+        self._finish()
+        if self._file.closed:
+            return b""
+        return self._file.read(size)
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def flush(self) -> None:
+        if not self._file.closed:
+            self._file.flush()
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def close(self) -> None:
+        if not self.committed:
+            self._discard()
+
+class UploadRequest(Request):
+    """Request whose file parts stream through StreamedUpload on routes marked with stream_uploads"""
+    upload_policy: Optional[UploadPolicy] = None
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.upload_policy is None:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        return StreamedUpload(self.upload_policy)
+
+def stream_uploads(max_bytes: int, folder: str, allowed_mimes) -> Callable:
+    """Route decorator: cap the request body and stream its file parts into folder.
+
+    The body limit is applied before anything is read, so a request whose Content-Length
+    is over it is answered with 413 without buffering, and the form is parsed here so the
+    view (and its broad exception handler) never sees the size error.
+    """
+    policy = UploadPolicy(max_bytes, folder, allowed_mimes)
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            request.upload_policy = policy
+            request.max_content_length = max_bytes + FORM_OVERHEAD_BYTES
+            try:
+                request.files
+            except RequestEntityTooLarge:
+                return jsonify({"error": FILE_TOO_LARGE_ERROR}), 413
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def prepare_upload(file, folder: str, max_bytes: int, allowed_mimes) -> StreamedUpload:
+    """Validate an uploaded file into a temp file in folder, ready to be committed.
+
+    Files that were streamed by UploadRequest into the same folder are used as they are. Anything
+    else (another folder, or a FileStorage from a plain request) is copied through the same
+    checks chunk by chunk. Raises ValueError when the content type or size is not allowed; the
+    caller closes the returned upload, which deletes the temp file unless it was committed.
+    """
+    upload = getattr(file, "stream", None)
+    if isinstance(upload, StreamedUpload):
+        if upload.error is not None:
+            raise ValueError(upload.error)
+        if upload.policy.folder == folder:
+            upload.check(max_bytes, allowed_mimes)
+            if upload.error is not None:
+                raise ValueError(upload.error)
+            return upload
+
+    copy = StreamedUpload(UploadPolicy(max_bytes, folder, allowed_mimes))
+    try:
+        file.seek(0)
+        while copy.error is None:
+            chunk = file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            copy.write(chunk)
+        copy.check(max_bytes, allowed_mimes)
+        if copy.error is not None:
+            raise ValueError(copy.error)
+        return copy
+    except Exception:
+        copy.close()
+        raise
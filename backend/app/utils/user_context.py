@@ -0,0 +1,65 @@
+from typing import Any, Dict, NamedTuple, Optional
+
+from flask_jwt_extended import get_jwt, get_jwt_identity
+
+# Access token claim holding the user context, and the layout version of its value
+CONTEXT_CLAIM = "ctx"
+CONTEXT_VERSION = 1
+
+# Lifetime of access tokens issued by AuthService once TOTP is verified (the longest it issues)
+ACCESS_TOKEN_MAX_MINUTES = 15
+
+# User columns copied into the claims; changing one of them bumps users.token_version
+CONTEXT_FIELDS = ('membership', 'totp_verified', 'username')
+
+class UserContext(NamedTuple):
+    user_id: int
+    membership: str
+    totp_verified: bool
+    username: str
+    token_version: int
+
+def context_of(user) -> UserContext:
+    return UserContext(
+        user_id=int(user.user_id),
+        membership=user.membership or 'basic',
+        totp_verified=bool(user.totp_verified),
+        username=user.username,
+        token_version=int(user.token_version or 0),
+    )
+
+def context_claims(context: UserContext) -> Dict[str, Any]:
+    """Access token claims for a user context.
+
+    The top-level totp_verified claim is read by the frontend; the compact ctx claim is read
+    back by get_user_context.
+    """
+    return {
+        "totp_verified": context.totp_verified,
+        CONTEXT_CLAIM: {
+            "v": CONTEXT_VERSION,
+            "m": context.membership,
+            "t": context.totp_verified,
+            "u": context.username,
+            "g": context.token_version,
+        },
+    }
+
+def context_from_claims(user_id, claims: Dict[str, Any]) -> Optional[UserContext]:
+    """The user context carried by decoded claims, or None for tokens issued without one"""
+    ctx = claims.get(CONTEXT_CLAIM)
+    if not isinstance(ctx, dict) or ctx.get("v") != CONTEXT_VERSION:
+        return None
+    try:
+        return UserContext(int(user_id), ctx["m"], bool(ctx["t"]), ctx["u"], int(ctx["g"]))
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def get_user_context() -> Optional[UserContext]:
+    """User context of the access token on the current request, without a database query.
+
+    Returns None when the token predates context claims; callers then load the user. Tokens
+    whose context is older than a known token_version are rejected before the view runs
+    (see TokenVersionCache), and a refresh issues claims read from the database.
+    """
+    return context_from_claims(get_jwt_identity(), get_jwt())
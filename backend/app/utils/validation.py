@@ -31,3 +31,7 @@ def is_valid_username(username):
     USERNAME_REGEX = r"^[A-Za-z0-9_]{3,20}$"
     return re.match(USERNAME_REGEX, username) is not None
 
+
+# This is to validate the ?w= width requested for an image (at most 4 digits).
+def is_valid_image_width(value):
+    return re.match(r"^[1-9]\d{0,3}$", str(value)) is not None
@@ -0,0 +1,12 @@
+from .variant_worker import VariantWorker
+from .password_hasher import PasswordHasher, PasswordHasherBusy, BUSY_MESSAGE, BUSY_RETRY_AFTER
+from .email_sender import EmailSender
+
+__all__ = [
+    'VariantWorker',
+    'PasswordHasher',
+    'PasswordHasherBusy',
+    'BUSY_MESSAGE',
+    'BUSY_RETRY_AFTER',
+    'EmailSender',
+]
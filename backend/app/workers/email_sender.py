@@ -0,0 +1,219 @@
+import atexit
+import random
+import smtplib
+import threading
+import time
+from datetime import timedelta
+from email.message import EmailMessage
+from typing import Optional, Tuple
+
+from flask import current_app
+
+from app.repositories.email_outbox_repository import utcnow
+
+class EmailSender:
+    """Background delivery of the email outbox.
+
+    Requests only write email_outbox rows (in the transaction of the change that causes them) and
+    call notify(). A sender thread per process claims due rows in batches of
+    EMAIL_OUTBOX_BATCH_SIZE and sends them over one SMTP connection that is kept open between
+    batches and closed after EMAIL_SMTP_IDLE_SECONDS without mail. Rows are leased while they are
+    sent, so several processes can drain the same outbox. Temporary failures are retried with
+    exponential backoff (EMAIL_OUTBOX_BACKOFF_SECONDS doubling up to
+    EMAIL_OUTBOX_MAX_BACKOFF_SECONDS); 5xx rejections and emails out of EMAIL_OUTBOX_MAX_ATTEMPTS
+    are marked failed. Delivery is at least once: a sender that dies after the mail server
+    accepted a message but before recording it sends it again.
+
+    The thread starts with the first request a process serves, so CLI commands never run it;
+    `flask outbox drain` sends what is due from the command line. Disabled with
+    EMAIL_OUTBOX_SENDER=false.
+    """
+
+    def __init__(self, app=None, outbox_repository=None):
+        self.app = None
+        self.enabled = False
+        self.batch_size = 50
+        self.poll_seconds = 5.0
+        self.lease_seconds = 120
+        self.max_attempts = 8
+        self.backoff_seconds = 30
+        self.max_backoff_seconds = 3600
+        self.idle_seconds = 60.0
+        self.smtp_timeout = 30.0
+        self._outbox_repository = outbox_repository
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+        self._drain_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        app.extensions['email_sender'] = self
+        self.app = app
+        self.batch_size = int(app.config.get('EMAIL_OUTBOX_BATCH_SIZE', 50))
+        self.poll_seconds = float(app.config.get('EMAIL_OUTBOX_POLL_SECONDS', 5))
+        self.lease_seconds = int(app.config.get('EMAIL_OUTBOX_LEASE_SECONDS', 120))
+        self.max_attempts = int(app.config.get('EMAIL_OUTBOX_MAX_ATTEMPTS', 8))
+        self.backoff_seconds = int(app.config.get('EMAIL_OUTBOX_BACKOFF_SECONDS', 30))
+        self.max_backoff_seconds = int(app.config.get('EMAIL_OUTBOX_MAX_BACKOFF_SECONDS', 3600))
+        self.idle_seconds = float(app.config.get('EMAIL_SMTP_IDLE_SECONDS', 60))
+        self.smtp_timeout = float(app.config.get('EMAIL_SMTP_TIMEOUT', 30))
+        if not app.config.get('EMAIL_OUTBOX_SENDER', True):
+            return
+
+        self.enabled = True
+        app.before_request(self._ensure_started)
+        atexit.register(self.stop)
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None or not self.enabled:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='email-outbox-sender', daemon=True)
+                self._thread.start()
+
+    def notify(self) -> None:
+        """Wake the sender for an email that was just committed"""
+        self._wake.set()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.smtp_timeout)
+            self._thread = None
+        self._close()
+
+    def _repository(self):
+        if self._outbox_repository is None:
+            from app.repositories import EmailOutboxRepository
+            return EmailOutboxRepository()
+        return self._outbox_repository
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    self.drain()
+            except Exception as e:
+                self.app.logger.error(f"Error draining the email outbox: {str(e)}")
+            if self._smtp is not None and time.monotonic() - self._last_used >= self.idle_seconds:
+                self._close()
+            self._wake.wait(self.poll_seconds)
+
+    # SMTP connection
+
+    def _connect(self) -> smtplib.SMTP:
+        config = current_app.config
+        host = config.get('MAIL_SERVER') or 'localhost'
+        port = int(config.get('MAIL_PORT') or 25)
+        if config.get('MAIL_USE_SSL'):
+            smtp = smtplib.SMTP_SSL(host, port, timeout=self.smtp_timeout)
+        else:
+            smtp = smtplib.SMTP(host, port, timeout=self.smtp_timeout)
+            if config.get('MAIL_USE_TLS'):
+                smtp.starttls()
+        if config.get('MAIL_USERNAME'):
+            smtp.login(config['MAIL_USERNAME'], config.get('MAIL_PASSWORD') or '')
+        return smtp
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._smtp is None:
+            self._smtp = self._connect()
+        return self._smtp
+
+    def _close(self) -> None:
+        smtp, self._smtp = self._smtp, None
+        if smtp is None:
+            return
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
+
+    def _message(self, row) -> EmailMessage:
+        config = current_app.config
+        message = EmailMessage()
+        message['From'] = config.get('MAIL_DEFAULT_SENDER') or config.get('MAIL_USERNAME')
+        message['To'] = row.recipient
+        message['Subject'] = row.subject
+        message.set_content(row.body)
+        return message
+
+    def _send(self, row) -> None:
+        message = self._message(row)
+        try:
+            self._connection().send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # The server dropped the pooled connection while it was idle; reconnect once
+            self._close()
+            self._connection().send_message(message)
+        self._last_used = time.monotonic()
+
+    # Delivery
+
+    def _retry_at(self, attempts: int):
+        delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** max(0, attempts - 1))
+        # Jitter keeps emails that failed together from being retried together
+        return utcnow() + timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+    @staticmethod
+    def _is_permanent(error: Exception) -> bool:
+        if isinstance(error, smtplib.SMTPRecipientsRefused):
+            return all(code >= 500 for code, _ in error.recipients.values())
+        if isinstance(error, smtplib.SMTPAuthenticationError):
+            return False
+        return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+    def _send_batch(self, rows) -> Tuple[int, int]:
+        repository = self._repository()
+        sent, failed = [], 0
+        for index, row in enumerate(rows):
+            try:
+                self._send(row)
+                sent.append(row.email_id)
+            except Exception as e:
+                permanent = self._is_permanent(e)
+                gave_up = permanent or row.attempts >= self.max_attempts
+                repository.mark_failed(row.email_id, str(e), None if gave_up else self._retry_at(row.attempts))
+                if gave_up:
+                    failed += 1
+                    current_app.logger.error(f"Gave up on email {row.email_id} after {row.attempts} attempts: {str(e)}")
+                else:
+                    current_app.logger.warning(f"Email {row.email_id} will be retried: {str(e)}")
+                if not permanent:
+                    # The server or the connection is at fault: leave the rest of the batch for later
+                    self._close()
+                    # Rows never handed to the server get their claimed attempt back, so an outage
+                    # does not use up their retries
+                    for pending in rows[index + 1:]:
+                        repository.mark_failed(pending.email_id, "Not attempted after a connection failure",
+                                               self._retry_at(pending.attempts - 1), attempted=False)
+                    break
+        repository.mark_sent(sent)
+        return len(sent), failed
+
+    def drain(self, max_batches: Optional[int] = None) -> Tuple[int, int]:
+        """Send due emails until none are left (or max_batches were claimed); returns (sent, failed)"""
+        total_sent = total_failed = batches = 0
+        with self._drain_lock:
+            while max_batches is None or batches < max_batches:
+                rows = self._repository().claim_due(self.batch_size, self.lease_seconds)
+                if not rows:
+                    break
+                batches += 1
+                sent, failed = self._send_batch(rows)
+                total_sent += sent
+                total_failed += failed
+                if sent == 0 and failed < len(rows):
+                    # Nothing went through; wait for the backoff rather than spinning
+                    break
+        if total_sent or total_failed:
+            current_app.logger.info(f"Email outbox: sent {total_sent}, failed {total_failed}")
+        return total_sent, total_failed
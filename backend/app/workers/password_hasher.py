@@ -0,0 +1,130 @@
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+DEFAULT_HASH_METHOD = 'scrypt:32768:8:1'
+SCRYPT_DEFAULTS = ('32768', '8', '1')
+
+# Answer to requests turned away with PasswordHasherBusy, and the seconds clients wait before retrying
+BUSY_MESSAGE = "Server is busy. Please try again in a moment."
+BUSY_RETRY_AFTER = 2
+
+class PasswordHasherBusy(RuntimeError):
+    """Raised when the hashing queue is full or a hash did not finish in time"""
+
+def normalize_method(method: str) -> str:
+    """Spell out the parameters Werkzeug fills in, as they appear at the start of its hashes.
+
+    'scrypt' becomes 'scrypt:32768:8:1' and 'pbkdf2' becomes 'pbkdf2:sha256:<default iterations>',
+    so a configured method can be compared with the method of a stored hash.
+    """
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        if args and len(args) != 3:
+            raise ValueError("scrypt takes n, r and p, e.g. 'scrypt:32768:8:1'")
+        n, r, p = (int(arg) for arg in (args or SCRYPT_DEFAULTS))
+        return f"scrypt:{n}:{r}:{p}"
+    if name == 'pbkdf2':
+        if len(args) > 2:
+            raise ValueError("pbkdf2 takes a digest and iterations, e.g. 'pbkdf2:sha256:1000000'")
+        digest = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+        return f"pbkdf2:{digest}:{iterations}"
+    raise ValueError(f"Unsupported password hash method: {method}")
+
+class PasswordHasher:
+    """Password hashing and verification off the request thread.
+
+    scrypt and PBKDF2 cost hundreds of milliseconds of CPU each. With PASSWORD_HASH_WORKERS > 0
+    they run in a ProcessPoolExecutor, started lazily in each gunicorn worker, so the number of
+    hashes computed at once is capped by the pool size rather than by how many logins arrive, and
+    the worker's other threads keep the CPU they need. At most PASSWORD_HASH_QUEUE_LIMIT hashes
+    may be queued or running per process; beyond that, or when a hash takes longer than
+    PASSWORD_HASH_TIMEOUT seconds, PasswordHasherBusy is raised so the request is answered with
+    503 instead of piling up. With 0 workers (and before init_app) hashes are computed inline.
+    PASSWORD_HASH_METHOD takes Werkzeug's method syntax; stored hashes with other parameters are
+    reported by needs_rehash so logins can upgrade them.
+    """
+
+    def __init__(self, app=None):
+        self.method = DEFAULT_HASH_METHOD
+        self.workers = 0
+        self.queue_limit = 0
+        self.timeout: Optional[float] = None
+        self._executor = None
+        self._executor_pid = None
+        self._slots = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        app.extensions['password_hasher'] = self
+        self.method = normalize_method(app.config.get('PASSWORD_HASH_METHOD', DEFAULT_HASH_METHOD))
+        self.workers = max(0, int(app.config.get('PASSWORD_HASH_WORKERS', 2)))
+        self.queue_limit = max(self.workers, int(app.config.get('PASSWORD_HASH_QUEUE_LIMIT', 32)))
+        timeout = float(app.config.get('PASSWORD_HASH_TIMEOUT', 10))
+        self.timeout = timeout if timeout > 0 else None
+        self._slots = threading.BoundedSemaphore(self.queue_limit) if self.workers else None
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._executor is not None and self._executor_pid == os.getpid():
+                self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            # A pool inherited through fork belongs to the parent; start this process's own
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    # Children only import werkzeug.security, not the app, its sockets or its locks
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _call(self, fn: Callable, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy("Password hashing queue is full")
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the hash finishes, even if the request stopped waiting for it
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise PasswordHasherBusy("Password hashing timed out") from None
+        except BrokenProcessPool:
+            # A child died (e.g. killed for memory); the next call starts a fresh pool
+            with self._lock:
+                self._executor = None
+            raise
+
+    def hash(self, password: str) -> str:
+        return self._call(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        return self._call(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Whether a stored hash was made with other parameters than the configured method"""
+        method = password_hash.split('$', 1)[0]
+        try:
+            return normalize_method(method) != self.method
+        except ValueError:
+            return True
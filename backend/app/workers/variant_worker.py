@@ -0,0 +1,163 @@
+import atexit
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from flask import current_app
+
+from app.utils.media_paths import MEDIA_ROOT, VARIANT_FORMATS, VARIANT_WIDTHS, media_relative_path, variant_name
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - Pillow is in requirements.txt; without it only originals are served
+    Image = None
+
+VARIANT_QUALITY = 80
+# Larger sources are not decoded at all (Pillow's decompression bomb guard)
+MAX_SOURCE_PIXELS = 50_000_000
+
+class VariantWorker:
+    """Background pool that writes the resized variants of stored images.
+
+    Services submit a media name after the row using it is committed; a worker thread decodes
+    the original once (JPEGs at reduced scale when the largest variant allows), writes a WebP
+    and a JPEG copy for every VARIANT_WIDTHS entry narrower than the original, and records their
+    dimensions in media_variants. Image endpoints fall back to the original until a variant
+    exists. Pillow releases the GIL while resampling and encoding, so threads keep request
+    workers free without a process pool. Disabled when MEDIA_VARIANT_WORKERS is 0 or Pillow is
+    missing.
+    """
+
+    def __init__(self, app=None, media_repository=None, media_root: str = MEDIA_ROOT):
+        self.app = None
+        self.enabled = False
+        self.media_root = media_root
+        self._media_repository = media_repository
+        self._executor = None
+        self._lock = threading.Lock()
+        self._queued = set()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app) -> None:
+        app.extensions['variant_worker'] = self
+        workers = int(app.config.get('MEDIA_VARIANT_WORKERS', 2))
+        if workers <= 0:
+            return
+        if Image is None:
+            app.logger.warning("Pillow is not installed; image variants are not generated")
+            return
+
+        self.app = app
+        Image.MAX_IMAGE_PIXELS = MAX_SOURCE_PIXELS
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='media-variants')
+        self.enabled = True
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        """Finish the variants already queued and stop the pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.enabled = False
+
+    def _repository(self):
+        if self._media_repository is None:
+            from app.repositories import MediaRepository
+            return MediaRepository()
+        return self._media_repository
+
+    def submit(self, name: str) -> Optional[Future]:
+        """Queue variant generation for a media name; None when disabled or already queued"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            if name in self._queued:
+                return None
+            self._queued.add(name)
+        return self._executor.submit(self._run, name)
+
+    def _run(self, name: str) -> None:
+        try:
+            with self.app.app_context():
+                self.generate(name)
+        except Exception as e:
+            self.app.logger.error(f"Error generating variants of {name}: {str(e)}")
+        finally:
+            with self._lock:
+                self._queued.discard(name)
+
+    def _save(self, image, path: str, format: str) -> int:
+        """Encode image to path atomically and return the file size"""
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.variant-', suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                if format == 'jpeg':
+                    image.save(out, 'JPEG', quality=VARIANT_QUALITY, optimize=True, progressive=True)
+                else:
+                    image.save(out, 'WEBP', quality=VARIANT_QUALITY, method=4)
+            os.replace(temp_path, path)
+            return os.path.getsize(path)
+        except Exception:
+            os.unlink(temp_path)
+            raise
+
+    def _remove(self, paths: List[str]) -> None:
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def generate(self, name: str) -> List[Dict[str, Any]]:
+        """Write the missing variants of a stored image and record them; returns the new rows"""
+        if Image is None:
+            raise RuntimeError("Pillow is not installed")
+        sha256 = name.split('.', 1)[0]
+        repository = self._repository()
+        existing = {(row.width, row.format) for row in repository.get_variants([sha256])}
+        path = os.path.join(self.media_root, media_relative_path(name))
+        folder = os.path.dirname(path)
+
+        variants, written = [], []
+        try:
+            with Image.open(path) as source:
+                if all((width, format) in existing for width in VARIANT_WIDTHS for format in VARIANT_FORMATS):
+                    return []
+                # Let the JPEG decoder skip detail the largest variant would throw away
+                largest = max(VARIANT_WIDTHS)
+                source.draft('RGB', (largest, largest))
+                image = ImageOps.exif_transpose(source)
+                if image.mode not in ('RGB', 'RGBA'):
+                    image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+
+                for width in VARIANT_WIDTHS:
+                    if width >= image.width:
+                        break
+                    height = max(1, round(image.height * width / image.width))
+                    resized = image.resize((width, height), Image.LANCZOS)
+                    for format in VARIANT_FORMATS:
+                        if (width, format) in existing:
+                            continue
+                        encoded = resized
+                        if format == 'jpeg' and resized.mode == 'RGBA':
+                            encoded = Image.new('RGB', resized.size, (255, 255, 255))
+                            encoded.paste(resized, mask=resized.getchannel('A'))
+                        variant_path = os.path.join(folder, variant_name(name, width, format))
+                        size = self._save(encoded, variant_path, format)
+                        written.append(variant_path)
+                        variants.append({"width": width, "format": format, "height": height, "size": size})
+
+            # The original may have been released while it was being resized
+            if not repository.add_variants(sha256, variants):
+                self._remove(written)
+                return []
+        except Exception:
+            self._remove(written)
+            raise
+
+        if variants:
+            current_app.logger.info(f"Generated {len(variants)} variants of {name}")
+        return variants
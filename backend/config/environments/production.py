@@ -1,3 +1,4 @@
+import os
 from config.settings import BaseConfig
 
 class ProductionConfig(BaseConfig):
@@ -10,4 +11,8 @@ class ProductionConfig(BaseConfig):
     SESSION_COOKIE_HTTPONLY = True
     REMEMBER_COOKIE_SECURE = True
     REMEMBER_COOKIE_HTTPONLY = True
-    LOG_DIR = '/var/log/app'
\ No newline at end of file
+    LOG_DIR = '/var/log/app'
+    # Production always runs behind nginx, which serves the image files
+    MEDIA_ACCEL_REDIRECT = os.getenv('MEDIA_ACCEL_REDIRECT', 'true').lower() == 'true'
+    # Query counts and database time are not for clients; opt in with SQL_SERVER_TIMING=true to debug
+    SQL_SERVER_TIMING = os.getenv('SQL_SERVER_TIMING', 'false').lower() == 'true'
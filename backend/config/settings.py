@@ -19,6 +19,64 @@ class BaseConfig:
     # CORS settings
     CORS_ORIGINS = [os.getenv("FRONTEND_ROUTE", "http://localhost:3000")]
     
+    # Feed response cache ("memory", "redis" or "none")
+    FEED_CACHE_BACKEND = os.getenv('FEED_CACHE_BACKEND', 'memory')
+    FEED_CACHE_URL = os.getenv('FEED_CACHE_URL', 'redis://localhost:6379/0')
+    FEED_CACHE_TTL_SECONDS = int(os.getenv('FEED_CACHE_TTL_SECONDS', 30))
+    FEED_CACHE_MAX_ENTRIES = int(os.getenv('FEED_CACHE_MAX_ENTRIES', 1024))
+    
+    # Per-user liked post ids; versions are shared through the feed cache's redis backend
+    LIKED_SET_CACHE_ENABLED = os.getenv('LIKED_SET_CACHE_ENABLED', 'true').lower() == 'true'
+    LIKED_SET_TTL_SECONDS = int(os.getenv('LIKED_SET_TTL_SECONDS', 300))
+    LIKED_SET_MAX_IDS = int(os.getenv('LIKED_SET_MAX_IDS', 2000000))
+    
+    # Rate limit counters shared by the workers on this machine (sharedmem://<path>?slots=<n>;
+    # "memory://" keeps them per process) and a strategy with constant memory per key
+    RATELIMIT_STORAGE_URI = os.getenv('RATELIMIT_STORAGE_URI', 'sharedmem://')
+    RATELIMIT_STRATEGY = os.getenv('RATELIMIT_STRATEGY', 'sliding-window-counter')
+    
+    # Access tokens issued before a change to their user context claims get 401 and are refreshed;
+    # bumps are shared through the feed cache's redis backend and kept for at least the longest
+    # access token lifetime (JWT_ACCESS_TOKEN_EXPIRES or the 15 minutes AuthService issues)
+    TOKEN_VERSION_CHECK = os.getenv('TOKEN_VERSION_CHECK', 'true').lower() == 'true'
+    
+    # Write-behind like buffer (off by default; one process per LIKE_BUFFER_PATH)
+    LIKE_WRITE_BEHIND = os.getenv('LIKE_WRITE_BEHIND', 'false').lower() == 'true'
+    LIKE_BUFFER_PATH = os.getenv('LIKE_BUFFER_PATH', '/data/like_buffer/likes.log')
+    LIKE_BUFFER_FLUSH_MS = int(os.getenv('LIKE_BUFFER_FLUSH_MS', 200))
+    LIKE_BUFFER_FSYNC = os.getenv('LIKE_BUFFER_FSYNC', 'false').lower() == 'true'
+    
+    # Largest request body accepted by any route; upload routes set tighter per-route limits
+    MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH', 6 * 1024 * 1024))
+    
+    # Threads resizing uploaded images into feed-sized variants (0 serves originals only)
+    MEDIA_VARIANT_WORKERS = int(os.getenv('MEDIA_VARIANT_WORKERS', 2))
+    
+    # Hand image files to nginx (X-Accel-Redirect to MEDIA_ACCEL_PREFIX/...) instead of streaming them
+    MEDIA_ACCEL_REDIRECT = os.getenv('MEDIA_ACCEL_REDIRECT', 'false').lower() == 'true'
+    MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/_internal')
+    
+    # Password hashing: Werkzeug method string (scrypt:n:r:p or pbkdf2:digest:iterations), processes
+    # computing hashes (0 hashes on the request thread), and how many may wait before logins get 503
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv('PASSWORD_HASH_QUEUE_LIMIT', 32))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))
+    
+    # Email outbox sender (EMAIL_OUTBOX_SENDER=false leaves delivery to `flask outbox drain`)
+    EMAIL_OUTBOX_SENDER = os.getenv('EMAIL_OUTBOX_SENDER', 'true').lower() == 'true'
+    EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv('EMAIL_OUTBOX_BATCH_SIZE', 50))
+    EMAIL_OUTBOX_POLL_SECONDS = float(os.getenv('EMAIL_OUTBOX_POLL_SECONDS', 5))
+    EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 8))
+    EMAIL_OUTBOX_BACKOFF_SECONDS = int(os.getenv('EMAIL_OUTBOX_BACKOFF_SECONDS', 30))
+    EMAIL_OUTBOX_MAX_BACKOFF_SECONDS = int(os.getenv('EMAIL_OUTBOX_MAX_BACKOFF_SECONDS', 3600))
+    EMAIL_SMTP_IDLE_SECONDS = float(os.getenv('EMAIL_SMTP_IDLE_SECONDS', 60))
+    
+    # Per-request SQL instrumentation
+    SQL_INSTRUMENTATION_ENABLED = os.getenv('SQL_INSTRUMENTATION_ENABLED', 'true').lower() == 'true'
+    SQL_SERVER_TIMING = os.getenv('SQL_SERVER_TIMING', 'true').lower() == 'true'
+    SQL_QUERY_WARN_THRESHOLD = int(os.getenv('SQL_QUERY_WARN_THRESHOLD', 10))
+    
     # Logging settings
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
     LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -0,0 +1,23 @@
+"""Add FULLTEXT index over posts title and content
+
+Revision ID: 3d9a6b1c5e7f
+Revises: 8c1f4e2a7b3d
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3d9a6b1c5e7f'
+down_revision = '8c1f4e2a7b3d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ft_posts_title_content', 'posts', ['title', 'content'], mysql_prefix='FULLTEXT')
+
+
+def downgrade():
+    op.drop_index('ft_posts_title_content', table_name='posts')
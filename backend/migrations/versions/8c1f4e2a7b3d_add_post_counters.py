@@ -0,0 +1,34 @@
+"""Add denormalized like and comment counters to posts
+
+Revision ID: 8c1f4e2a7b3d
+Revises: 5059806f2d86
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c1f4e2a7b3d'
+down_revision = '5059806f2d86'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('posts', sa.Column('likes_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('posts', sa.Column('comments_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill existing rows; `flask counters backfill` re-runs this in batches on large tables
+    op.execute(
+        "UPDATE posts SET "
+        "likes_count = (SELECT COUNT(*) FROM likes WHERE likes.post_id = posts.post_id), "
+        "comments_count = (SELECT COUNT(*) FROM comments WHERE comments.post_id = posts.post_id), "
+        "updated_at = updated_at"
+    )
+
+
+def downgrade():
+    op.drop_column('posts', 'comments_count')
+    op.drop_column('posts', 'likes_count')
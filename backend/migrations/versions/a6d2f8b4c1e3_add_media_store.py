@@ -0,0 +1,137 @@
+"""Add the content-addressed media table and move existing uploads into the store
+
+Revision ID: a6d2f8b4c1e3
+Revises: f1a3c5e7d902
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+
+import magic
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d2f8b4c1e3'
+down_revision = 'f1a3c5e7d902'
+branch_labels = None
+depends_on = None
+
+# Mirrors app.services.media_service; migrations must not import application code
+MEDIA_ROOT = '/data/media'
+MIME_EXTENSIONS = {'image/jpeg': 'jpg', 'image/png': 'png'}
+MEDIA_NAME_RE = re.compile(r'^([0-9a-f]{64})\.(jpg|png)$')
+# (table, key, column, stored path prefix, folder the upload used to be written to)
+REFERENCES = [
+    ('posts', 'post_id', 'image', '/post_uploads/', '/data/post_uploads'),
+    ('comments', 'comment_id', 'image', '/comment_uploads/', '/data/comment_uploads'),
+    ('users', 'user_id', 'profile_picture', '/uploads/', '/data/uploads'),
+]
+CHUNK_SIZE = 64 * 1024
+
+
+def _media_path(name):
+    return os.path.join(MEDIA_ROOT, name[:2], name[2:4], name)
+
+
+def _copy_atomically(source, target):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix='.upload-', suffix='.part')
+    with os.fdopen(fd, 'wb') as out, open(source, 'rb') as src:
+        shutil.copyfileobj(src, out, CHUNK_SIZE)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(temp_path, target)
+
+
+def _store(path):
+    """Copy a legacy upload into the store; (sha256, ext, mime, size), or None to leave it where it is"""
+    if not os.path.isfile(path):
+        return None
+    mime = magic.from_file(path, mime=True)
+    ext = MIME_EXTENSIONS.get(mime)
+    if ext is None:
+        return None
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    sha256 = digest.hexdigest()
+
+    target = _media_path(f"{sha256}.{ext}")
+    if not os.path.exists(target):
+        _copy_atomically(path, target)
+    return sha256, ext, mime, os.path.getsize(path)
+
+
+def upgrade():
+    media = op.create_table(
+        'media',
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('ext', sa.String(length=8), nullable=False),
+        sa.Column('mime_type', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('ref_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=True),
+        sa.PrimaryKeyConstraint('sha256')
+    )
+
+    # Hash every referenced upload once, copy it into the store and point its rows at it.
+    # Originals stay in the legacy folders (downgrade needs nothing else); files that are
+    # missing or not a supported image keep their old path and are served from there.
+    bind = op.get_bind()
+    stored = {}
+    rows = {}
+    for table, key, column, prefix, folder in REFERENCES:
+        references = bind.execute(sa.text(
+            f"SELECT {key}, {column} FROM {table} WHERE {column} IS NOT NULL AND {column} <> ''"
+        )).fetchall()
+
+        updates = []
+        for row_id, value in references:
+            name = value.rsplit('/', 1)[-1]
+            path = os.path.join(folder, name)
+            if path not in stored:
+                stored[path] = _store(path)
+            entry = stored[path]
+            if entry is None:
+                continue
+            sha256, ext, mime, size = entry
+            rows.setdefault(sha256, {'sha256': sha256, 'ext': ext, 'mime_type': mime, 'size': size, 'ref_count': 0})
+            rows[sha256]['ref_count'] += 1
+            updates.append({'row_id': row_id, 'value': f"{prefix}{sha256}.{ext}"})
+
+        if updates:
+            # Keep posts.updated_at (the recent feed order) as it was
+            keep_updated_at = ", updated_at = updated_at" if table == 'posts' else ""
+            bind.execute(
+                sa.text(f"UPDATE {table} SET {column} = :value{keep_updated_at} WHERE {key} = :row_id"),
+                updates
+            )
+
+    if rows:
+        op.bulk_insert(media, list(rows.values()))
+
+
+def downgrade():
+    # Give every stored image a copy in its legacy folder under the name the rows now hold,
+    # which the pre-store routes serve as is
+    bind = op.get_bind()
+    for table, key, column, prefix, folder in REFERENCES:
+        values = bind.execute(sa.text(
+            f"SELECT DISTINCT {column} FROM {table} WHERE {column} LIKE :pattern"
+        ), {'pattern': f"{prefix}%"}).scalars()
+        for value in values:
+            name = value.rsplit('/', 1)[-1]
+            source = _media_path(name)
+            target = os.path.join(folder, name)
+            if MEDIA_NAME_RE.match(name) and os.path.exists(source) and not os.path.exists(target):
+                _copy_atomically(source, target)
+
+    op.drop_table('media')
@@ -0,0 +1,42 @@
+"""Add composite indexes for the hot query patterns
+
+Revision ID: b7e2d4f6a8c1
+Revises: 3d9a6b1c5e7f
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2d4f6a8c1'
+down_revision = '3d9a6b1c5e7f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Feed orderings: ORDER BY <sort key> DESC, post_id DESC with keyset seeks
+    op.create_index('ix_posts_updated_at_post_id', 'posts', ['updated_at', 'post_id'])
+    op.create_index('ix_posts_likes_count_post_id', 'posts', ['likes_count', 'post_id'])
+    op.create_index('ix_posts_comments_count_post_id', 'posts', ['comments_count', 'post_id'])
+
+    # Profile listings filter on user_id and order like the recent feed
+    op.create_index('ix_posts_user_id_updated_at_post_id', 'posts', ['user_id', 'updated_at', 'post_id'])
+
+    # count_user_posts_today filters on (user_id, created_at)
+    op.create_index('ix_posts_user_id_created_at', 'posts', ['user_id', 'created_at'])
+
+    # Comments of a post in creation order
+    op.create_index('ix_comments_post_id_created_at', 'comments', ['post_id', 'created_at'])
+
+    # likes filtered by user_id are already served by the user_post_uc (user_id, post_id) index
+
+
+def downgrade():
+    op.drop_index('ix_comments_post_id_created_at', table_name='comments')
+    op.drop_index('ix_posts_user_id_created_at', table_name='posts')
+    op.drop_index('ix_posts_user_id_updated_at_post_id', table_name='posts')
+    op.drop_index('ix_posts_comments_count_post_id', table_name='posts')
+    op.drop_index('ix_posts_likes_count_post_id', table_name='posts')
+    op.drop_index('ix_posts_updated_at_post_id', table_name='posts')
@@ -0,0 +1,34 @@
+"""Add media_variants for the resized copies of stored images
+
+Revision ID: c3e9a7d5f1b8
+Revises: a6d2f8b4c1e3
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e9a7d5f1b8'
+down_revision = 'a6d2f8b4c1e3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing images get their variants from `flask media variants`
+    op.create_table(
+        'media_variants',
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('width', sa.SmallInteger(), nullable=False),
+        sa.Column('format', sa.String(length=8), nullable=False),
+        sa.Column('height', sa.SmallInteger(), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['sha256'], ['media.sha256'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('sha256', 'width', 'format')
+    )
+
+
+def downgrade():
+    op.drop_table('media_variants')
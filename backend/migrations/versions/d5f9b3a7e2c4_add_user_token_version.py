@@ -0,0 +1,24 @@
+"""Add token_version to users for refreshing access token claims
+
+Revision ID: d5f9b3a7e2c4
+Revises: b7e1d4c9a2f6
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5f9b3a7e2c4'
+down_revision = 'b7e1d4c9a2f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    op.drop_column('users', 'token_version')
@@ -0,0 +1,32 @@
+"""Index comments by (post_id, parent_id, created_at, comment_id) for paged threads
+
+Revision ID: e4c81a5f9b27
+Revises: b7e2d4f6a8c1
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4c81a5f9b27'
+down_revision = 'b7e2d4f6a8c1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Top-level comments and the replies of one parent are both keyset-paged in creation order
+    op.create_index(
+        'ix_comments_post_id_parent_id_created_at',
+        'comments',
+        ['post_id', 'parent_id', 'created_at', 'comment_id']
+    )
+    # The new index leads with post_id, so it also serves the comments.post_id foreign key
+    # and the per-post version probe
+    op.drop_index('ix_comments_post_id_created_at', table_name='comments')
+
+
+def downgrade():
+    op.create_index('ix_comments_post_id_created_at', 'comments', ['post_id', 'created_at'])
+    op.drop_index('ix_comments_post_id_parent_id_created_at', table_name='comments')
@@ -0,0 +1,30 @@
+"""Add last_comment_id to posts for versioning comment lists
+
+Revision ID: e8a4c2f6b1d9
+Revises: d5f9b3a7e2c4
+Create Date: 2026-10-17 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a4c2f6b1d9'
+down_revision = 'd5f9b3a7e2c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('posts', sa.Column('last_comment_id', sa.Integer(), nullable=True))
+
+    op.execute(
+        "UPDATE posts SET "
+        "last_comment_id = (SELECT MAX(comment_id) FROM comments WHERE comments.post_id = posts.post_id), "
+        "updated_at = updated_at"
+    )
+
+
+def downgrade():
+    op.drop_column('posts', 'last_comment_id')
@@ -0,0 +1,51 @@
+"""Add materialized path and depth to comments, backfilled from parent_id
+
+Revision ID: f1a3c5e7d902
+Revises: e4c81a5f9b27
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1a3c5e7d902'
+down_revision = 'e4c81a5f9b27'
+branch_labels = None
+depends_on = None
+
+# Mirrors app.models.comments; migrations must not import application code
+PATH_SEGMENT_LENGTH = 9
+MAX_COMMENT_DEPTH = 255 // PATH_SEGMENT_LENGTH - 1
+SEGMENT_SQL = "CONCAT(LPAD(LOWER(HEX(c.comment_id)), 8, '0'), '/')"
+
+
+def upgrade():
+    op.add_column('comments', sa.Column('path', sa.String(length=255), nullable=True))
+    op.add_column('comments', sa.Column('depth', sa.SmallInteger(), nullable=False, server_default='0'))
+
+    # Top-level comments first, then one level per pass until no comment is left without a path
+    op.execute(f"UPDATE comments c SET c.path = {SEGMENT_SQL}, c.depth = 0 WHERE c.parent_id IS NULL")
+    bind = op.get_bind()
+    while True:
+        updated = bind.execute(sa.text(f"""
+            UPDATE comments c JOIN comments p ON p.comment_id = c.parent_id
+            SET c.path = IF(p.depth >= {MAX_COMMENT_DEPTH},
+                            CONCAT(LEFT(p.path, CHAR_LENGTH(p.path) - {PATH_SEGMENT_LENGTH}), {SEGMENT_SQL}),
+                            CONCAT(p.path, {SEGMENT_SQL})),
+                c.parent_id = IF(p.depth >= {MAX_COMMENT_DEPTH}, p.parent_id, c.parent_id),
+                c.depth = LEAST(p.depth + 1, {MAX_COMMENT_DEPTH})
+            WHERE c.path IS NULL AND p.path IS NOT NULL
+        """)).rowcount
+        if not updated:
+            break
+
+    op.alter_column('comments', 'path', existing_type=sa.String(length=255), nullable=False)
+    op.create_index('ix_comments_post_id_path', 'comments', ['post_id', 'path'])
+
+
+def downgrade():
+    op.drop_index('ix_comments_post_id_path', table_name='comments')
+    op.drop_column('comments', 'depth')
+    op.drop_column('comments', 'path')
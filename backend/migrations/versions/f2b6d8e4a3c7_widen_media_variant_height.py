@@ -0,0 +1,26 @@
+"""Widen media_variants.height to Integer for tall images
+
+Revision ID: f2b6d8e4a3c7
+Revises: e8a4c2f6b1d9
+Create Date: 2026-10-17 23:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b6d8e4a3c7'
+down_revision = 'e8a4c2f6b1d9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.alter_column('media_variants', 'height', existing_type=sa.SmallInteger(), type_=sa.Integer(),
+                    existing_nullable=False)
+
+
+def downgrade():
+    op.alter_column('media_variants', 'height', existing_type=sa.Integer(), type_=sa.SmallInteger(),
+                    existing_nullable=False)
@@ -0,0 +1,33 @@
+"""Compare two benchmark result files written by the bench suite.
+
+Usage: python tests/bench/compare.py baseline.json candidate.json
+"""
+import json
+import sys
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+def main(argv):
+    if len(argv) != 3:
+        print(__doc__.strip())
+        return 2
+
+    baseline, candidate = load(argv[1]), load(argv[2])
+    if baseline['meta'].get('dataset') != candidate['meta'].get('dataset'):
+        print("warning: runs used different datasets", file=sys.stderr)
+
+    print(f"{'benchmark':<60} {'base ms':>10} {'new ms':>10} {'change':>8}")
+    for name in sorted(set(baseline['results']) | set(candidate['results'])):
+        old = baseline['results'].get(name, {}).get('median_ms')
+        new = candidate['results'].get(name, {}).get('median_ms')
+        if old is None or new is None:
+            change = 'added' if old is None else 'removed'
+        else:
+            change = f"{(new - old) / old * 100:+.1f}%" if old else 'n/a'
+        print(f"{name:<60} {old if old is not None else '-':>10} {new if new is not None else '-':>10} {change:>8}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
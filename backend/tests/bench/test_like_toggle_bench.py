@@ -0,0 +1,123 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import func
+
+from app.db import db
+from app.models import Like, Post
+from app.repositories import LikeRepository, PostRepository
+from app.buffers import LikeWriteBuffer
+from conftest import CONCURRENCY, DATASET
+
+TOGGLES_PER_WORKER = 50
+
+def _legacy_toggle(user_id, post_id):
+    """The previous read-then-write sequence: post lookup, like lookup, insert/delete, count"""
+    post_repository = PostRepository()
+    like_repository = LikeRepository(post_repository)
+    if post_repository.get_by_id(post_id) is None:
+        return None
+    existing = like_repository.get_by_user_and_post(user_id, post_id)
+    try:
+        if existing:
+            db.session.delete(existing)
+            post_repository.adjust_counters(post_id, likes_delta=-1)
+        else:
+            db.session.add(Like(user_id=user_id, post_id=post_id))
+            post_repository.adjust_counters(post_id, likes_delta=1)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return like_repository.count_likes_for_post(post_id)
+
+def _atomic_toggle(user_id, post_id):
+    return LikeRepository().toggle(user_id, post_id)
+
+@pytest.fixture
+def like_buffer(bench_app, tmp_path):
+    bench_app.config.update({
+        'LIKE_WRITE_BEHIND': True,
+        'LIKE_BUFFER_PATH': str(tmp_path / 'likes.log'),
+        'LIKE_BUFFER_FLUSH_MS': 100,
+    })
+    buffer = LikeWriteBuffer(bench_app)
+    yield buffer
+    buffer.stop()
+    bench_app.config['LIKE_WRITE_BEHIND'] = False
+
+def _run_concurrently(app, toggle, post_id, same_user):
+    """Hammer one post from CONCURRENCY threads; same_user simulates double clicks by one user"""
+    errors = []
+    barrier = threading.Barrier(CONCURRENCY)
+
+    def worker(index):
+        with app.app_context():
+            barrier.wait()
+            for i in range(TOGGLES_PER_WORKER):
+                user_id = 1 if same_user else (index * TOGGLES_PER_WORKER + i) % DATASET['users'] + 1
+                try:
+                    toggle(user_id, post_id)
+                except Exception as e:
+                    errors.append(type(e).__name__)
+            db.session.remove()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(CONCURRENCY)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, errors
+
+def _counter_drift(post_id):
+    db.session.remove()
+    stored = db.session.query(Post.likes_count).filter(Post.post_id == post_id).scalar()
+    actual = db.session.query(func.count(Like.like_id)).filter(Like.post_id == post_id).scalar()
+    return stored - actual
+
+@pytest.mark.parametrize('same_user', [False, True], ids=['many-users', 'same-user'])
+@pytest.mark.parametrize('implementation', ['legacy', 'atomic'])
+def test_concurrent_toggles_on_hot_post(bench_app, bench_record, implementation, same_user):
+    toggle = _atomic_toggle if implementation == 'atomic' else _legacy_toggle
+    post_id = 1  # the seeded dataset skews likes and comments towards post 1
+
+    elapsed, errors = _run_concurrently(bench_app, toggle, post_id, same_user)
+    drift = _counter_drift(post_id)
+    PostRepository().reconcile_counters()
+
+    total = CONCURRENCY * TOGGLES_PER_WORKER
+    bench_record(
+        f"like_toggle.concurrent[{implementation}-{'same-user' if same_user else 'many-users'}]",
+        threads=CONCURRENCY,
+        toggles=total,
+        toggles_per_sec=round(total / elapsed, 1),
+        errors=len(errors),
+        error_types=sorted(set(errors)),
+        counter_drift=drift,
+    )
+    if implementation == 'atomic':
+        assert drift == 0
+
+@pytest.mark.parametrize('same_user', [False, True], ids=['many-users', 'same-user'])
+def test_concurrent_toggles_write_behind(bench_app, bench_record, like_buffer, same_user):
+    post_id = 1
+
+    elapsed, errors = _run_concurrently(bench_app, like_buffer.toggle, post_id, same_user)
+    with bench_app.app_context():
+        like_buffer.flush()
+        drift = _counter_drift(post_id)
+        PostRepository().reconcile_counters()
+
+    total = CONCURRENCY * TOGGLES_PER_WORKER
+    bench_record(
+        f"like_toggle.concurrent[write-behind-{'same-user' if same_user else 'many-users'}]",
+        threads=CONCURRENCY,
+        toggles=total,
+        toggles_per_sec=round(total / elapsed, 1),
+        errors=len(errors),
+        error_types=sorted(set(errors)),
+        counter_drift=drift,
+    )
+    assert drift == 0
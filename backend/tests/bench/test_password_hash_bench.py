@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+from flask import Flask
+from werkzeug.security import generate_password_hash
+
+from app.services.auth_service import AuthService
+from app.workers import PasswordHasher, PasswordHasherBusy
+from conftest import CONCURRENCY
+
+LOGINS_PER_THREAD = int(os.getenv('BENCH_LOGINS_PER_THREAD', 5))
+PASSWORD = 'Password123!'
+METHODS = [
+    'scrypt:32768:8:1',
+    'pbkdf2:sha256:600000',
+    'pbkdf2:sha256:1000000',
+]
+
+def _service(method, workers):
+    app = Flask(__name__)
+    app.config.update({
+        'PASSWORD_HASH_METHOD': method,
+        'PASSWORD_HASH_WORKERS': workers,
+        'PASSWORD_HASH_QUEUE_LIMIT': max(workers, CONCURRENCY),
+        'PASSWORD_HASH_TIMEOUT': 60,
+    })
+    hasher = PasswordHasher(app)
+    user = Mock(username='bench', password=generate_password_hash(PASSWORD, method))
+    repository = Mock()
+    repository.get_by_email.return_value = user
+    return app, hasher, AuthService(user_repository=repository, password_hasher=hasher)
+
+@pytest.mark.parametrize('method', METHODS)
+def test_single_login(microbench, method):
+    """Latency of one login with hashing on the request thread"""
+    app, _, service = _service(method, workers=0)
+    with app.app_context():
+        microbench(f'password.login_inline[{method}]', lambda: service.login('bench@example.com', PASSWORD), repeat=5)
+
+@pytest.mark.parametrize('workers', [0, 1, 2, 4])
+@pytest.mark.parametrize('method', METHODS)
+def test_concurrent_logins(microbench_record, method, workers):
+    """Logins per second of one gunicorn worker serving CONCURRENCY request threads.
+
+    Alongside the logins, a probe thread measures how long a trivial request takes, i.e. how
+    much CPU the logins leave for the rest of the worker.
+    """
+    app, hasher, service = _service(method, workers)
+    if workers:
+        hasher.verify(hasher.hash(PASSWORD), PASSWORD)  # start the pool outside the timed section
+    done = threading.Event()
+    busy = []
+    probes = []
+
+    def login_loop():
+        with app.app_context():
+            for _ in range(LOGINS_PER_THREAD):
+                try:
+                    service.login('bench@example.com', PASSWORD)
+                except PasswordHasherBusy:
+                    busy.append(1)
+
+    def probe_loop():
+        while not done.is_set():
+            started = time.perf_counter()
+            sum(range(20000))
+            probes.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=login_loop) for _ in range(CONCURRENCY)]
+    probe = threading.Thread(target=probe_loop)
+    probe.start()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    probe.join()
+    hasher.stop()
+
+    probes.sort()
+    total = CONCURRENCY * LOGINS_PER_THREAD
+    microbench_record(
+        f'password.concurrent_logins[{method}-workers={workers}]',
+        threads=CONCURRENCY,
+        logins=total,
+        logins_per_sec=round(total / elapsed, 2),
+        rejected=len(busy),
+        probe_p95_ms=round(probes[max(0, int(len(probes) * 0.95) - 1)], 3) if probes else None,
+    )
@@ -0,0 +1,110 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+from flask import Flask
+from flask_limiter import Limiter
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import STRATEGIES
+
+from app.ratelimit import SharedMemoryStorage
+from conftest import CONCURRENCY, REPEAT
+
+REQUESTS = int(os.getenv('BENCH_RATELIMIT_REQUESTS', 500))
+HITS = int(os.getenv('BENCH_RATELIMIT_HITS', 10000))
+CLIENTS = 1000
+CONFIGS = [
+    ('memory://', 'fixed-window'),
+    ('memory://', 'sliding-window-counter'),
+    ('sharedmem', 'fixed-window'),
+    ('sharedmem', 'sliding-window-counter'),
+]
+
+def _uri(storage, tmp_path):
+    return f"sharedmem://{tmp_path / 'ratelimit'}" if storage == 'sharedmem' else storage
+
+def _limited_app(uri, strategy):
+    flask_app = Flask(__name__)
+    flask_app.config.update({'RATELIMIT_STORAGE_URI': uri, 'RATELIMIT_STRATEGY': strategy})
+    # Spread requests over many clients so the table holds realistic key counts
+    counter = iter(range(10 ** 9))
+    limiter = Limiter(key_func=lambda: f"10.0.{next(counter) % CLIENTS}", app=flask_app)
+
+    @flask_app.route('/limited')
+    @limiter.limit("1000000 per minute")
+    def limited():
+        return 'ok'
+
+    @flask_app.route('/plain')
+    @limiter.exempt
+    def plain():
+        return 'ok'
+
+    return flask_app
+
+@pytest.mark.parametrize('storage,strategy', CONFIGS)
+def test_request_overhead(microbench, microbench_record, tmp_path, storage, strategy):
+    """Time a limited route against an exempt one; the difference is the limiter's cost per request"""
+    client = _limited_app(_uri(storage, tmp_path), strategy).test_client()
+
+    def requests(path):
+        return lambda: [client.get(path) for _ in range(REQUESTS)]
+
+    plain = microbench(f'ratelimit.requests_plain[{storage}-{strategy}]', requests('/plain'))
+    limited = microbench(f'ratelimit.requests_limited[{storage}-{strategy}]', requests('/limited'))
+    microbench_record(
+        f'ratelimit.request_overhead[{storage}-{strategy}]',
+        requests=REQUESTS,
+        overhead_us_per_request=round((limited['median_ms'] - plain['median_ms']) * 1000 / REQUESTS, 2),
+    )
+
+@pytest.mark.parametrize('storage,strategy', CONFIGS)
+def test_storage_hit(microbench, tmp_path, storage, strategy):
+    """HITS limit checks straight against the storage, without Flask"""
+    limiter = STRATEGIES[strategy](storage_from_string(_uri(storage, tmp_path)))
+    if storage == 'sharedmem':
+        assert isinstance(limiter.storage, SharedMemoryStorage)
+    item = parse('1000000/minute')
+    keys = [f'10.0.{i}' for i in range(CLIENTS)]
+
+    def hits():
+        for i in range(HITS):
+            limiter.hit(item, keys[i % CLIENTS])
+
+    microbench(f'ratelimit.storage_hits[{storage}-{strategy}]', hits, repeat=max(3, REPEAT // 4))
+
+def _worker_hits(uri, strategy, hits, shared, results):
+    limiter = STRATEGIES[strategy](storage_from_string(uri))
+    item = parse('1000000/minute')
+    pid = os.getpid()
+    started = time.perf_counter()
+    for i in range(hits):
+        limiter.hit(item, 'hot-client' if shared else f'{pid}.{i % CLIENTS}')
+    results.put(time.perf_counter() - started)
+
+@pytest.mark.parametrize('shared', [False, True], ids=['distinct-keys', 'one-key'])
+def test_worker_contention(microbench_record, tmp_path, shared):
+    """CONCURRENCY processes hitting one table, like gunicorn workers sharing it"""
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    uri = _uri('sharedmem', tmp_path)
+    storage_from_string(uri)  # create the table outside the timed section
+    processes = [context.Process(target=_worker_hits, args=(uri, 'sliding-window-counter', HITS, shared, results))
+                 for _ in range(CONCURRENCY)]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    elapsed = [results.get(timeout=300) for _ in processes]
+    for process in processes:
+        process.join()
+    wall = time.perf_counter() - started
+
+    microbench_record(
+        f"ratelimit.worker_contention[{'one-key' if shared else 'distinct-keys'}]",
+        processes=CONCURRENCY,
+        hits=CONCURRENCY * HITS,
+        hits_per_sec=round(CONCURRENCY * HITS / wall),
+        worst_us_per_hit=round(max(elapsed) * 1e6 / HITS, 2),
+    )
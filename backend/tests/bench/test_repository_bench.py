@@ -0,0 +1,140 @@
+import pytest
+
+from app.db import db
+from app.models import Post
+from app.repositories import PostRepository, LikeRepository, CommentRepository
+from app.services.post_service import PostService
+from app.cache import FeedCache, LikedSetCache
+from app.utils.pagination import encode_cursor
+
+SORT_MODES = ['recent', 'likes', 'comments']
+PAGE_DEPTHS = [1, 10, 100]
+PAGE_SIZE = 10
+
+SORT_VALUE = {
+    'recent': lambda post: post.updated_at,
+    'likes': lambda post: post.likes_count,
+    'comments': lambda post: post.comments_count,
+}
+
+def _cursor_for_page(repo, sort_by, page):
+    """Walk the feed (untimed) to obtain the cursor that starts the given page"""
+    cursor = None
+    for _ in range(page - 1):
+        posts = repo.get_posts(sort_by=sort_by, limit=PAGE_SIZE, cursor=cursor)
+        if not posts:
+            break
+        last = posts[-1]
+        cursor = (SORT_VALUE[sort_by](last), last.post_id)
+    return cursor
+
+@pytest.fixture
+def hot_post_id(bench_app):
+    return db.session.query(Post.post_id).order_by(Post.comments_count.desc()).limit(1).scalar()
+
+class TestPostRepositoryBench:
+    @pytest.mark.parametrize('sort_by', SORT_MODES)
+    @pytest.mark.parametrize('page', PAGE_DEPTHS)
+    def test_get_posts_offset(self, bench, sort_by, page):
+        repo = PostRepository()
+        bench(f'post_repository.get_posts[{sort_by}-offset-p{page}]',
+              lambda: repo.get_posts(sort_by=sort_by, limit=PAGE_SIZE, offset=(page - 1) * PAGE_SIZE))
+
+    @pytest.mark.parametrize('sort_by', SORT_MODES)
+    @pytest.mark.parametrize('page', PAGE_DEPTHS)
+    def test_get_posts_cursor(self, bench, sort_by, page):
+        repo = PostRepository()
+        cursor = _cursor_for_page(repo, sort_by, page)
+        bench(f'post_repository.get_posts[{sort_by}-cursor-p{page}]',
+              lambda: repo.get_posts(sort_by=sort_by, limit=PAGE_SIZE, cursor=cursor))
+
+    @pytest.mark.parametrize('sort_by', SORT_MODES)
+    def test_get_posts_with_viewer(self, bench, sort_by):
+        repo = PostRepository()
+        bench(f'post_repository.get_posts[{sort_by}-viewer]',
+              lambda: repo.get_posts(sort_by=sort_by, limit=PAGE_SIZE, viewer_id=1))
+
+    def test_get_posts_search(self, bench):
+        repo = PostRepository()
+        bench('post_repository.get_posts[search]',
+              lambda: repo.get_posts(limit=PAGE_SIZE, search='fresco'))
+
+    def test_get_posts_profile(self, bench):
+        repo = PostRepository()
+        bench('post_repository.get_posts[profile]',
+              lambda: repo.get_posts(limit=PAGE_SIZE, user_id=1))
+
+    def test_get_post_by_id(self, bench, hot_post_id):
+        repo = PostRepository()
+        bench('post_repository.get_post_by_id', lambda: repo.get_post_by_id(hot_post_id, viewer_id=1))
+
+def _comment_cursor_for_page(repo, post_id, page, parent_id=None):
+    """Walk a comment list (untimed) to obtain the cursor that starts the given page"""
+    cursor = None
+    for _ in range(page - 1):
+        rows = repo.get_page(post_id, parent_id=parent_id, limit=PAGE_SIZE, cursor=cursor)
+        if not rows:
+            break
+        cursor = (rows[-1].created_at, rows[-1].comment_id)
+    return cursor
+
+class TestCommentRepositoryBench:
+    @pytest.mark.parametrize('page', PAGE_DEPTHS)
+    def test_get_page_hot_post(self, bench, hot_post_id, page):
+        repo = CommentRepository()
+        cursor = _comment_cursor_for_page(repo, hot_post_id, page)
+        bench(f'comment_repository.get_page[hot,page={page}]',
+              lambda: repo.get_page(hot_post_id, limit=PAGE_SIZE, cursor=cursor))
+
+    @pytest.mark.parametrize('max_depth', [None, 0])
+    def test_get_subtree(self, bench, max_depth):
+        repo = CommentRepository()
+        bench(f'comment_repository.get_subtree[depth={max_depth}]',
+              lambda: repo.get_subtree(5, max_depth=max_depth))
+
+    def test_get_page_replies(self, bench, hot_post_id):
+        repo = CommentRepository()
+        bench('comment_repository.get_page[replies]',
+              lambda: repo.get_page(hot_post_id, parent_id=5, limit=PAGE_SIZE))
+
+class TestLikeRepositoryBench:
+    def test_get_user_liked_post_ids_page(self, bench):
+        repo = LikeRepository()
+        post_ids = list(range(1, PAGE_SIZE + 1))
+        bench('like_repository.get_user_liked_post_ids[page]',
+              lambda: repo.get_user_liked_post_ids(1, post_ids))
+
+    def test_get_by_user_and_post(self, bench):
+        repo = LikeRepository()
+        bench('like_repository.get_by_user_and_post', lambda: repo.get_by_user_and_post(1, 1))
+
+    def test_count_likes_for_post(self, bench, hot_post_id):
+        repo = LikeRepository()
+        bench('like_repository.count_likes_for_post', lambda: repo.count_likes_for_post(hot_post_id))
+
+class TestPostServiceBench:
+    @pytest.mark.parametrize('sort_by', SORT_MODES)
+    def test_get_posts_first_page(self, bench, sort_by):
+        # An uninitialised FeedCache is a no-op, so this measures the uncached path
+        service = PostService(feed_cache=FeedCache())
+        bench(f'post_service.get_posts[{sort_by}]',
+              lambda: service.get_posts(sort_by=sort_by, limit=PAGE_SIZE, viewer_id=1))
+
+    @pytest.mark.parametrize('sort_by', SORT_MODES)
+    def test_get_posts_cursor_page(self, bench, sort_by):
+        service = PostService(feed_cache=FeedCache())
+        value, last_id = _cursor_for_page(PostRepository(), sort_by, 10)
+        cursor = encode_cursor(sort_by, value, last_id)
+        bench(f'post_service.get_posts[{sort_by}-cursor-p10]',
+              lambda: service.get_posts(sort_by=sort_by, limit=PAGE_SIZE, cursor=cursor, viewer_id=1))
+
+    def test_get_post_detail(self, bench, hot_post_id):
+        service = PostService(feed_cache=FeedCache())
+        bench('post_service.get_post_detail', lambda: service.get_post_detail(hot_post_id, 1))
+
+    def test_get_user_liked_posts_liked_set(self, bench, bench_app):
+        liked_sets = LikedSetCache(bench_app)
+        service = PostService(feed_cache=FeedCache(), liked_set_cache=liked_sets)
+        post_ids = list(range(1, PAGE_SIZE + 1))
+        service.get_user_liked_posts(1, post_ids)
+        bench('post_service.get_user_liked_posts[liked-set]', lambda: service.get_user_liked_posts(1, post_ids))
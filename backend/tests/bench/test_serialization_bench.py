@@ -0,0 +1,86 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app.utils.json_provider import FastJSONProvider, RawJSON, dumps_bytes
+
+PAGE_SIZES = [10, 50, 500]
+
+def _feed_page(size):
+    base = datetime(2024, 1, 1, 12, 30, 15)
+    posts = [
+        {
+            "liked": False,
+            "post_id": size - i,
+            "title": f"Post {i} on fresco technique",
+            "content": "lorem ipsum dolor sit amet " * 10,
+            "content_truncated": True,
+            "created_at": base + timedelta(minutes=i),
+            "updated_at": base + timedelta(minutes=i),
+            "user_id": i % 50,
+            "username": f"user{i % 50}",
+            "profile_picture": None,
+            "image": f"/post_uploads/user_{i}_{i}.png",
+            "likes": i * 3,
+            "comments": i,
+        }
+        for i in range(size)
+    ]
+    return {"posts": posts, "offset": 0, "limit": size, "has_more": True, "next_cursor": "eyJzIjoicmVjZW50In0"}
+
+def _isoformatted(page):
+    """The page as services built it before: datetimes converted by hand"""
+    posts = [dict(post, created_at=post["created_at"].isoformat(), updated_at=post["updated_at"].isoformat())
+             for post in page["posts"]]
+    return dict(page, posts=posts)
+
+@pytest.mark.parametrize('size', PAGE_SIZES)
+class TestSerializationBench:
+    def test_default_provider(self, microbench, size):
+        app = Flask(__name__)
+        app.json = DefaultJSONProvider(app)
+        page = _feed_page(size)
+        with app.app_context():
+            microbench(f'serialize.default_jsonify[{size}]', lambda: app.json.response(_isoformatted(page)))
+
+    def test_fast_provider(self, microbench, size):
+        app = Flask(__name__)
+        app.json = FastJSONProvider(app)
+        page = _feed_page(size)
+        with app.app_context():
+            microbench(f'serialize.fast_jsonify[{size}]', lambda: app.json.response(page))
+
+    def test_fast_provider_pre_encoded(self, microbench, size):
+        # Payloads encoded once (e.g. cached pages) are written to the response as they are
+        app = Flask(__name__)
+        app.json = FastJSONProvider(app)
+        raw = RawJSON(dumps_bytes(_feed_page(size)))
+        with app.app_context():
+            microbench(f'serialize.fast_jsonify_raw[{size}]', lambda: app.json.response(raw))
+
+    def test_cached_page_reencoded(self, microbench, size):
+        # The old cache hit path: decode the cached page, overlay likes, encode again
+        cached = json.dumps(_isoformatted(_feed_page(size))).encode("utf-8")
+
+        def run():
+            result = json.loads(cached)
+            for post in result["posts"]:
+                post["liked"] = post["post_id"] % 7 == 0
+            return json.dumps(result).encode("utf-8")
+
+        microbench(f'serialize.cache_hit_reencode[{size}]', run)
+
+    def test_cached_page_spliced(self, microbench, size):
+        from app.services.post_service import PostService, FEED_POST_ID_RE
+
+        cached = dumps_bytes(_feed_page(size))
+        service = PostService.__new__(PostService)
+
+        def run():
+            ids = [int(pid) for pid in FEED_POST_ID_RE.findall(cached)]
+            return service._with_viewer_likes(cached, [pid for pid in ids if pid % 7 == 0]).data
+
+        microbench(f'serialize.cache_hit_splice[{size}]', run)
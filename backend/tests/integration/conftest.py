@@ -0,0 +1,65 @@
+import pytest
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add the backend directory to the Python path
+backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, backend_dir)
+
+MYSQL_URI = os.getenv('TEST_MYSQL_URI')
+
+@pytest.fixture(scope='session')
+def mysql_app():
+    """Flask app bound to a disposable MySQL database given by TEST_MYSQL_URI"""
+    if not MYSQL_URI:
+        pytest.skip("TEST_MYSQL_URI is not set; integration tests need a MySQL server")
+
+    from flask import Flask
+    from app.db import db
+
+    app = Flask(__name__)
+    app.config.update({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': MYSQL_URI,
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+    })
+    db.init_app(app)
+
+    with app.app_context():
+        from app import models
+        db.drop_all()
+        db.create_all()
+        _seed(db)
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def _seed(db, users=500, posts=5000):
+    """Seed enough rows that the optimizer prefers indexes over scanning"""
+    from app.models import User, Post, Like, Comment
+    from app.models.comments import path_segment
+
+    base = datetime(2024, 1, 1)
+    db.session.execute(User.__table__.insert(), [
+        {'user_id': i, 'username': f'user{i}', 'email': f'user{i}@example.com', 'password': 'x'}
+        for i in range(1, users + 1)
+    ])
+    db.session.execute(Post.__table__.insert(), [
+        {'post_id': i, 'user_id': i % users + 1, 'title': f'post {i} about paintings',
+         'content': 'lorem ipsum ' * 20, 'created_at': base + timedelta(minutes=i),
+         'updated_at': base + timedelta(minutes=i), 'likes_count': i % 37, 'comments_count': i % 11}
+        for i in range(1, posts + 1)
+    ])
+    db.session.execute(Like.__table__.insert(), [
+        {'user_id': u, 'post_id': p}
+        for p in range(1, posts + 1, 7) for u in range(1, users + 1, 97)
+    ])
+    # Three comments on every third post: one top-level comment and two replies to it
+    db.session.execute(Comment.__table__.insert(), [
+        {'comment_id': p + k, 'post_id': p, 'parent_id': p if k else None, 'user_id': p % users + 1,
+         'content': 'nice', 'created_at': base + timedelta(minutes=p + k),
+         'path': path_segment(p) + (path_segment(p + k) if k else ''), 'depth': 1 if k else 0}
+        for p in range(1, posts + 1, 3) for k in range(3)
+    ])
+    db.session.commit()
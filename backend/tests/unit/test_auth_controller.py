@@ -0,0 +1,45 @@
+import pytest
+import sys
+import os
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.controllers.auth_controller import AuthController
+from app.utils.user_context import context_of
+
+class TestAuthControllerVerifyTotp:
+
+    @pytest.fixture
+    def mock_auth_service(self):
+        service = Mock()
+        service.issue_access_token.return_value = {"access_token": "fresh"}
+        return service
+
+    @pytest.fixture
+    def verify_totp(self, mock_auth_service):
+        controller = AuthController(auth_service=mock_auth_service)
+        # Skip the JWT check; the token is a TOTP-verified one for user 7
+        with patch('app.controllers.auth_controller.get_jwt_identity', return_value='7'):
+            yield lambda: AuthController.verify_totp.__wrapped__(controller)
+
+    def test_deleted_user_cannot_renew(self, verify_totp, mock_auth_service):
+        mock_auth_service.get_user.return_value = None
+
+        response, status = verify_totp()
+
+        assert status == 404
+        mock_auth_service.issue_access_token.assert_not_called()
+
+    def test_token_is_minted_from_the_row(self, verify_totp, mock_auth_service):
+        """Claims come from the current row, not from the token being renewed"""
+        user = SimpleNamespace(user_id=7, membership='premium', totp_verified=True, username='sculptor', token_version=4)
+        mock_auth_service.get_user.return_value = user
+
+        response, status = verify_totp()
+
+        assert status == 200
+        assert response.get_json()["access_token"] == "fresh"
+        mock_auth_service.get_user.assert_called_once_with(7)
+        mock_auth_service.issue_access_token.assert_called_once_with(context_of(user))
@@ -8,6 +8,7 @@ backend_dir = os.path.join(os.path.dirname(__file__), '..', '..')
 sys.path.insert(0, backend_dir)
 
 from app.services.auth_service import AuthService
+from app.repositories.user_repository import UserConflictError
 
 class TestAuthService:
     
@@ -21,8 +22,7 @@ class TestAuthService:
     
     def test_validate_signup_data_success(self, auth_service, mock_user_repository):
         """Test successful signup data validation"""
-        mock_user_repository.check_username_exists.return_value = False
-        mock_user_repository.check_email_exists.return_value = False
+        mock_user_repository.find_conflicts.return_value = set()
         
         data = {
             'username': 'testuser',
@@ -66,7 +66,7 @@ class TestAuthService:
     
     def test_validate_signup_data_username_exists(self, auth_service, mock_user_repository):
         """Test validation fails when username already exists"""
-        mock_user_repository.check_username_exists.return_value = True
+        mock_user_repository.find_conflicts.return_value = {'username'}
         
         data = {
             'username': 'existinguser',
@@ -79,9 +79,18 @@ class TestAuthService:
         assert is_valid is False
         assert "Username already exists" in message
     
+    def test_validate_signup_data_checks_both_fields_at_once(self, auth_service, mock_user_repository):
+        """Username and email are checked in one repository call; the username is reported first"""
+        mock_user_repository.find_conflicts.return_value = {'username', 'email'}
+        data = {'username': 'existinguser', 'email': 'existing@example.com', 'password': 'Password123!'}
+
+        is_valid, message = auth_service.validate_signup_data(data)
+
+        assert (is_valid, message) == (False, "Username already exists")
+        mock_user_repository.find_conflicts.assert_called_once_with(username='existinguser', email='existing@example.com')
+    
     def test_validate_signup_data_invalid_email(self, auth_service, mock_user_repository):
         """Test validation fails with invalid email format"""
-        mock_user_repository.check_username_exists.return_value = False
         
         data = {
             'username': 'testuser',
@@ -97,8 +106,7 @@ class TestAuthService:
     
     def test_validate_signup_data_email_exists(self, auth_service, mock_user_repository):
         """Test validation fails when email already exists"""
-        mock_user_repository.check_username_exists.return_value = False
-        mock_user_repository.check_email_exists.return_value = True
+        mock_user_repository.find_conflicts.return_value = {'email'}
         
         data = {
             'username': 'testuser',
@@ -111,3 +119,150 @@ class TestAuthService:
             
             assert is_valid is False
             assert "Email already exists" in message
+
+class TestAuthServiceLogin:
+
+    @pytest.fixture
+    def mock_user_repository(self):
+        return Mock()
+
+    @pytest.fixture
+    def mock_password_hasher(self):
+        return Mock()
+
+    @pytest.fixture
+    def auth_service(self, mock_user_repository, mock_password_hasher):
+        return AuthService(user_repository=mock_user_repository, password_hasher=mock_password_hasher)
+
+    def test_login_success(self, auth_service, mock_user_repository, mock_password_hasher):
+        user = Mock(username='testuser', password='pbkdf2:sha256:1000$salt$hash')
+        mock_user_repository.get_by_email.return_value = user
+        mock_password_hasher.verify.return_value = True
+        mock_password_hasher.needs_rehash.return_value = False
+
+        result, error = auth_service.login('test@example.com', 'Password123!')
+
+        assert (result, error) == (user, None)
+        mock_password_hasher.verify.assert_called_once_with(user.password, 'Password123!')
+        mock_user_repository.update.assert_not_called()
+
+    def test_login_upgrades_outdated_hash(self, auth_service, mock_user_repository, mock_password_hasher):
+        """A correct password stored with old parameters is hashed again with the current ones"""
+        user = Mock(username='testuser', password='pbkdf2:sha256:260000$salt$hash')
+        mock_user_repository.get_by_email.return_value = user
+        mock_password_hasher.verify.return_value = True
+        mock_password_hasher.needs_rehash.return_value = True
+        mock_password_hasher.hash.return_value = 'scrypt:32768:8:1$new$hash'
+
+        result, error = auth_service.login('test@example.com', 'Password123!')
+
+        assert (result, error) == (user, None)
+        mock_password_hasher.hash.assert_called_once_with('Password123!')
+        mock_user_repository.update.assert_called_once_with(user, {"password": 'scrypt:32768:8:1$new$hash'})
+
+    def test_login_survives_failed_upgrade(self, auth_service, mock_user_repository, mock_password_hasher):
+        user = Mock(username='testuser', password='old')
+        mock_user_repository.get_by_email.return_value = user
+        mock_password_hasher.verify.return_value = True
+        mock_password_hasher.needs_rehash.return_value = True
+        mock_user_repository.update.side_effect = Exception("database unavailable")
+
+        result, error = auth_service.login('test@example.com', 'Password123!')
+
+        assert (result, error) == (user, None)
+
+    def test_login_wrong_password(self, auth_service, mock_user_repository, mock_password_hasher):
+        mock_user_repository.get_by_email.return_value = Mock(username='testuser', password='hash')
+        mock_password_hasher.verify.return_value = False
+
+        result, error = auth_service.login('test@example.com', 'wrong')
+
+        assert result is None
+        assert error == "Invalid email or password"
+        mock_password_hasher.needs_rehash.assert_not_called()
+
+class TestAuthServiceSignup:
+
+    @pytest.fixture
+    def mock_user_repository(self):
+        return Mock()
+
+    @pytest.fixture
+    def auth_service(self, mock_user_repository, mock_flask_app):
+        mock_flask_app.config['FRONTEND_ROUTE'] = 'https://example.com'
+        return AuthService(user_repository=mock_user_repository, password_hasher=Mock(),
+                           email_outbox_repository=Mock(), email_sender=Mock())
+
+    def test_create_user_queues_verification_email(self, auth_service, mock_user_repository):
+        """The user and its verification email are written together; nothing is sent in the request"""
+        created = Mock(user_id=7, username='testuser', email='test@example.com')
+        mock_user_repository.create_with_email.return_value = created
+
+        user, error = auth_service.create_user({'username': 'testuser', 'email': 'test@example.com', 'password': 'Password123!'})
+
+        assert (user, error) == (created, None)
+        user_data, compose = mock_user_repository.create_with_email.call_args.args
+        assert user_data['password'] == auth_service.password_hasher.hash.return_value
+        message = compose(created)
+        assert message['recipient'] == 'test@example.com'
+        assert message['body'].count('https://example.com/verify_email?token=') == 1
+        auth_service.email_sender.notify.assert_called_once()
+
+    def test_create_user_reports_lost_race(self, auth_service, mock_user_repository):
+        """An email registered between validation and insert is reported instead of failing the request"""
+        mock_user_repository.create_with_email.side_effect = UserConflictError({'email'})
+
+        user, error = auth_service.create_user({'username': 'testuser', 'email': 'test@example.com', 'password': 'Password123!'})
+
+        assert (user, error) == (None, "Email already exists")
+        auth_service.email_sender.notify.assert_not_called()
+
+class TestAuthServiceTokens:
+
+    @pytest.fixture
+    def mock_user_repository(self):
+        return Mock()
+
+    @pytest.fixture
+    def auth_service(self, mock_user_repository):
+        return AuthService(user_repository=mock_user_repository, password_hasher=Mock(),
+                           email_outbox_repository=Mock(), email_sender=Mock(), token_versions=Mock())
+
+    @pytest.fixture
+    def user(self):
+        return Mock(user_id=7, membership='premium', totp_verified=True, username='painter', token_version=3)
+
+    def test_generate_tokens_embeds_user_context(self, auth_service, user):
+        from app.utils.user_context import context_from_claims, context_of
+
+        with patch('app.services.auth_service.create_access_token', return_value='access') as create_access, \
+             patch('app.services.auth_service.create_refresh_token', return_value='refresh'):
+            tokens = auth_service.generate_tokens(user)
+
+        assert tokens == {'access_token': 'access', 'refresh_token': 'refresh'}
+        kwargs = create_access.call_args.kwargs
+        assert kwargs['identity'] == '7'
+        assert kwargs['additional_claims']['totp_verified'] is True
+        assert context_from_claims('7', kwargs['additional_claims']) == context_of(user)
+
+    def test_refresh_reads_current_claims(self, auth_service, mock_user_repository, user):
+        mock_user_repository.get_by_id.return_value = user
+
+        with patch('app.services.auth_service.create_access_token', return_value='access') as create_access:
+            assert auth_service.refresh_access_token('7') == {'access_token': 'access'}
+
+        mock_user_repository.get_by_id.assert_called_once_with(7)
+        assert create_access.call_args.kwargs['additional_claims']['ctx']['g'] == 3
+
+    def test_refresh_for_deleted_user(self, auth_service, mock_user_repository):
+        mock_user_repository.get_by_id.return_value = None
+
+        assert auth_service.refresh_access_token('7') is None
+
+    def test_update_totp_verified_marks_old_tokens_stale(self, auth_service, mock_user_repository, user):
+        mock_user_repository.get_by_id.return_value = user
+
+        auth_service.update_totp_verified(7, True)
+
+        mock_user_repository.update.assert_called_once_with(user, {"totp_verified": True})
+        auth_service.token_versions.bump.assert_called_once_with(7, user.token_version)
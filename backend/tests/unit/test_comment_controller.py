@@ -0,0 +1,45 @@
+import pytest
+import sys
+import os
+from unittest.mock import Mock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.controllers.comment_controller import CommentController
+from app.services.comment_service import COMMENT_NOT_FOUND_ERROR
+
+class TestCommentControllerDelete:
+
+    @pytest.fixture
+    def mock_comment_service(self):
+        return Mock()
+
+    @pytest.fixture
+    def delete_comment(self, mock_comment_service):
+        controller = CommentController(comment_service=mock_comment_service)
+        # Skip the JWT check; the identity is patched below
+        with patch('app.controllers.comment_controller.get_jwt_identity', return_value='2'):
+            yield lambda comment_id: CommentController.delete_comment.__wrapped__(controller, comment_id)
+
+    def test_missing_comment_is_not_found(self, delete_comment, mock_comment_service):
+        mock_comment_service.delete_comment.return_value = (False, COMMENT_NOT_FOUND_ERROR)
+
+        response, status = delete_comment('5')
+
+        assert status == 404
+        assert response.get_json() == {"error": COMMENT_NOT_FOUND_ERROR}
+        mock_comment_service.delete_comment.assert_called_once_with(5, 2)
+
+    def test_other_users_comment_is_forbidden(self, delete_comment, mock_comment_service):
+        mock_comment_service.delete_comment.return_value = (False, "Unauthorized: You can only delete your own comments")
+
+        _, status = delete_comment('5')
+
+        assert status == 403
+
+    def test_deleted(self, delete_comment, mock_comment_service):
+        mock_comment_service.delete_comment.return_value = (True, "Comment deleted successfully")
+
+        _, status = delete_comment('5')
+
+        assert status == 200
@@ -0,0 +1,170 @@
+import pytest
+import sys
+import os
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.services.comment_service import CommentService, THREAD_CURSOR_KEY, COMMENT_NOT_FOUND_ERROR
+from app.utils.pagination import encode_cursor, decode_cursor
+
+def make_row(comment_id, parent_id=None, reply_count=0):
+    return SimpleNamespace(
+        comment_id=comment_id,
+        post_id=1,
+        parent_id=parent_id,
+        user_id=2,
+        username='painter',
+        content=f'comment {comment_id}',
+        image=None,
+        created_at=datetime(2024, 1, 1, 12, 0, comment_id),
+        reply_count=reply_count
+    )
+
+class TestCommentService:
+
+    @pytest.fixture
+    def mock_comment_repository(self):
+        return Mock()
+
+    @pytest.fixture
+    def comment_service(self, mock_comment_repository):
+        return CommentService(comment_repository=mock_comment_repository, feed_cache=Mock(), media_service=Mock())
+
+    def test_get_comments_by_post_first_page(self, comment_service, mock_comment_repository):
+        """Top-level comments are fetched with one extra row to detect the next page"""
+        mock_comment_repository.get_page.return_value = [make_row(i, reply_count=i % 2) for i in range(1, 4)]
+
+        result = comment_service.get_comments_by_post(1, limit=2)
+
+        mock_comment_repository.get_page.assert_called_once_with(1, parent_id=None, limit=3, cursor=None)
+        assert [c['comment_id'] for c in result['comments']] == [1, 2]
+        assert [c['reply_count'] for c in result['comments']] == [1, 0]
+        assert result['has_more'] is True
+
+        created_at, last_id = decode_cursor(result['next_cursor'], THREAD_CURSOR_KEY, datetime_value=True)
+        assert (created_at, last_id) == (datetime(2024, 1, 1, 12, 0, 2), 2)
+
+    def test_get_comments_by_post_last_page(self, comment_service, mock_comment_repository):
+        """A short page has no next cursor"""
+        mock_comment_repository.get_page.return_value = [make_row(3)]
+        cursor = encode_cursor(THREAD_CURSOR_KEY, datetime(2024, 1, 1, 12, 0, 2), 2)
+
+        result = comment_service.get_comments_by_post(1, limit=2, cursor=cursor)
+
+        mock_comment_repository.get_page.assert_called_once_with(
+            1, parent_id=None, limit=3, cursor=(datetime(2024, 1, 1, 12, 0, 2), 2)
+        )
+        assert result['has_more'] is False
+        assert result['next_cursor'] is None
+
+    def test_get_comments_by_post_rejects_feed_cursor(self, comment_service, mock_comment_repository):
+        """Cursors issued by the post feed are not accepted for comment pages"""
+        cursor = encode_cursor('recent', datetime(2024, 1, 1), 5)
+
+        with pytest.raises(ValueError, match='Invalid cursor'):
+            comment_service.get_comments_by_post(1, cursor=cursor)
+        mock_comment_repository.get_page.assert_not_called()
+
+    def test_get_replies(self, comment_service, mock_comment_repository):
+        """Replies are paged per parent"""
+        mock_comment_repository.get_page.return_value = [make_row(7, parent_id=3, reply_count=2)]
+
+        result = comment_service.get_replies(1, 3, limit=20)
+
+        mock_comment_repository.get_page.assert_called_once_with(1, parent_id=3, limit=21, cursor=None)
+        assert result['comments'][0]['parent_id'] == 3
+        assert result['comments'][0]['reply_count'] == 2
+        assert result['has_more'] is False
+
+    def test_get_comments_etag(self, comment_service, mock_comment_repository):
+        """Adding or deleting a comment anywhere in the post changes the ETag"""
+        version = SimpleNamespace(comment_count=3, last_comment_id=9)
+        mock_comment_repository.get_thread_version.return_value = version
+        etag = comment_service.get_comments_etag(1)
+
+        version.comment_count = 2
+        deleted_etag = comment_service.get_comments_etag(1)
+        version.comment_count, version.last_comment_id = 3, 10
+        assert len({etag, deleted_etag, comment_service.get_comments_etag(1)}) == 3
+
+    def test_get_comments_page_etag_from_rows(self, comment_service, mock_comment_repository):
+        """Page rows carry the post's version, so a non-empty page needs no probe and matches it"""
+        row = make_row(1)
+        row.comment_count, row.last_comment_id = 3, 9
+        mock_comment_repository.get_page.return_value = [row]
+        mock_comment_repository.get_thread_version.return_value = SimpleNamespace(comment_count=3, last_comment_id=9)
+
+        page, etag = comment_service.get_comments_page(1, limit=2)
+
+        assert [c['comment_id'] for c in page['comments']] == [1]
+        assert etag == comment_service.get_comments_etag(1)
+        mock_comment_repository.get_thread_version.assert_called_once_with(1)
+
+    def test_get_comments_page_empty_probes(self, comment_service, mock_comment_repository):
+        mock_comment_repository.get_page.return_value = []
+        mock_comment_repository.get_thread_version.return_value = None
+
+        page, etag = comment_service.get_comments_page(1, parent_id=3)
+
+        assert page['comments'] == []
+        assert etag == comment_service.get_comments_etag(1)
+
+    def test_get_thread_nests_replies(self, comment_service, mock_comment_repository):
+        """Rows in path order are nested under their parents"""
+        rows = [
+            make_row(1, reply_count=2),
+            make_row(2, parent_id=1, reply_count=1),
+            make_row(4, parent_id=2),
+            make_row(3, parent_id=1),
+        ]
+        for row, depth in zip(rows, (0, 1, 2, 1)):
+            row.depth = depth
+        mock_comment_repository.get_subtree.return_value = rows
+
+        thread = comment_service.get_thread(1, max_depth=2)
+
+        mock_comment_repository.get_subtree.assert_called_once_with(1, max_depth=2)
+        assert thread['comment_id'] == 1
+        assert [r['comment_id'] for r in thread['replies']] == [2, 3]
+        assert [r['comment_id'] for r in thread['replies'][0]['replies']] == [4]
+        assert thread['replies'][1]['replies'] == []
+
+    def test_get_thread_not_found(self, comment_service, mock_comment_repository):
+        mock_comment_repository.get_subtree.return_value = []
+        assert comment_service.get_thread(99) is None
+
+    def test_delete_comment_not_found(self, comment_service, mock_comment_repository):
+        mock_comment_repository.get_by_id.return_value = None
+
+        assert comment_service.delete_comment(5, 2) == (False, COMMENT_NOT_FOUND_ERROR)
+        mock_comment_repository.delete_subtree.assert_not_called()
+
+    def test_delete_comment_unauthorized(self, comment_service, mock_comment_repository):
+        """Only the author may delete a comment"""
+        mock_comment_repository.get_by_id.return_value = SimpleNamespace(comment_id=5, post_id=1, user_id=3)
+
+        success, message = comment_service.delete_comment(5, 2)
+
+        assert success is False
+        assert message.startswith("Unauthorized")
+        mock_comment_repository.delete_subtree.assert_not_called()
+
+    def test_delete_comment_removes_subtree_and_images(self, comment_service, mock_comment_repository):
+        """The whole subtree goes in one repository call and its images are released"""
+        mock_comment_repository.get_by_id.return_value = SimpleNamespace(comment_id=5, post_id=1, user_id=2)
+        stored = f"/comment_uploads/{'ab' * 32}.png"
+        mock_comment_repository.delete_subtree.return_value = (3, [stored, '/comment_uploads/a.png'])
+        comment_service.media_service.release.side_effect = lambda image: image == stored
+
+        with patch('os.remove') as mock_remove:
+            success, _ = comment_service.delete_comment(5, 2)
+
+        assert success is True
+        mock_comment_repository.delete_subtree.assert_called_once_with(5)
+        # Media references are released; older uploads are removed from the comment folder
+        assert [c.args[0] for c in comment_service.media_service.release.call_args_list] == [stored, '/comment_uploads/a.png']
+        mock_remove.assert_called_once_with(os.path.join(comment_service.UPLOAD_FOLDER, 'a.png'))
+        comment_service.feed_cache.invalidate.assert_called_once()
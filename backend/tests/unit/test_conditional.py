@@ -0,0 +1,65 @@
+import pytest
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.utils.conditional import make_etag, is_not_modified, not_modified_response, with_validators
+
+LAST_MODIFIED = datetime(2024, 1, 2, 3, 4, 5, 678)
+
+class TestConditionalRequests:
+    
+    @pytest.fixture
+    def client(self):
+        from flask import Flask, jsonify
+        
+        app = Flask(__name__)
+        
+        @app.route('/resource/<int:version>')
+        def resource(version):
+            etag = make_etag('resource', version)
+            if is_not_modified(etag, LAST_MODIFIED):
+                return not_modified_response(etag, LAST_MODIFIED)
+            return with_validators(jsonify({"version": version}), etag, LAST_MODIFIED)
+        
+        return app.test_client()
+    
+    def test_first_request_carries_validators(self, client):
+        """Test full responses carry a weak ETag, Last-Modified and private revalidation headers"""
+        response = client.get('/resource/1')
+        
+        assert response.status_code == 200
+        assert response.headers['ETag'].startswith('W/"')
+        assert response.headers['Last-Modified'] == 'Tue, 02 Jan 2024 03:04:05 GMT'
+        assert response.headers['Cache-Control'] == 'private, no-cache'
+        assert 'Authorization' in response.headers['Vary']
+    
+    def test_matching_etag_returns_304(self, client):
+        """Test a matching If-None-Match is answered with an empty 304"""
+        etag = client.get('/resource/1').headers['ETag']
+        
+        response = client.get('/resource/1', headers={'If-None-Match': etag})
+        
+        assert response.status_code == 304
+        assert response.data == b''
+        assert response.headers['ETag'] == etag
+    
+    def test_changed_version_returns_200(self, client):
+        """Test a stale ETag gets the full body even when the timestamp is unchanged"""
+        etag = client.get('/resource/1').headers['ETag']
+        
+        response = client.get('/resource/2', headers={
+            'If-None-Match': etag,
+            'If-Modified-Since': 'Tue, 02 Jan 2024 03:04:05 GMT'
+        })
+        
+        assert response.status_code == 200
+        assert response.get_json() == {"version": 2}
+    
+    def test_if_modified_since_returns_304(self, client):
+        """Test If-Modified-Since alone is honoured when no ETag is sent"""
+        response = client.get('/resource/1', headers={'If-Modified-Since': 'Tue, 02 Jan 2024 03:04:05 GMT'})
+        
+        assert response.status_code == 304
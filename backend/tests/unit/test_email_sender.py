@@ -0,0 +1,139 @@
+import pytest
+import sys
+import os
+import socket
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+pytest.importorskip('aiosmtpd')
+from aiosmtpd.controller import Controller
+from flask import Flask
+
+from app.workers.email_sender import EmailSender
+from app.repositories.email_outbox_repository import utcnow
+
+def make_row(email_id, recipient='painter@example.com', attempts=1):
+    return SimpleNamespace(email_id=email_id, recipient=recipient, subject=f'Subject {email_id}',
+                           body=f'Body {email_id}', attempts=attempts)
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+class SinkHandler:
+    """Accepts everything except recipients named bounce (550) or later (451)"""
+
+    def __init__(self):
+        self.messages = []
+        self.peers = set()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith('bounce'):
+            return '550 No such user'
+        if address.startswith('later'):
+            return '451 Try again later'
+        envelope.rcpt_tos.append(address)
+        return '250 OK'
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        self.peers.add(session.peer)
+        return '250 Message accepted'
+
+class TestEmailSender:
+
+    @pytest.fixture
+    def smtp_sink(self):
+        handler = SinkHandler()
+        controller = Controller(handler, hostname='127.0.0.1', port=free_port())
+        controller.start()
+        yield controller, handler
+        controller.stop()
+
+    @pytest.fixture
+    def mock_outbox_repository(self):
+        return Mock()
+
+    @pytest.fixture
+    def sender(self, smtp_sink, mock_outbox_repository):
+        controller, _ = smtp_sink
+        app = Flask(__name__)
+        app.config.update({
+            'MAIL_SERVER': controller.hostname,
+            'MAIL_PORT': controller.port,
+            'MAIL_USE_TLS': False,
+            'MAIL_DEFAULT_SENDER': 'noreply@example.com',
+            'EMAIL_OUTBOX_SENDER': False,
+            'EMAIL_OUTBOX_BATCH_SIZE': 2,
+        })
+        sender = EmailSender(app, outbox_repository=mock_outbox_repository)
+        with app.app_context():
+            yield sender
+        sender.stop()
+
+    def test_drains_batches_over_one_connection(self, sender, smtp_sink, mock_outbox_repository):
+        """Every batch is sent over the same SMTP connection and recorded in one update"""
+        _, handler = smtp_sink
+        mock_outbox_repository.claim_due.side_effect = [[make_row(1), make_row(2)], [make_row(3)], []]
+
+        assert sender.drain() == (3, 0)
+
+        mock_outbox_repository.claim_due.assert_called_with(2, sender.lease_seconds)
+        assert [c.args[0] for c in mock_outbox_repository.mark_sent.call_args_list] == [[1, 2], [3]]
+        assert len(handler.messages) == 3
+        assert len(handler.peers) == 1
+        assert handler.messages[0].mail_from == 'noreply@example.com'
+        assert b'Subject: Subject 1' in handler.messages[0].content
+
+    def test_reconnects_after_server_drops_connection(self, sender, smtp_sink, mock_outbox_repository):
+        _, handler = smtp_sink
+        mock_outbox_repository.claim_due.side_effect = [[make_row(1)], [], [make_row(2)], []]
+        sender.drain()
+        sender._smtp.sock.close()
+
+        assert sender.drain() == (1, 0)
+        assert len(handler.messages) == 2
+
+    def test_rejected_recipient_fails_permanently(self, sender, smtp_sink, mock_outbox_repository):
+        """A 5xx rejection is not retried and does not hold up the rest of the batch"""
+        _, handler = smtp_sink
+        mock_outbox_repository.claim_due.side_effect = [[make_row(1, 'bounce@example.com'), make_row(2)], []]
+
+        assert sender.drain() == (1, 1)
+
+        email_id, error, retry_at = mock_outbox_repository.mark_failed.call_args.args
+        assert (email_id, retry_at) == (1, None)
+        assert '550' in error
+        mock_outbox_repository.mark_sent.assert_called_once_with([2])
+
+    def test_temporary_failure_is_retried_with_backoff(self, sender, smtp_sink, mock_outbox_repository):
+        """A 4xx leaves the row pending, and later rows of the batch wait for the next attempt"""
+        mock_outbox_repository.claim_due.side_effect = [[make_row(1, 'later@example.com', attempts=3), make_row(2)], []]
+        before = utcnow()
+
+        assert sender.drain() == (0, 0)
+
+        retried = {c.args[0]: c.args[2] for c in mock_outbox_repository.mark_failed.call_args_list}
+        assert set(retried) == {1, 2}
+        # Third attempt: between half and all of 30s * 2^2
+        assert 59 <= (retried[1] - before).total_seconds() <= 121
+        mock_outbox_repository.claim_due.assert_called_once()
+
+    def test_gives_up_after_max_attempts(self, sender, mock_outbox_repository):
+        mock_outbox_repository.claim_due.side_effect = [[make_row(1, 'later@example.com', attempts=sender.max_attempts)], []]
+
+        assert sender.drain() == (0, 1)
+        assert mock_outbox_repository.mark_failed.call_args.args[2] is None
+
+    def test_unreachable_server_reschedules_batch(self, sender, mock_outbox_repository):
+        sender.app.config['MAIL_PORT'] = free_port()
+        mock_outbox_repository.claim_due.side_effect = [[make_row(1), make_row(2)], []]
+
+        assert sender.drain() == (0, 0)
+        assert all(c.args[2] is not None for c in mock_outbox_repository.mark_failed.call_args_list)
+        assert mock_outbox_repository.mark_failed.call_count == 2
+        # Only the email that was tried keeps its attempt
+        assert [c.kwargs.get('attempted', True) for c in mock_outbox_repository.mark_failed.call_args_list] == [True, False]
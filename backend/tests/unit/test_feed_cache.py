@@ -0,0 +1,80 @@
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.cache import FeedCache, InMemoryCacheBackend
+
+class TestFeedCache:
+    
+    @pytest.fixture
+    def feed_cache(self, mock_flask_app):
+        mock_flask_app.config.update({
+            'FEED_CACHE_BACKEND': 'memory',
+            'FEED_CACHE_TTL_SECONDS': 30,
+            'FEED_CACHE_MAX_ENTRIES': 2
+        })
+        return FeedCache(mock_flask_app)
+    
+    def test_disabled_without_backend(self):
+        """Test an unconfigured cache never stores anything"""
+        cache = FeedCache()
+        cache.set('key', b'{}', ['scope:all'])
+        
+        assert cache.enabled is False
+        assert cache.get('key') is None
+    
+    def test_set_and_get_bytes(self, feed_cache):
+        """Test payloads round-trip as bytes"""
+        feed_cache.set('key', b'{"posts": []}', ['scope:all'])
+        
+        assert feed_cache.get('key') == b'{"posts": []}'
+    
+    def test_make_key_varies_by_parameters(self):
+        """Test every query parameter is part of the cache key"""
+        base = FeedCache.make_key('recent', None, 0, 10, None, None)
+        
+        assert base == FeedCache.make_key('recent', None, 0, 10, None, None)
+        assert base != FeedCache.make_key('likes', None, 0, 10, None, None)
+        assert base != FeedCache.make_key('recent', 'abc', 0, 10, None, None)
+        assert base != FeedCache.make_key('recent', None, 10, 10, None, None)
+        assert base != FeedCache.make_key('recent', None, 0, 10, 'cats', None)
+        assert base != FeedCache.make_key('recent', None, 0, 10, None, 3)
+    
+    def test_lru_eviction(self, feed_cache):
+        """Test the least recently used entry is evicted beyond capacity"""
+        feed_cache.set('a', b'1', [])
+        feed_cache.set('b', b'2', [])
+        feed_cache.get('a')
+        feed_cache.set('c', b'3', [])
+        
+        assert feed_cache.get('a') == b'1'
+        assert feed_cache.get('b') is None
+        assert feed_cache.get('c') == b'3'
+    
+    def test_ttl_expiry(self, feed_cache):
+        """Test entries expire after the configured TTL"""
+        with patch('app.cache.backends.time.monotonic', return_value=100.0):
+            feed_cache.set('key', b'1', [])
+        with patch('app.cache.backends.time.monotonic', return_value=129.0):
+            assert feed_cache.get('key') == b'1'
+        with patch('app.cache.backends.time.monotonic', return_value=131.0):
+            assert feed_cache.get('key') is None
+    
+    def test_invalidate_only_tagged_entries(self):
+        """Test invalidation drops entries carrying any of the tags and nothing else"""
+        cache = FeedCache()
+        cache.backend = InMemoryCacheBackend(max_entries=10)
+        cache.set('page1', b'1', ['post:1', 'sort:recent'])
+        cache.set('page2', b'2', ['post:2', 'sort:likes'])
+        cache.set('page3', b'3', ['post:3', 'sort:recent'])
+        
+        cache.invalidate('post:2')
+        assert cache.get('page2') is None
+        assert cache.get('page1') == b'1'
+        
+        cache.invalidate('sort:recent')
+        assert cache.get('page1') is None
+        assert cache.get('page3') is None
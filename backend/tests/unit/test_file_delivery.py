@@ -0,0 +1,71 @@
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from flask import Flask
+from werkzeug.exceptions import NotFound
+
+from app.utils.file_delivery import send_internal_file, IMMUTABLE_MAX_AGE
+
+SHA = 'ab' * 32
+
+@pytest.fixture
+def delivery_app():
+    app = Flask(__name__)
+    app.config.update({
+        'MEDIA_ACCEL_REDIRECT': True,
+        'MEDIA_ACCEL_PREFIX': '/_internal',
+    })
+    return app
+
+class TestSendInternalFile:
+
+    def test_accel_redirect_to_internal_location(self, delivery_app):
+        """Behind nginx only the headers are written; the body is left to the internal location"""
+        with delivery_app.test_request_context('/api/posts/image/x'):
+            response = send_internal_file('/data/media', 'media', f'ab/ab/{SHA}.png',
+                                          etag=f'{SHA}.png', max_age=IMMUTABLE_MAX_AGE, immutable=True)
+
+        assert response.status_code == 200
+        assert response.headers['X-Accel-Redirect'] == f'/_internal/media/ab/ab/{SHA}.png'
+        assert response.mimetype == 'image/png'
+        assert response.get_data() == b''
+        assert response.headers['ETag'] == f'"{SHA}.png"'
+        assert response.cache_control.public
+        assert response.cache_control.immutable
+        assert response.cache_control.max_age == IMMUTABLE_MAX_AGE
+
+    def test_matching_etag_is_answered_without_redirect(self, delivery_app):
+        headers = {'If-None-Match': f'"{SHA}.png"'}
+        with delivery_app.test_request_context('/api/posts/image/x', headers=headers):
+            response = send_internal_file('/data/media', 'media', f'ab/ab/{SHA}.png',
+                                          etag=f'{SHA}.png', max_age=IMMUTABLE_MAX_AGE, immutable=True)
+
+        assert response.status_code == 304
+        assert 'X-Accel-Redirect' not in response.headers
+        assert response.cache_control.immutable
+
+    def test_path_outside_location_is_rejected(self, delivery_app):
+        with delivery_app.test_request_context('/api/posts/image/x'):
+            with pytest.raises(NotFound):
+                send_internal_file('/data/post_uploads', 'post_uploads', '../secrets.txt')
+
+    def test_without_nginx_the_file_is_sent(self, delivery_app, tmp_path):
+        """Development servers send the file themselves with the same caching headers"""
+        delivery_app.config['MEDIA_ACCEL_REDIRECT'] = False
+        (tmp_path / f'{SHA}.png').write_bytes(b'\x89PNG image bytes')
+
+        with delivery_app.test_request_context('/api/posts/image/x'):
+            response = send_internal_file(str(tmp_path), 'media', f'{SHA}.png',
+                                          etag=f'{SHA}.png', max_age=IMMUTABLE_MAX_AGE, immutable=True)
+            response.direct_passthrough = False
+            body = response.get_data()
+            response.close()
+
+        assert body == b'\x89PNG image bytes'
+        assert 'X-Accel-Redirect' not in response.headers
+        assert response.headers['ETag'] == f'"{SHA}.png"'
+        assert response.cache_control.immutable
+        assert response.cache_control.max_age == IMMUTABLE_MAX_AGE
@@ -0,0 +1,74 @@
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.instrumentation import init_query_instrumentation, RequestQueryStats
+
+class TestQueryInstrumentation:
+    
+    @pytest.fixture
+    def instrumented_app(self):
+        from flask import Flask
+        from flask_sqlalchemy import SQLAlchemy
+        from sqlalchemy import text
+        
+        app = Flask(__name__)
+        app.config.update({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'SQL_QUERY_WARN_THRESHOLD': 2
+        })
+        db = SQLAlchemy(app)
+        init_query_instrumentation(app)
+        
+        @app.route('/queries/<int:n>')
+        def run_queries(n):
+            for _ in range(n):
+                db.session.execute(text('SELECT 1'))
+            return 'ok'
+        
+        return app
+    
+    def test_record_tracks_totals_and_slowest(self):
+        """Test statement timings accumulate and the slowest one is kept"""
+        stats = RequestQueryStats()
+        stats.record('SELECT 1', 2.0)
+        stats.record('SELECT 2', 5.0)
+        stats.record('SELECT 3', 1.0)
+        
+        assert stats.count == 3
+        assert stats.total_ms == 8.0
+        assert stats.slowest_ms == 5.0
+        assert stats.slowest_statement == 'SELECT 2'
+    
+    def test_server_timing_header_counts_queries(self, instrumented_app):
+        """Test each response reports the queries issued for that request only"""
+        client = instrumented_app.test_client()
+        
+        first = client.get('/queries/2')
+        second = client.get('/queries/1')
+        
+        assert 'desc="2 queries"' in first.headers['Server-Timing']
+        assert 'desc="1 queries"' in second.headers['Server-Timing']
+        assert first.headers['Server-Timing'].startswith('db;dur=')
+    
+    def test_warns_above_query_threshold(self, instrumented_app):
+        """Test a request issuing more statements than the threshold logs a warning"""
+        client = instrumented_app.test_client()
+        
+        with patch.object(instrumented_app.logger, 'warning') as mock_warning:
+            client.get('/queries/2')
+            mock_warning.assert_not_called()
+            client.get('/queries/3')
+            mock_warning.assert_called_once()
+            assert 'queries=3' in mock_warning.call_args[0][0]
+    
+    def test_header_can_be_disabled(self, instrumented_app):
+        """Test the Server-Timing header is omitted when turned off"""
+        instrumented_app.config['SQL_SERVER_TIMING'] = False
+        
+        response = instrumented_app.test_client().get('/queries/1')
+        
+        assert 'Server-Timing' not in response.headers
@@ -0,0 +1,63 @@
+import pytest
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.utils.json_provider import FastJSONProvider, RawJSON, dumps_bytes
+
+class TestFastJSONProvider:
+    
+    @pytest.fixture
+    def app(self):
+        from flask import Flask, jsonify
+        
+        app = Flask(__name__)
+        app.json = FastJSONProvider(app)
+        
+        @app.route('/dict')
+        def as_dict():
+            return jsonify({"created_at": datetime(2024, 1, 2, 3, 4, 5), "title": "café"})
+        
+        @app.route('/raw')
+        def as_raw():
+            return jsonify(RawJSON(b'{"posts":[]}')), 200
+        
+        return app
+    
+    def test_datetimes_are_iso_8601(self, app):
+        """Test datetimes keep the ISO format services used to produce by hand"""
+        response = app.test_client().get('/dict')
+        
+        assert response.mimetype == 'application/json'
+        assert response.get_json() == {"created_at": "2024-01-02T03:04:05", "title": "café"}
+    
+    def test_raw_json_is_written_verbatim(self, app):
+        """Test pre-encoded payloads are not re-encoded"""
+        response = app.test_client().get('/raw')
+        
+        assert response.status_code == 200
+        assert response.data == b'{"posts":[]}'
+    
+    def test_dumps_and_loads_round_trip(self, app):
+        """Test the provider's str API used by Flask and extensions"""
+        encoded = app.json.dumps({"a": [1, 2], "b": None})
+        
+        assert isinstance(encoded, str)
+        assert app.json.loads(encoded) == {"a": [1, 2], "b": None}
+        assert app.json.dumps({"b": 1, "a": 2}, sort_keys=True) == '{"a": 2, "b": 1}'
+
+class TestRawJSON:
+    
+    def test_item_access_decodes_lazily(self):
+        """Test RawJSON can be read like the value it encodes"""
+        raw = RawJSON(dumps_bytes({"posts": [{"post_id": 1}], "has_more": False}))
+        
+        assert 'posts' in raw
+        assert raw['posts'][0]['post_id'] == 1
+        assert len(raw) == 2
+    
+    def test_nested_raw_json_is_encoded_as_value(self):
+        """Test a RawJSON inside another payload is still serialized correctly"""
+        assert dumps_bytes({"page": RawJSON(b'[1,2]')}) == b'{"page":[1,2]}'
@@ -0,0 +1,110 @@
+import pytest
+import sys
+import os
+from unittest.mock import Mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.buffers import LikeWriteBuffer
+
+class TestLikeWriteBuffer:
+    
+    @pytest.fixture
+    def mock_like_repository(self):
+        repository = Mock()
+        # Nobody likes anything yet and every post has 10 likes in the database
+        repository.get_like_state.return_value = (False, 10)
+        repository.apply_like_states.side_effect = lambda states: sorted({post_id for _, post_id in states})
+        return repository
+    
+    @pytest.fixture
+    def buffer(self, mock_flask_app, mock_like_repository, tmp_path):
+        mock_flask_app.config.update({
+            'LIKE_WRITE_BEHIND': True,
+            'LIKE_BUFFER_PATH': str(tmp_path / 'likes.log'),
+            'LIKE_BUFFER_FLUSH_MS': 3600 * 1000  # flushed explicitly by the tests
+        })
+        buffer = LikeWriteBuffer(mock_flask_app, feed_cache=Mock(), like_repository=mock_like_repository)
+        yield buffer
+        buffer.stop()
+    
+    def test_disabled_by_default(self, mock_flask_app):
+        """Test the buffer stays a no-op unless write-behind is configured"""
+        buffer = LikeWriteBuffer(mock_flask_app)
+        
+        assert buffer.enabled is False
+        assert buffer.overlay_liked(1, [1, 2], [2]) == [2]
+        assert buffer.likes_delta(1) == 0
+    
+    def test_toggles_are_buffered_and_counted(self, buffer, mock_like_repository):
+        """Test toggles do not write to the database but are reflected in reads"""
+        assert buffer.toggle(1, 7) == (True, 11)
+        assert buffer.toggle(2, 7) == (True, 12)
+        
+        assert buffer.liked_state(1, 7) is True
+        assert buffer.likes_delta(7) == 2
+        assert buffer.overlay_liked(1, [8, 7], []) == [7]
+        mock_like_repository.apply_like_states.assert_not_called()
+    
+    def test_missing_post(self, buffer, mock_like_repository):
+        """Test toggling a like on a missing post buffers nothing"""
+        mock_like_repository.get_like_state.return_value = None
+        
+        assert buffer.toggle(1, 404) is None
+        assert buffer.liked_state(1, 404) is None
+    
+    def test_flush_writes_collapsed_final_states(self, buffer, mock_like_repository):
+        """Test repeated toggles collapse to one final state per (user, post)"""
+        buffer.toggle(1, 7)
+        buffer.toggle(1, 7)
+        buffer.toggle(1, 7)
+        buffer.toggle('2', 8)
+        
+        assert buffer.flush() == 2
+        
+        mock_like_repository.apply_like_states.assert_called_once_with({(1, 7): True, (2, 8): True})
+        buffer.feed_cache.invalidate.assert_called_once()
+        assert buffer.likes_delta(7) == 0
+        assert buffer.liked_state(1, 7) is None
+        assert buffer.flush() == 0
+    
+    def test_failed_flush_keeps_states(self, buffer, mock_like_repository):
+        """Test a failed flush keeps the batch, merged with toggles made meanwhile"""
+        buffer.toggle(1, 7)
+        mock_like_repository.apply_like_states.side_effect = Exception("database unavailable")
+        
+        assert buffer.flush() == 0
+        assert buffer.liked_state(1, 7) is True
+        assert buffer.likes_delta(7) == 1
+        
+        mock_like_repository.apply_like_states.side_effect = None
+        mock_like_repository.apply_like_states.return_value = [7]
+        buffer.flush()
+        mock_like_repository.apply_like_states.assert_called_with({(1, 7): True})
+    
+    def test_log_is_replayed_after_restart(self, buffer, mock_flask_app, mock_like_repository):
+        """Test states left in the log by a crashed process are applied by the next one"""
+        buffer.toggle(1, 7)
+        buffer.toggle(3, 9)
+        buffer.toggle(3, 9)
+        # Simulate a crash: nothing was flushed and the lock is released
+        buffer._stop.set()
+        buffer._lock_file.close()
+        buffer.enabled = False
+        
+        restarted = LikeWriteBuffer(mock_flask_app, like_repository=mock_like_repository)
+        try:
+            assert restarted.liked_state(1, 7) is True
+            restarted.flush()
+            mock_like_repository.apply_like_states.assert_called_once_with({(1, 7): True, (3, 9): False})
+        finally:
+            restarted.stop()
+    
+    def test_log_is_compacted_after_flush(self, buffer):
+        """Test flushed states are dropped from the log"""
+        buffer.toggle(1, 7)
+        buffer.flush()
+        buffer.toggle(2, 7)
+        
+        with open(buffer._path) as log:
+            assert log.read() == "2 7 1\n"
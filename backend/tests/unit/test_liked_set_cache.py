@@ -0,0 +1,97 @@
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from app.cache import LikedSetCache, InMemoryCacheBackend
+
+class SharedBackend(InMemoryCacheBackend):
+    """In-memory stand-in for a backend shared by several processes"""
+    shared = True
+
+class TestLikedSetCache:
+    
+    @pytest.fixture
+    def liked_sets(self, mock_flask_app):
+        mock_flask_app.config.update({
+            'LIKED_SET_TTL_SECONDS': 60,
+            'LIKED_SET_MAX_IDS': 5
+        })
+        return LikedSetCache(mock_flask_app)
+    
+    def load(self, cache, user_id, post_ids):
+        cache.store(user_id, post_ids, cache.begin_load(user_id))
+    
+    def test_disabled_until_initialised(self):
+        """Test the cache answers nothing before init_app"""
+        cache = LikedSetCache()
+        
+        cache.store(1, [1, 2], cache.begin_load(1))
+        
+        assert cache.liked_among(1, [1, 2]) is None
+    
+    def test_membership_from_loaded_set(self, liked_sets):
+        """Test a loaded set answers which page posts were liked, in page order"""
+        assert liked_sets.liked_among(1, [3]) is None
+        
+        self.load(liked_sets, '1', [9, 3, 5])
+        
+        assert liked_sets.liked_among(1, [10, 9, 4, 3]) == [9, 3]
+    
+    def test_toggles_update_set_in_place(self, liked_sets):
+        """Test likes and unlikes are applied without reloading"""
+        self.load(liked_sets, 1, [3, 5])
+        
+        liked_sets.apply_toggle(1, 4, True)
+        liked_sets.apply_toggle(1, 5, False)
+        
+        assert liked_sets.liked_among(1, [3, 4, 5]) == [3, 4]
+    
+    def test_load_racing_a_toggle_is_discarded(self, liked_sets):
+        """Test a set read before a concurrent toggle is not cached"""
+        snapshot = liked_sets.begin_load(1)
+        liked_sets.apply_toggle(1, 4, True)
+        
+        liked_sets.store(1, [3], snapshot)
+        
+        assert liked_sets.liked_among(1, [3, 4]) is None
+    
+    def test_lru_eviction_bounds_total_ids(self, liked_sets):
+        """Test least recently used users are evicted once the id budget is exceeded"""
+        self.load(liked_sets, 1, [1, 2])
+        self.load(liked_sets, 2, [1, 2])
+        liked_sets.liked_among(1, [1])
+        self.load(liked_sets, 3, [1, 2])
+        
+        assert liked_sets.liked_among(2, [1]) is None
+        assert liked_sets.liked_among(1, [1]) == [1]
+        assert liked_sets.liked_among(3, [1]) == [1]
+    
+    def test_oversized_sets_are_not_cached(self, liked_sets):
+        """Test a user with more likes than the whole budget falls back to the database"""
+        self.load(liked_sets, 1, range(10))
+        
+        assert liked_sets.liked_among(1, [1]) is None
+    
+    def test_ttl_expiry(self, liked_sets):
+        """Test entries expire after the TTL"""
+        with patch('app.cache.liked_set_cache.time.monotonic', return_value=1000.0):
+            self.load(liked_sets, 1, [1])
+        with patch('app.cache.liked_set_cache.time.monotonic', return_value=1061.0):
+            assert liked_sets.liked_among(1, [1]) is None
+    
+    def test_shared_version_detects_other_process_toggles(self, mock_flask_app):
+        """Test a toggle in another process invalidates this process's copy"""
+        from app.cache import FeedCache
+        
+        feed_cache = FeedCache()
+        feed_cache.backend = SharedBackend()
+        mock_flask_app.extensions['feed_cache'] = feed_cache
+        here, there = LikedSetCache(mock_flask_app), LikedSetCache(mock_flask_app)
+        self.load(here, 1, [3])
+        
+        there.apply_toggle(1, 4, True)
+        
+        assert here.liked_among(1, [3, 4]) is None
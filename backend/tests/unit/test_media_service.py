@@ -0,0 +1,153 @@
+import pytest
+import sys
+import os
+import hashlib
+from io import BytesIO
+from unittest.mock import Mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from werkzeug.datastructures import FileStorage
+
+from app.services.media_service import MediaService, media_name
+from app.utils.media_paths import variant_name
+from app.utils.uploads import FILE_TOO_LARGE_ERROR
+
+# conftest replaces os.makedirs; the store needs real shard directories
+REAL_MAKEDIRS = os.makedirs
+
+PNG_BYTES = (
+    b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x10\x00\x00\x00\x10\x08\x02\x00\x00\x00'
+    + bytes(range(256)) * 20
+)
+PNG_SHA = hashlib.sha256(PNG_BYTES).hexdigest()
+ALLOWED = {'image/png', 'image/jpeg'}
+
+class FakeMediaRepository:
+    """Reference counts in a dict, running the callbacks the way MediaRepository does"""
+
+    def __init__(self):
+        self.ref_counts = {}
+
+    def acquire(self, sha256, ext, mime_type, size, place):
+        exists = sha256 in self.ref_counts
+        place(exists)
+        self.ref_counts[sha256] = self.ref_counts.get(sha256, 0) + 1
+        return self.ref_counts[sha256]
+
+    def release(self, sha256, remove):
+        if sha256 not in self.ref_counts:
+            return None
+        self.ref_counts[sha256] -= 1
+        if self.ref_counts[sha256] == 0:
+            del self.ref_counts[sha256]
+            remove()
+            return 0
+        return self.ref_counts[sha256]
+
+class TestMediaService:
+
+    @pytest.fixture(autouse=True)
+    def real_makedirs(self, monkeypatch):
+        monkeypatch.setattr('os.makedirs', REAL_MAKEDIRS)
+
+    @pytest.fixture
+    def media_repository(self):
+        return FakeMediaRepository()
+
+    @pytest.fixture
+    def media_service(self, media_repository, tmp_path):
+        return MediaService(media_repository=media_repository, media_root=str(tmp_path), variant_worker=Mock())
+
+    def test_media_name(self):
+        assert media_name(f"/post_uploads/{PNG_SHA}.png") == f"{PNG_SHA}.png"
+        assert media_name("/post_uploads/user_1_1234567890.png") is None
+        assert media_name(None) is None
+
+    def test_store_is_content_addressed_and_sharded(self, media_service, media_repository, tmp_path):
+        name = media_service.store(FileStorage(BytesIO(PNG_BYTES), filename='a.png'), 1024 * 1024, ALLOWED)
+
+        assert name == f"{PNG_SHA}.png"
+        path = tmp_path / PNG_SHA[:2] / PNG_SHA[2:4] / name
+        assert path.read_bytes() == PNG_BYTES
+        assert media_repository.ref_counts == {PNG_SHA: 1}
+        assert os.listdir(tmp_path / '.staging') == []
+
+    def test_identical_uploads_share_one_file(self, media_service, media_repository, tmp_path):
+        """The second copy only adds a reference; the file goes with the last one"""
+        for _ in range(2):
+            media_service.store(FileStorage(BytesIO(PNG_BYTES), filename='a.png'), 1024 * 1024, ALLOWED)
+        path = tmp_path / PNG_SHA[:2] / PNG_SHA[2:4] / f"{PNG_SHA}.png"
+        assert media_repository.ref_counts == {PNG_SHA: 2}
+        assert os.listdir(tmp_path / '.staging') == []
+
+        assert media_service.release(f"/post_uploads/{PNG_SHA}.png") is True
+        assert path.exists()
+        media_service.release(f"/comment_uploads/{PNG_SHA}.png")
+        assert not path.exists()
+        assert media_repository.ref_counts == {}
+
+    def test_rejected_upload_takes_no_reference(self, media_service, media_repository, tmp_path):
+        with pytest.raises(ValueError, match=FILE_TOO_LARGE_ERROR):
+            media_service.store(FileStorage(BytesIO(PNG_BYTES), filename='a.png'), 1000, ALLOWED)
+
+        assert media_repository.ref_counts == {}
+        assert os.listdir(tmp_path / '.staging') == []
+
+    def test_release_ignores_legacy_names(self, media_service):
+        media_service.media_repository = Mock()
+
+        assert media_service.release('/uploads/user_1_1234567890.png') is False
+        media_service.media_repository.release.assert_not_called()
+
+    def test_release_removes_variants_with_last_reference(self, media_service, tmp_path):
+        name = media_service.store(FileStorage(BytesIO(PNG_BYTES), filename='a.png'), 1024 * 1024, ALLOWED)
+        folder = tmp_path / PNG_SHA[:2] / PNG_SHA[2:4]
+        (folder / variant_name(name, 128, 'webp')).write_bytes(b'variant')
+
+        media_service.release(f"/uploads/{name}")
+
+        assert os.listdir(folder) == []
+
+    def test_generate_variants_submits_media_names_only(self, media_service):
+        media_service.generate_variants(f"/post_uploads/{PNG_SHA}.png")
+        media_service.generate_variants('/post_uploads/user_1_1234567890.png')
+        media_service.generate_variants(None)
+
+        media_service.variant_worker.submit.assert_called_once_with(f"{PNG_SHA}.png")
+
+    def test_get_variants_builds_width_urls(self, media_service):
+        """Variant URLs are grouped per stored path, one query for the whole page"""
+        media_service.media_repository = Mock()
+        media_service.media_repository.get_variants.return_value = [
+            Mock(sha256=PNG_SHA, width=128, height=64),
+            Mock(sha256=PNG_SHA, width=480, height=240),
+        ]
+        stored = f"/post_uploads/{PNG_SHA}.png"
+
+        variants = media_service.get_variants([stored, '/post_uploads/old.png', None])
+
+        media_service.media_repository.get_variants.assert_called_once_with([PNG_SHA], format='jpeg')
+        assert variants == {stored: [
+            {"url": f"{stored}?w=128", "width": 128, "height": 64},
+            {"url": f"{stored}?w=480", "width": 480, "height": 240},
+        ]}
+
+    def test_send_picks_narrowest_variant_in_accepted_format(self, media_service, tmp_path, mock_flask_app, monkeypatch):
+        """?w= is answered with a variant when one exists, WebP only for clients that list it"""
+        monkeypatch.setattr('app.services.media_service.send_internal_file', lambda root, location, path, **kwargs: Mock(path=path, vary=set()))
+        name = f"{PNG_SHA}.png"
+        folder = tmp_path / PNG_SHA[:2] / PNG_SHA[2:4]
+        folder.mkdir(parents=True)
+        for width in (128, 480):
+            for format in ('webp', 'jpeg'):
+                (folder / variant_name(name, width, format)).write_bytes(b'variant')
+
+        with mock_flask_app.test_request_context(headers={'Accept': 'image/webp,*/*'}):
+            response = media_service.send(name, '/legacy', 200)
+            assert response.path.endswith(variant_name(name, 480, 'webp'))
+            assert 'Accept' in response.vary
+        with mock_flask_app.test_request_context(headers={'Accept': '*/*'}):
+            assert media_service.send(name, '/legacy', 100).path.endswith(variant_name(name, 128, 'jpeg'))
+            # Wider than every variant: the original
+            assert media_service.send(name, '/legacy', 2000).path.endswith('/' + name)
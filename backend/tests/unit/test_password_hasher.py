@@ -0,0 +1,84 @@
+import pytest
+import sys
+import os
+from concurrent.futures import Future
+from unittest.mock import Mock, patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from flask import Flask
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash
+
+from app.workers.password_hasher import PasswordHasher, PasswordHasherBusy, normalize_method
+
+# Cheap parameters so the tests do not spend seconds hashing
+FAST_METHOD = 'pbkdf2:sha256:1000'
+
+def make_hasher(**config):
+    app = Flask(__name__)
+    app.config.update({'PASSWORD_HASH_METHOD': FAST_METHOD, 'PASSWORD_HASH_WORKERS': 0})
+    app.config.update(config)
+    return PasswordHasher(app)
+
+class TestNormalizeMethod:
+
+    def test_defaults_are_spelled_out(self):
+        assert normalize_method('scrypt') == 'scrypt:32768:8:1'
+        assert normalize_method('pbkdf2') == f'pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}'
+        assert normalize_method('pbkdf2:sha512') == f'pbkdf2:sha512:{DEFAULT_PBKDF2_ITERATIONS}'
+
+    def test_rejects_unknown_methods(self):
+        with pytest.raises(ValueError):
+            normalize_method('md5')
+        with pytest.raises(ValueError):
+            normalize_method('scrypt:16384')
+
+class TestPasswordHasher:
+
+    def test_inline_hash_and_verify(self):
+        """With no workers hashes are computed on the calling thread"""
+        hasher = make_hasher()
+
+        password_hash = hasher.hash('Secret123!')
+
+        assert password_hash.startswith(FAST_METHOD + '$')
+        assert hasher.verify(password_hash, 'Secret123!') is True
+        assert hasher.verify(password_hash, 'wrong') is False
+
+    def test_needs_rehash_when_parameters_change(self):
+        hasher = make_hasher()
+
+        assert hasher.needs_rehash(generate_password_hash('x', FAST_METHOD)) is False
+        assert hasher.needs_rehash(generate_password_hash('x', 'pbkdf2:sha256:500')) is True
+        assert hasher.needs_rehash('scrypt:32768:8:1$salt$hash') is True
+        assert hasher.needs_rehash('not a hash') is True
+
+    def test_process_pool(self):
+        hasher = make_hasher(PASSWORD_HASH_WORKERS=1)
+        try:
+            password_hash = hasher.hash('Secret123!')
+            assert hasher.verify(password_hash, 'Secret123!') is True
+        finally:
+            hasher.stop()
+
+    def test_full_queue_is_rejected(self):
+        """Hashes beyond the queue limit fail fast, and slots free up when hashes finish"""
+        hasher = make_hasher(PASSWORD_HASH_WORKERS=1, PASSWORD_HASH_QUEUE_LIMIT=1, PASSWORD_HASH_TIMEOUT=0.01)
+        pending = Future()
+        pending.set_running_or_notify_cancel()
+        executor = Mock()
+        executor.submit.return_value = pending
+
+        with patch.object(hasher, '_get_executor', return_value=executor):
+            with pytest.raises(PasswordHasherBusy, match='timed out'):
+                hasher.hash('first')
+            # The timed out hash is still running in the pool and occupies the only slot
+            with pytest.raises(PasswordHasherBusy, match='queue is full'):
+                hasher.hash('second')
+            assert executor.submit.call_count == 1
+
+            pending.set_result('done')
+            finished = Future()
+            finished.set_result('hash')
+            executor.submit.return_value = finished
+            assert hasher.hash('third') == 'hash'
@@ -71,4 +71,39 @@ class TestPaymentService:
         
         assert success is False
         assert user_id == 1
-        assert error == "Failed to update user membership"
\ No newline at end of file
+        assert error == "Failed to update user membership"    
+    def test_create_checkout_session_premium_context(self, payment_service, mock_user_repository):
+        """Test a premium membership claimed by the token is rejected without loading the user"""
+        from app.utils.user_context import UserContext
+        context = UserContext(user_id=1, membership='premium', totp_verified=True, username='painter', token_version=1)
+        
+        session, error = payment_service.create_checkout_session(1, context)
+        
+        assert session is None
+        assert error == "User already has premium membership"
+        mock_user_repository.get_by_id.assert_not_called()
+    
+    @patch('stripe.checkout.Session.retrieve')
+    def test_verify_session_bumps_token_version(self, mock_stripe_retrieve, mock_user_repository):
+        """Test an upgrade marks access tokens with the old membership as stale"""
+        token_versions = Mock()
+        payment_service = PaymentService(user_repository=mock_user_repository, token_versions=token_versions)
+        mock_stripe_retrieve.return_value = Mock(payment_status='paid', metadata={'user_id': '1'})
+        mock_user_repository.update_membership.return_value = Mock(token_version=4)
+        
+        success, user_id, error = payment_service.verify_session(session_id='sess_test123')
+        
+        assert (success, user_id, error) == (True, 1, None)
+        token_versions.bump.assert_called_once_with(1, 4)
+    
+    def test_create_checkout_session_rechecks_basic_context(self, payment_service, mock_user_repository):
+        """Test a token still claiming basic cannot buy premium twice after an upgrade"""
+        from app.utils.user_context import UserContext
+        context = UserContext(user_id=1, membership='basic', totp_verified=True, username='painter', token_version=1)
+        mock_user_repository.get_by_id.return_value = Mock(membership='premium')
+        
+        session, error = payment_service.create_checkout_session(1, context)
+        
+        assert session is None
+        assert error == "User already has premium membership"
+        mock_user_repository.get_by_id.assert_called_once_with(1)
@@ -5,7 +5,7 @@ from unittest.mock import Mock, patch
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
-from app.services.post_service import PostService
+from app.services.post_service import PostService, MAX_FILE_SIZE, ALLOWED_MIME_TYPES
 
 class TestPostService:
     
@@ -18,10 +18,17 @@ class TestPostService:
         return Mock()
     
     @pytest.fixture
-    def post_service(self, mock_post_repository, mock_like_repository):
+    def mock_media_service(self):
+        media_service = Mock()
+        media_service.get_variants.return_value = {}
+        return media_service
+    
+    @pytest.fixture
+    def post_service(self, mock_post_repository, mock_like_repository, mock_media_service):
         return PostService(
             post_repository=mock_post_repository,
-            like_repository=mock_like_repository
+            like_repository=mock_like_repository,
+            media_service=mock_media_service
         )
     
     def test_is_allowed_file_valid_extension(self, post_service):
@@ -39,66 +46,25 @@ class TestPostService:
         assert post_service._is_allowed_file('image.txt') is False
         assert post_service._is_allowed_file('noextension') is False
 
-    def test_is_valid_mime_valid(self, post_service):
-        """Test MIME type validation with valid file"""
-        from io import BytesIO
-        file = BytesIO(b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00')  # Simulated PNG file content
-        file.filename = 'test.png'
-        file.seek = lambda *args: None
-        file.read = lambda x: b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00'
-
-        with patch('magic.from_buffer', return_value='image/png'):
-            assert post_service._is_valid_mime(file) is True
-
-    def test_is_valid_mime_invalid(self, post_service):
-        """Test MIME type validation with invalid file"""
-        from io import BytesIO
-        file = BytesIO(b'FAKECONTENT')
-        file.filename = 'test.png'
-        file.seek = lambda *args: None
-        file.read = lambda x: b'FAKECONTENT'
-
-        with patch('magic.from_buffer', return_value='text/plain'):
-            assert post_service._is_valid_mime(file) is False
-
-    def test_file_size_check_valid(self, post_service):
-        """Test file size validation for files within allowed size"""
-        mock_file = Mock()
-        mock_file.seek = Mock()
-        mock_file.tell = Mock(return_value=1024 * 1024 * 2)  # 2 MB file size
-        mock_file.seek.return_value = None
-        
-        assert post_service._is_valid_size(mock_file) is True
-    
-    def test_file_size_check_invalid(self, post_service):
-        """Test file size validation for files exceeding allowed size"""
-        mock_file = Mock()
-        mock_file.seek = Mock()
-        mock_file.tell = Mock(return_value=1024 * 1024 * 11)  # 11 MB file size (assuming 10MB max)
-        mock_file.seek.return_value = None
-        
-        assert post_service._is_valid_size(mock_file) is False
-    
     def test_get_posts_success(self, post_service, mock_post_repository):
         """Test successful post retrieval"""
-        from app.models.posts import Post
-        from app.models.users import User
-        
-        # Mock user and post data
-        mock_user = User()
-        mock_user.username = 'testuser'
-        mock_user.profile_picture = None
-        
-        mock_post = Post()
-        mock_post.post_id = 1
-        mock_post.title = 'Test Post'
-        mock_post.content = 'Test Content'
-        mock_post.created_at = Mock()
-        mock_post.created_at.isoformat.return_value = '2023-01-01T00:00:00'
-        mock_post.updated_at = None
-        mock_post.user_id = 1
-        mock_post.user = mock_user
-        mock_post.likes_count = 5
+        from datetime import datetime
+        from types import SimpleNamespace
+        
+        # Mock a projected feed row
+        mock_post = SimpleNamespace(
+            post_id=1,
+            title='Test Post',
+            content='Test Content',
+            created_at=datetime(2023, 1, 1),
+            updated_at=None,
+            user_id=1,
+            username='testuser',
+            profile_picture=None,
+            image=None,
+            likes_count=5,
+            comments_count=0
+        )
         
         mock_post_repository.get_posts.return_value = [mock_post]
         
@@ -111,9 +77,49 @@ class TestPostService:
         assert post_data['post_id'] == 1
         assert post_data['title'] == 'Test Post'
         assert post_data['content'] == 'Test Content'
+        assert post_data['content_truncated'] is False
+        assert post_data['created_at'] == '2023-01-01T00:00:00'
         assert post_data['username'] == 'testuser'
         assert post_data['likes'] == 5
     
+    def test_get_posts_includes_image_variants(self, post_service, mock_post_repository, mock_media_service):
+        """Feed rows carry the variant URLs of their image, looked up once per page"""
+        from datetime import datetime
+        from types import SimpleNamespace
+        
+        image = f"/post_uploads/{'ab' * 32}.png"
+        variants = [{"url": f"{image}?w=480", "width": 480, "height": 240}]
+        mock_post_repository.get_posts.return_value = [
+            SimpleNamespace(post_id=pid, title='t', content='c', created_at=datetime(2024, 1, 1),
+                            updated_at=None, user_id=1, username='testuser', profile_picture=None,
+                            image=post_image, likes_count=0, comments_count=0)
+            for pid, post_image in ((2, image), (1, None))
+        ]
+        mock_media_service.get_variants.return_value = {image: variants}
+        
+        result = post_service.get_posts()
+        
+        assert list(mock_media_service.get_variants.call_args.args[0]) == [image]
+        assert [post['image_variants'] for post in result['posts']] == [variants, []]
+    
+    def test_get_posts_content_preview(self, post_service, mock_post_repository):
+        """Test previews are requested from the repository and trimmed to preview_chars"""
+        from datetime import datetime
+        from types import SimpleNamespace
+        
+        mock_post_repository.get_posts.return_value = [
+            SimpleNamespace(post_id=pid, title='t', content=content, created_at=datetime(2024, 1, 1),
+                            updated_at=None, user_id=1, username='testuser', profile_picture=None,
+                            image=None, likes_count=0, comments_count=0)
+            for pid, content in ((2, 'abcdef'), (1, 'abcde'))
+        ]
+        
+        result = post_service.get_posts(preview_chars=5)
+        
+        assert mock_post_repository.get_posts.call_args.kwargs['preview_chars'] == 5
+        assert [p['content'] for p in result['posts']] == ['abcde', 'abcde']
+        assert [p['content_truncated'] for p in result['posts']] == [True, False]
+    
     def test_get_posts_with_search(self, post_service, mock_post_repository):
         """Test post retrieval with search parameter"""
         mock_post_repository.get_posts.return_value = []
@@ -122,29 +128,69 @@ class TestPostService:
         
         mock_post_repository.get_posts.assert_called_once_with(
             sort_by='recent',
-            limit=10,
+            limit=11,
             offset=0,
             search='test query',
-            user_id=None
+            user_id=None,
+            cursor=None,
+            viewer_id=None,
+            preview_chars=None
         )
     
-    @patch('os.makedirs')
-    @patch('time.time')
-    def test_create_post_with_image(self, mock_time, mock_makedirs, post_service, mock_post_repository):
-        """Test post creation with image upload"""
-        mock_time.return_value = 1234567890
+    def test_get_posts_has_more_returns_next_cursor(self, post_service, mock_post_repository):
+        """Test that an extra row yields has_more and a cursor for the last returned post"""
+        from datetime import datetime
+        from types import SimpleNamespace
+        from app.utils.pagination import decode_cursor
+        
+        posts = [
+            SimpleNamespace(post_id=pid, title='t', content='c', created_at=datetime(2024, 1, 1),
+                            updated_at=datetime(2024, 1, 1, 0, pid), user_id=1, username='testuser', profile_picture=None,
+                            image=None, likes_count=pid, comments_count=0)
+            for pid in (3, 2, 1)
+        ]
+        mock_post_repository.get_posts.return_value = posts
         
+        result = post_service.get_posts(sort_by='likes', limit=2)
+        
+        assert [p['post_id'] for p in result['posts']] == [3, 2]
+        assert result['has_more'] is True
+        assert decode_cursor(result['next_cursor'], 'likes') == (2, 2)
+        
+        mock_post_repository.get_posts.reset_mock()
+        post_service.get_posts(sort_by='likes', limit=2, cursor=result['next_cursor'])
+        assert mock_post_repository.get_posts.call_args.kwargs['cursor'] == (2, 2)
+    
+    def test_get_posts_last_page_has_no_cursor(self, post_service, mock_post_repository):
+        """Test that a short page reports no further pages"""
+        mock_post_repository.get_posts.return_value = []
+        
+        result = post_service.get_posts(limit=5)
+        
+        assert result['has_more'] is False
+        assert result['next_cursor'] is None
+    
+    def test_get_posts_invalid_cursor(self, post_service, mock_post_repository):
+        """Test that a malformed or mismatched cursor is rejected"""
+        from app.utils.pagination import encode_cursor
+        
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            post_service.get_posts(cursor='not-a-cursor')
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            post_service.get_posts(sort_by='recent', cursor=encode_cursor('likes', 3, 7))
+        mock_post_repository.get_posts.assert_not_called()
+    
+    def test_create_post_with_image(self, post_service, mock_post_repository, mock_media_service):
+        """Test post creation with image upload"""
         # Mock image file
         mock_image = Mock()
         mock_image.filename = 'test.jpg'
         mock_image.read.return_value = b'\xff\xd8\xff\xe0'  # JPEG header bytes
-        mock_image.save = Mock()
         
         mock_post_repository.create_post.return_value = {'post_id': 1}
+        mock_media_service.store.return_value = 'ab' * 32 + '.jpg'
         
-        with patch.object(post_service, '_is_allowed_file', return_value=True), \
-         patch.object(post_service, '_is_valid_mime', return_value=True), \
-         patch.object(post_service, '_is_valid_size', return_value=True):
+        with patch.object(post_service, '_is_allowed_file', return_value=True):
             result = post_service.create_post(
                 title='Test Post',
                 content='Test Content',
@@ -152,20 +198,46 @@ class TestPostService:
                 user_id=1
             )
         
-        mock_makedirs.assert_called_once_with(post_service.UPLOAD_FOLDER, exist_ok=True)
-        mock_image.save.assert_called_once()
-        mock_post_repository.create_post.assert_called_once()
+        mock_media_service.store.assert_called_once_with(mock_image, MAX_FILE_SIZE, ALLOWED_MIME_TYPES)
+        mock_post_repository.create_post.assert_called_once_with('Test Post', 'Test Content', f"/post_uploads/{'ab' * 32}.jpg", 1)
+        mock_media_service.release.assert_not_called()
+        mock_media_service.generate_variants.assert_called_once_with(f"/post_uploads/{'ab' * 32}.jpg")
         assert result == {'post_id': 1}
     
-    def test_create_post_invalid_file_type(self, post_service):
+    def test_create_post_releases_image_when_insert_fails(self, post_service, mock_post_repository, mock_media_service):
+        """The stored image's reference is dropped again if the post cannot be saved"""
+        mock_image = Mock()
+        mock_image.filename = 'test.png'
+        mock_media_service.store.return_value = 'cd' * 32 + '.png'
+        mock_post_repository.create_post.side_effect = RuntimeError("db down")
+        
+        with pytest.raises(RuntimeError):
+            post_service.create_post('Test Post', 'Test Content', mock_image, 1)
+        
+        mock_media_service.release.assert_called_once_with(f"/post_uploads/{'cd' * 32}.png")
+    
+    def test_edit_post_replaces_image(self, post_service, mock_post_repository, mock_media_service):
+        """Replacing an image drops the reference the old one held"""
+        post = Mock(user_id=1, image='/post_uploads/old.png')
+        mock_post_repository.get_by_id.return_value = post
+        mock_image = Mock()
+        mock_image.filename = 'new.png'
+        mock_media_service.store.return_value = 'ef' * 32 + '.png'
+        
+        post_service.edit_post(5, 1, 'Title', 'Content', image_file=mock_image)
+        
+        mock_post_repository.edit_post.assert_called_once_with(
+            post_id=5, title='Title', content='Content', image_url=f"/post_uploads/{'ef' * 32}.png"
+        )
+        mock_media_service.release.assert_called_once_with('/post_uploads/old.png')
+    
+    def test_create_post_invalid_file_type(self, post_service, mock_media_service):
         """Test post creation with invalid file type"""
         mock_image = Mock()
         mock_image.filename = 'test.txt'
         mock_image.read.return_value = b'This is not really an image.'  # Not valid JPEG data
         
-        with patch.object(post_service, '_is_allowed_file', return_value=False), \
-         patch.object(post_service, '_is_valid_mime', return_value=False), \
-         patch.object(post_service, '_is_valid_size', return_value=False):
+        with patch.object(post_service, '_is_allowed_file', return_value=False):
             with pytest.raises(ValueError, match="File type not allowed"):
                 post_service.create_post(
                     title='Test Post',
@@ -173,6 +245,7 @@ class TestPostService:
                     image_file=mock_image,
                     user_id=1
                 )
+        mock_media_service.store.assert_not_called()
     
     def test_create_post_without_image(self, post_service, mock_post_repository):
         """Test post creation without image"""
@@ -206,4 +279,238 @@ class TestPostService:
         result = post_service.get_user_liked_posts(user_id=1, post_ids=[1, 2, 3])
         
         assert result == [1, 3]
-        mock_like_repository.get_user_liked_post_ids.assert_called_once_with(1, [1, 2, 3])
\ No newline at end of file
+        mock_like_repository.get_user_liked_post_ids.assert_called_once_with(1, [1, 2, 3])    
+    def test_toggle_like_adds_like(self, post_service, mock_post_repository, mock_like_repository):
+        """Test liking a post uses the atomic toggle and its returned count"""
+        mock_like_repository.toggle.return_value = (True, 4)
+        
+        result, error = post_service.toggle_like(post_id=1, user_id=2)
+        
+        assert error is None
+        assert result == {"likes": 4, "liked": True}
+        mock_like_repository.toggle.assert_called_once_with(2, 1)
+        mock_post_repository.get_by_id.assert_not_called()
+        mock_like_repository.count_likes_for_post.assert_not_called()
+    
+    def test_toggle_like_removes_existing_like(self, post_service, mock_like_repository):
+        """Test unliking a post reports the decremented count"""
+        mock_like_repository.toggle.return_value = (False, 3)
+        
+        result, error = post_service.toggle_like(post_id=1, user_id=2)
+        
+        assert result == {"likes": 3, "liked": False}
+    
+    def test_toggle_like_missing_post(self, post_service, mock_like_repository):
+        """Test toggling a like on a missing post reports it without touching the cache"""
+        mock_like_repository.toggle.return_value = None
+        
+        result, error = post_service.toggle_like(post_id=404, user_id=2)
+        
+        assert result is None
+        assert error == "Post not found"
+    
+    def test_get_posts_relevance_cursor(self, post_service, mock_post_repository):
+        """Test relevance-ranked search pages by (score, post_id)"""
+        from datetime import datetime
+        from types import SimpleNamespace
+        from app.utils.pagination import decode_cursor
+        
+        posts = [
+            SimpleNamespace(post_id=pid, title='t', content='c', created_at=datetime(2024, 1, 1),
+                            updated_at=datetime(2024, 1, 1), user_id=1, username='testuser', profile_picture=None, image=None,
+                            likes_count=0, comments_count=0, relevance=score)
+            for pid, score in ((9, 1.5), (4, 0.25))
+        ]
+        mock_post_repository.get_posts.return_value = posts
+        
+        result = post_service.get_posts(sort_by='relevance', limit=1, search='hello')
+        
+        assert decode_cursor(result['next_cursor'], 'relevance') == (1.5, 9)
+        assert mock_post_repository.get_posts.call_args.kwargs['search'] == 'hello'
+    
+    def test_get_posts_served_from_feed_cache(self, mock_post_repository, mock_like_repository):
+        """Test a repeated feed request is answered from the cache without querying"""
+        from app.cache import FeedCache, InMemoryCacheBackend
+        
+        feed_cache = FeedCache()
+        feed_cache.backend = InMemoryCacheBackend()
+        service = PostService(post_repository=mock_post_repository, like_repository=mock_like_repository,
+                              feed_cache=feed_cache)
+        mock_post_repository.get_posts.return_value = []
+        
+        first = service.get_posts(sort_by='recent', limit=10)
+        second = service.get_posts(sort_by='recent', limit=10)
+        
+        assert first.data == second.data
+        mock_post_repository.get_posts.assert_called_once()
+    
+    def test_toggle_like_invalidates_cached_pages(self, mock_post_repository, mock_like_repository):
+        """Test liking a post drops cached pages containing it"""
+        from datetime import datetime
+        from types import SimpleNamespace
+        from app.cache import FeedCache, InMemoryCacheBackend
+        
+        feed_cache = FeedCache()
+        feed_cache.backend = InMemoryCacheBackend()
+        service = PostService(post_repository=mock_post_repository, like_repository=mock_like_repository,
+                              feed_cache=feed_cache)
+        mock_post_repository.get_posts.return_value = [
+            SimpleNamespace(post_id=7, title='t', content='c', created_at=datetime(2024, 1, 1),
+                            updated_at=datetime(2024, 1, 1), user_id=1, username='testuser', profile_picture=None, image=None,
+                            likes_count=0, comments_count=0)
+        ]
+        mock_like_repository.toggle.return_value = (True, 1)
+        
+        service.get_posts(sort_by='recent')
+        service.toggle_like(post_id=7, user_id=2)
+        service.get_posts(sort_by='recent')
+        
+        assert mock_post_repository.get_posts.call_count == 2
+    
+    def test_get_posts_liked_flags_from_feed_query(self, post_service, mock_post_repository, mock_like_repository):
+        """Test the viewer's liked flags come from the feed rows without a second query"""
+        from datetime import datetime
+        from types import SimpleNamespace
+        
+        mock_post_repository.get_posts.return_value = [
+            SimpleNamespace(post_id=pid, title='t', content='c', created_at=datetime(2024, 1, 1),
+                            updated_at=datetime(2024, 1, 1), user_id=1, username='testuser', profile_picture=None, image=None,
+                            likes_count=0, comments_count=0, liked_by_viewer=(pid == 2))
+            for pid in (2, 1)
+        ]
+        
+        result = post_service.get_posts(viewer_id=5)
+        
+        assert result['liked_post_ids'] == [2]
+        assert [p['liked'] for p in result['posts']] == [True, False]
+        assert mock_post_repository.get_posts.call_args.kwargs['viewer_id'] == 5
+        mock_like_repository.get_user_liked_post_ids.assert_not_called()
+    
+    def test_get_posts_cache_hit_overlays_viewer_likes(self, mock_post_repository, mock_like_repository):
+        """Test cached pages are shared between viewers with likes merged in afterwards"""
+        from datetime import datetime
+        from types import SimpleNamespace
+        from app.cache import FeedCache, InMemoryCacheBackend
+        
+        feed_cache = FeedCache()
+        feed_cache.backend = InMemoryCacheBackend()
+        service = PostService(post_repository=mock_post_repository, like_repository=mock_like_repository,
+                              feed_cache=feed_cache)
+        mock_post_repository.get_posts.return_value = [
+            SimpleNamespace(post_id=3, title='t', content='c', created_at=datetime(2024, 1, 1),
+                            updated_at=datetime(2024, 1, 1), user_id=1, username='testuser', profile_picture=None, image=None,
+                            likes_count=1, comments_count=0, liked_by_viewer=True)
+        ]
+        mock_like_repository.get_user_liked_post_ids.return_value = []
+        
+        first = service.get_posts(viewer_id=1)
+        second = service.get_posts(viewer_id=2)
+        
+        assert first['posts'][0]['liked'] is True
+        assert second['posts'][0]['liked'] is False
+        assert second['liked_post_ids'] == []
+        mock_like_repository.get_user_liked_post_ids.assert_called_once_with(2, [3])
+    
+    def test_get_post_detail_uses_liked_flag(self, post_service, mock_post_repository, mock_like_repository):
+        """Test post detail reads the liked flag computed with the post"""
+        from datetime import datetime
+        from types import SimpleNamespace
+        
+        mock_post_repository.get_post_by_id.return_value = SimpleNamespace(
+            post_id=4, title='t', content='c', created_at=datetime(2024, 1, 1), updated_at=None,
+            user_id=1, user=SimpleNamespace(username='testuser', profile_picture=None), image=None,
+            likes_count=2, comments_count=0, liked_by_viewer=True
+        )
+        
+        detail = post_service.get_post_detail(4, 9)
+        
+        assert detail['liked'] is True
+        mock_post_repository.get_post_by_id.assert_called_once_with(4, viewer_id=9)
+        mock_like_repository.get_user_liked_post_ids.assert_not_called()
+    
+    def test_get_post_etag_tracks_counters_and_viewer(self, post_service, mock_post_repository):
+        """Test the detail ETag changes with counters and the viewer's like, not just updated_at"""
+        from datetime import datetime
+        from types import SimpleNamespace
+        
+        def version(likes, liked):
+            return SimpleNamespace(updated_at=datetime(2024, 1, 1), likes_count=likes, comments_count=0,
+                                   username='testuser', profile_picture=None, liked_by_viewer=liked)
+        
+        mock_post_repository.get_post_version.return_value = version(1, False)
+        before = post_service.get_post_etag(4, 9)
+        mock_post_repository.get_post_version.return_value = version(2, True)
+        after = post_service.get_post_etag(4, 9)
+        
+        assert before != after
+        mock_post_repository.get_post_version.assert_called_with(4, viewer_id=9)
+    
+    def test_detail_etag_matches_probe(self, post_service, mock_post_repository):
+        """Test the ETag built from a loaded detail equals the probe's, so unconditional reads need no probe"""
+        from datetime import datetime
+        from types import SimpleNamespace
+        
+        updated_at = datetime(2024, 1, 1)
+        mock_post_repository.get_post_by_id.return_value = SimpleNamespace(
+            post_id=4, title='t', content='c', created_at=updated_at, updated_at=updated_at,
+            user_id=1, user=SimpleNamespace(username='testuser', profile_picture='p.jpg'), image=None,
+            likes_count=2, comments_count=3, liked_by_viewer=True
+        )
+        mock_post_repository.get_post_version.return_value = SimpleNamespace(
+            updated_at=updated_at, likes_count=2, comments_count=3,
+            username='testuser', profile_picture='p.jpg', liked_by_viewer=True
+        )
+        
+        detail = post_service.get_post_detail(4, 9)
+        
+        assert post_service.get_detail_etag(detail) == post_service.get_post_etag(4, 9)
+        detail['likes'] += 1
+        assert post_service.get_detail_etag(detail) != post_service.get_post_etag(4, 9)
+    
+    def test_get_post_etag_missing_post(self, post_service, mock_post_repository):
+        """Test no ETag is produced for a post that does not exist"""
+        mock_post_repository.get_post_version.return_value = None
+        
+        assert post_service.get_post_etag(404, 1) is None
+    
+    def test_toggle_like_write_behind(self, mock_post_repository, mock_like_repository):
+        """Test write-behind mode buffers the toggle and leaves cache invalidation to the flusher"""
+        like_buffer = Mock(enabled=True)
+        like_buffer.toggle.return_value = (True, 6)
+        feed_cache = Mock()
+        service = PostService(post_repository=mock_post_repository, like_repository=mock_like_repository,
+                              feed_cache=feed_cache, like_buffer=like_buffer)
+        
+        result, error = service.toggle_like(post_id=1, user_id=2)
+        
+        assert result == {"likes": 6, "liked": True}
+        like_buffer.toggle.assert_called_once_with(2, 1)
+        mock_like_repository.toggle.assert_not_called()
+        feed_cache.invalidate.assert_not_called()
+    
+    def test_get_user_liked_posts_uses_liked_set_cache(self, mock_post_repository, mock_like_repository, mock_flask_app):
+        """Test page lookups load the user's liked set once and then answer from memory"""
+        from app.cache import LikedSetCache
+        
+        liked_sets = LikedSetCache(mock_flask_app)
+        service = PostService(post_repository=mock_post_repository, like_repository=mock_like_repository,
+                              liked_set_cache=liked_sets)
+        mock_like_repository.get_user_liked_post_ids.return_value = [2, 7]
+        
+        assert service.get_user_liked_posts(1, [7, 3]) == [7]
+        assert service.get_user_liked_posts(1, [2, 3]) == [2]
+        
+        mock_like_repository.get_user_liked_post_ids.assert_called_once_with(1)
+    
+    def test_daily_post_limit_uses_membership_from_token(self, mock_post_repository, mock_like_repository):
+        """Test the limit check skips loading the user when the token carries its membership"""
+        mock_user_repository = Mock()
+        service = PostService(user_repository=mock_user_repository, post_repository=mock_post_repository,
+                              like_repository=mock_like_repository)
+        mock_post_repository.count_user_posts_today.return_value = 3
+        
+        assert service.has_reached_daily_post_limit(1, 'basic') is True
+        assert service.has_reached_daily_post_limit(1, 'premium') is False
+        
+        mock_user_repository.get_by_id.assert_not_called()
+        mock_post_repository.count_user_posts_today.assert_called_once_with(1)
@@ -6,6 +6,7 @@ from unittest.mock import Mock, patch
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
 from app.services.profile_service import ProfileService
+from app.repositories.user_repository import UserConflictError
 
 class TestProfileService:
     
@@ -18,10 +19,15 @@ class TestProfileService:
         return Mock()
     
     @pytest.fixture
-    def profile_service(self, mock_user_repository, mock_post_repository):
+    def mock_media_service(self):
+        return Mock()
+    
+    @pytest.fixture
+    def profile_service(self, mock_user_repository, mock_post_repository, mock_media_service):
         return ProfileService(
             user_repository=mock_user_repository,
-            post_repository=mock_post_repository
+            post_repository=mock_post_repository,
+            media_service=mock_media_service
         )
     
     def test_is_allowed_file_valid_extension(self, profile_service):
@@ -36,46 +42,6 @@ class TestProfileService:
         assert profile_service._is_allowed_file('document.pdf') is False
         assert profile_service._is_allowed_file('noextension') is False
 
-    def test_is_valid_mime_valid(self, profile_service):
-        """Test MIME type validation with valid file"""
-        from io import BytesIO
-        file = BytesIO(b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00')  # Simulated PNG file content
-        file.filename = 'test.png'
-        file.seek = lambda *args: None
-        file.read = lambda x: b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00'
-
-        with patch('magic.from_buffer', return_value='image/png'):
-            assert profile_service._is_valid_mime(file) is True
-
-    def test_is_valid_mime_invalid(self, profile_service):
-        """Test MIME type validation with invalid file"""
-        from io import BytesIO
-        file = BytesIO(b'FAKECONTENT')
-        file.filename = 'test.png'
-        file.seek = lambda *args: None
-        file.read = lambda x: b'FAKECONTENT'
-
-        with patch('magic.from_buffer', return_value='text/plain'):
-            assert profile_service._is_valid_mime(file) is False
-
-    def test_file_size_check_valid(self, profile_service):
-        """Test file size validation for files within allowed size"""
-        mock_file = Mock()
-        mock_file.seek = Mock()
-        mock_file.tell = Mock(return_value=1024 * 1024 * 2)  # 2 MB file size
-        mock_file.seek.return_value = None
-        
-        assert profile_service._is_valid_size(mock_file) is True
-    
-    def test_file_size_check_invalid(self, profile_service):
-        """Test file size validation for files exceeding allowed size"""
-        mock_file = Mock()
-        mock_file.seek = Mock()
-        mock_file.tell = Mock(return_value=1024 * 1024 * 11)  # 11 MB file size (assuming 10MB max)
-        mock_file.seek.return_value = None
-        
-        assert profile_service._is_valid_size(mock_file) is False
-
     def test_get_user_profile_success(self, profile_service, mock_user_repository):
         """Test successful user profile retrieval"""
         from app.models.users import User
@@ -116,41 +82,127 @@ class TestProfileService:
             assert result is None
             assert error == "Invalid email format"
     
-    @patch('os.makedirs')
-    @patch('time.time')
-    def test_update_profile_picture_success(self, mock_time, mock_makedirs, profile_service, mock_user_repository):
-        """Test successful profile picture update"""
-        mock_time.return_value = 1234567890
+    def test_update_profile_checks_only_changed_fields(self, profile_service, mock_user_repository):
+        """Unchanged values are not checked; the others go in one query that ignores the user's own row"""
+        user = Mock(user_id=1, username='painter', email='old@example.com')
+        mock_user_repository.get_by_id.return_value = user
+        mock_user_repository.find_conflicts.return_value = {'email'}
+
+        result, error = profile_service.update_profile(1, {'username': 'painter', 'email': 'taken@example.com'})
+
+        assert (result, error) == (None, "Email is already in use")
+        mock_user_repository.find_conflicts.assert_called_once_with(exclude_user_id=1, email='taken@example.com')
+        mock_user_repository.update.assert_not_called()
 
+    def test_update_profile_reports_lost_race(self, profile_service, mock_user_repository):
+        mock_user_repository.get_by_id.return_value = Mock(user_id=1, username='painter', email='old@example.com')
+        mock_user_repository.find_conflicts.return_value = set()
+        mock_user_repository.update.side_effect = UserConflictError({'username'})
+
+        result, error = profile_service.update_profile(1, {'username': 'sculptor'})
+
+        assert (result, error) == (None, "Username is already in use")
+
+    def test_update_profile_picture_success(self, profile_service, mock_user_repository, mock_media_service):
+        """Test successful profile picture update"""
         fake_image_content = b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00'
         
         mock_file = Mock()
         mock_file.filename = 'profile.jpg'
-        mock_file.save = Mock()
         mock_file.read = Mock(return_value=fake_image_content)  # Fix here
         mock_file.seek = Mock()
         
         mock_user_repository.update_profile_picture.return_value = Mock()
+        mock_user_repository.get_by_id.return_value = Mock(profile_picture=f"/uploads/{'12' * 32}.png")
+        mock_media_service.store.return_value = '34' * 32 + '.png'
         
-        with patch.object(profile_service, '_is_allowed_file', return_value=True), \
-            patch.object(profile_service, '_is_valid_size', return_value=True), \
-            patch.object(profile_service, '_is_valid_mime', return_value=True):
+        with patch.object(profile_service, '_is_allowed_file', return_value=True):
             result, error = profile_service.update_profile_picture(user_id=1, file=mock_file)
             
-            assert error is None
-            assert result.startswith('/uploads/')
-            mock_makedirs.assert_called_once()
-            mock_file.save.assert_called_once()
+        assert error is None
+        assert result == f"/uploads/{'34' * 32}.png"
+        mock_user_repository.update_profile_picture.assert_called_once_with(1, result)
+        mock_media_service.release.assert_called_once_with(f"/uploads/{'12' * 32}.png")
+    
+    def test_update_profile_picture_rejected_content(self, profile_service, mock_user_repository, mock_media_service):
+        """Uploads rejected while streaming are reported without touching the stored picture"""
+        mock_file = Mock()
+        mock_file.filename = 'profile.png'
+        mock_media_service.store.side_effect = ValueError("Invalid file content")
+        
+        result, error = profile_service.update_profile_picture(user_id=1, file=mock_file)
+            
+        assert result is None
+        assert error == "Invalid file content (MIME type check failed)"
+        mock_user_repository.update_profile_picture.assert_not_called()
     
     def test_update_profile_picture_invalid_file(self, profile_service):
         """Test profile picture update with invalid file type"""
         mock_file = Mock()
         mock_file.filename = 'document.pdf'
         
-        with patch.object(profile_service, '_is_allowed_file', return_value=False), \
-            patch.object(profile_service, '_is_valid_size', return_value=False), \
-            patch.object(profile_service, '_is_valid_mime', return_value=False):
+        with patch.object(profile_service, '_is_allowed_file', return_value=False):
             result, error = profile_service.update_profile_picture(user_id=1, file=mock_file)
             
             assert result is None
-            assert error == "File type not allowed"
\ No newline at end of file
+            assert error == "File type not allowed"
+    def test_delete_user_profile_releases_media(self, profile_service, mock_user_repository, mock_media_service):
+        """Images referenced by the user's content are released after the user is deleted"""
+        user = Mock()
+        mock_user_repository.get_by_id.return_value = user
+        mock_user_repository.get_media_references.return_value = ['/uploads/a.png', '/post_uploads/b.png']
+
+        success, error = profile_service.delete_user_profile(1)
+
+        assert (success, error) == (True, None)
+        mock_user_repository.delete.assert_called_once_with(user)
+        mock_media_service.release_all.assert_called_once_with(['/uploads/a.png', '/post_uploads/b.png'])
+
+    def test_delete_user_profile_drops_feed_pages_before_media(self, mock_user_repository, mock_post_repository, mock_media_service):
+        """Cached pages showing the user's posts are dropped before their images can be deleted"""
+        from app.cache import FeedCache
+
+        calls = Mock()
+        feed_cache = Mock(author_tag=FeedCache.author_tag, scope_tag=FeedCache.scope_tag)
+        calls.attach_mock(feed_cache.invalidate, 'invalidate')
+        calls.attach_mock(mock_media_service.release_all, 'release_all')
+        service = ProfileService(user_repository=mock_user_repository, post_repository=mock_post_repository,
+                                 media_service=mock_media_service, feed_cache=feed_cache)
+        mock_user_repository.get_by_id.return_value = Mock()
+        mock_user_repository.get_media_references.return_value = ['/uploads/a.png']
+
+        service.delete_user_profile(4)
+
+        assert [call[0] for call in calls.mock_calls] == ['invalidate', 'release_all']
+        feed_cache.invalidate.assert_called_once_with('author:4', 'scope:all', 'scope:user:4')
+
+    def test_rename_refreshes_cached_feed(self, mock_user_repository, mock_post_repository, mock_media_service):
+        """The next feed read after a rename shows the new username instead of a cached page"""
+        from datetime import datetime
+        from types import SimpleNamespace
+        from app.cache import FeedCache, InMemoryCacheBackend
+        from app.services.post_service import PostService
+
+        feed_cache = FeedCache()
+        feed_cache.backend = InMemoryCacheBackend()
+        post_service = PostService(post_repository=mock_post_repository, like_repository=Mock(),
+                                   media_service=mock_media_service, feed_cache=feed_cache)
+        profile_service = ProfileService(user_repository=mock_user_repository, post_repository=mock_post_repository,
+                                         media_service=mock_media_service, token_versions=Mock(), feed_cache=feed_cache)
+        mock_media_service.get_variants.return_value = {}
+
+        def feed_rows(username):
+            return [SimpleNamespace(post_id=7, title='t', content='c', created_at=datetime(2024, 1, 1),
+                                    updated_at=datetime(2024, 1, 1), user_id=1, username=username, profile_picture=None,
+                                    image=None, likes_count=0, comments_count=0)]
+
+        mock_post_repository.get_posts.return_value = feed_rows('painter')
+        assert b'"username":"painter"' in post_service.get_posts(sort_by='recent').data
+
+        mock_user_repository.get_by_id.return_value = Mock(user_id=1, username='painter', email='p@example.com')
+        mock_user_repository.find_conflicts.return_value = set()
+        mock_user_repository.update.return_value = Mock(user_id=1, username='sculptor', token_version=3)
+        mock_post_repository.get_posts.return_value = feed_rows('sculptor')
+        profile_service.update_profile(1, {'username': 'sculptor'})
+
+        assert b'"username":"sculptor"' in post_service.get_posts(sort_by='recent').data
@@ -0,0 +1,122 @@
+import pytest
+import sys
+import os
+import multiprocessing
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from limits import parse
+from limits.storage import MemoryStorage, storage_from_string
+from limits.strategies import SlidingWindowCounterRateLimiter
+
+from app.ratelimit import SharedMemoryStorage
+
+def _acquire_many(path, attempts, results):
+    storage = storage_from_string(f'sharedmem://{path}')
+    limiter = SharedMemoryStorage.acquire_sliding_window_entry
+    results.put(sum(limiter(storage, 'shared-key', 100, 60) for _ in range(attempts)))
+
+class TestSharedMemoryStorage:
+
+    @pytest.fixture
+    def clock(self, monkeypatch):
+        now = [1_700_000_000.0]
+        monkeypatch.setattr(time, 'time', lambda: now[0])
+        return now
+
+    @pytest.fixture
+    def path(self, tmp_path):
+        return str(tmp_path / 'ratelimit')
+
+    @pytest.fixture
+    def storage(self, path, clock):
+        storage = storage_from_string(f'sharedmem://{path}?slots=64')
+        yield storage
+        storage.close()
+
+    def test_uri_selects_storage(self, storage, path):
+        assert isinstance(storage, SharedMemoryStorage)
+        assert (storage.path, storage.slots, storage.check()) == (path, 64, True)
+
+    def test_fixed_window_counts_until_expiry(self, storage, clock):
+        assert storage.incr('key', 60) == 1
+        assert storage.incr('key', 60, amount=2) == 3
+        assert storage.get_expiry('key') == clock[0] + 60
+
+        clock[0] += 60
+        assert storage.get('key') == 0
+        assert storage.incr('key', 60) == 1
+
+    def test_counters_are_shared_through_the_file(self, storage, path):
+        """A second mapping of the same file (another worker) sees the same counters"""
+        other = SharedMemoryStorage(f'sharedmem://{path}?slots=1024')
+        try:
+            storage.incr('key', 60)
+            assert other.incr('key', 60) == 2
+            # The table keeps the size it was created with
+            assert other.slots == 64
+        finally:
+            other.close()
+
+    def test_sliding_window_matches_memory_storage(self, storage, clock):
+        """Admits exactly the hits the limits library's in-memory storage admits"""
+        item = parse('5/minute')
+        shared = SlidingWindowCounterRateLimiter(storage)
+        memory_storage = MemoryStorage()
+        memory = SlidingWindowCounterRateLimiter(memory_storage)
+        try:
+            for step in range(200):
+                clock[0] += 1.7
+                assert shared.hit(item, 'user') == memory.hit(item, 'user'), step
+                assert shared.get_window_stats(item, 'user') == memory.get_window_stats(item, 'user')
+        finally:
+            memory_storage.timer.cancel()
+
+    def test_previous_window_weight(self, storage, clock):
+        clock[0] = 6000.0
+        assert all(storage.acquire_sliding_window_entry('key', 10, 60) for _ in range(10))
+        assert not storage.acquire_sliding_window_entry('key', 10, 60)
+
+        # Halfway through the next window half of the previous count still applies
+        clock[0] += 90
+        assert sum(storage.acquire_sliding_window_entry('key', 10, 60) for _ in range(10)) == 5
+        assert storage.get_sliding_window('key', 60) == (10, 30.0, 5, 90.0)
+
+        clock[0] += 120
+        assert storage.get_sliding_window('key', 60) == (0, 0.0, 0, 90.0)
+
+    def test_full_bucket_evicts_the_slot_closest_to_expiry(self, path, clock):
+        storage = SharedMemoryStorage(f'sharedmem://{path}?slots=8&bucket_size=8')
+        try:
+            for i in range(8):
+                storage.incr(f'key{i}', 60 + i)
+            storage.incr('key8', 600)
+
+            assert storage.evictions == 1
+            assert storage.get('key0') == 0
+            assert all(storage.get(f'key{i}') == 1 for i in range(1, 9))
+        finally:
+            storage.close()
+
+    def test_clear_and_reset(self, storage):
+        storage.incr('a', 60)
+        storage.acquire_sliding_window_entry('b', 5, 60)
+        storage.clear('a')
+        assert storage.get('a') == 0
+
+        assert storage.reset() == 1
+        assert storage.get_sliding_window('b', 60)[2] == 0
+
+    def test_processes_share_one_limit(self, path, clock):
+        """Four processes racing for a limit of 100 admit exactly 100 hits in total"""
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        processes = [context.Process(target=_acquire_many, args=(path, 50, results)) for _ in range(4)]
+        for process in processes:
+            process.start()
+        admitted = sum(results.get(timeout=30) for _ in processes)
+        for process in processes:
+            process.join(timeout=30)
+
+        assert admitted == 100
@@ -0,0 +1,166 @@
+import pytest
+import sys
+import os
+import hashlib
+from io import BytesIO
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from flask import Flask, jsonify, request
+from werkzeug.datastructures import FileStorage
+
+from app.utils.uploads import (
+    StreamedUpload, UploadPolicy, UploadRequest, stream_uploads, prepare_upload,
+    SNIFF_BYTES, INVALID_CONTENT_ERROR, FILE_TOO_LARGE_ERROR
+)
+
+PNG_BYTES = (
+    b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR\x00\x00\x00\x10\x00\x00\x00\x10\x08\x02\x00\x00\x00'
+    + bytes(range(256)) * 40
+)
+ALLOWED = {'image/png', 'image/jpeg'}
+
+def leftover_parts(folder):
+    return [name for name in os.listdir(folder) if name.endswith('.part')]
+
+def save_upload(file, folder, filename, max_bytes, allowed_mimes):
+    """Validate an upload and store it as folder/filename, the way MediaService.store does"""
+    upload = prepare_upload(file, folder, max_bytes, allowed_mimes)
+    try:
+        upload.commit(os.path.join(folder, filename))
+        return upload
+    finally:
+        upload.close()
+
+class TestStreamedUpload:
+
+    def test_streams_hashes_and_commits(self, tmp_path):
+        """Chunks are hashed as they arrive and the temp file is renamed into place"""
+        upload = StreamedUpload(UploadPolicy(1024 * 1024, str(tmp_path), ALLOWED))
+        for start in range(0, len(PNG_BYTES), 700):
+            upload.write(PNG_BYTES[start:start + 700])
+
+        target = str(tmp_path / 'picture.png')
+        upload.commit(target)
+        upload.close()
+
+        assert upload.mime == 'image/png'
+        assert upload.size == len(PNG_BYTES)
+        assert upload.sha256 == hashlib.sha256(PNG_BYTES).hexdigest()
+        with open(target, 'rb') as f:
+            assert f.read() == PNG_BYTES
+        assert leftover_parts(tmp_path) == []
+
+    def test_rejects_content_from_first_chunk(self, tmp_path):
+        """Non-images are rejected once SNIFF_BYTES have arrived and later chunks are dropped"""
+        upload = StreamedUpload(UploadPolicy(1024 * 1024, str(tmp_path), ALLOWED))
+        upload.write(b'<html>' + b'x' * SNIFF_BYTES)
+
+        assert upload.error == INVALID_CONTENT_ERROR
+        assert leftover_parts(tmp_path) == []
+        upload.write(b'y' * 4096)
+        with pytest.raises(ValueError, match=INVALID_CONTENT_ERROR):
+            upload.commit(str(tmp_path / 'page.png'))
+
+    def test_rejects_oversized_file_while_streaming(self, tmp_path):
+        upload = StreamedUpload(UploadPolicy(3000, str(tmp_path), ALLOWED))
+        upload.write(PNG_BYTES[:2500])
+        upload.write(PNG_BYTES[2500:5000])
+
+        assert upload.error == FILE_TOO_LARGE_ERROR
+        assert leftover_parts(tmp_path) == []
+
+    def test_small_file_is_sniffed_on_finish(self, tmp_path):
+        """Files shorter than SNIFF_BYTES are checked when the parser rewinds them"""
+        upload = StreamedUpload(UploadPolicy(1024 * 1024, str(tmp_path), ALLOWED))
+        upload.write(PNG_BYTES[:100])
+        upload.seek(0)
+
+        assert upload.mime == 'image/png'
+        assert upload.read() == PNG_BYTES[:100]
+        upload.close()
+
+    def test_close_without_commit_removes_temp_file(self, tmp_path):
+        upload = StreamedUpload(UploadPolicy(1024 * 1024, str(tmp_path), ALLOWED))
+        upload.write(PNG_BYTES)
+        upload.close()
+
+        assert os.listdir(tmp_path) == []
+
+class TestPrepareUpload:
+
+    def test_copies_plain_file_storage(self, tmp_path):
+        """Files that were not streamed go through the same checks"""
+        file = FileStorage(BytesIO(PNG_BYTES), filename='a.png')
+
+        upload = save_upload(file, str(tmp_path), 'a.png', 1024 * 1024, ALLOWED)
+
+        assert upload.sha256 == hashlib.sha256(PNG_BYTES).hexdigest()
+        assert (tmp_path / 'a.png').read_bytes() == PNG_BYTES
+        assert leftover_parts(tmp_path) == []
+
+    def test_applies_stricter_limit_than_streaming_policy(self, tmp_path):
+        streamed = StreamedUpload(UploadPolicy(1024 * 1024, str(tmp_path), ALLOWED))
+        streamed.write(PNG_BYTES)
+        file = FileStorage(streamed, filename='a.png')
+
+        with pytest.raises(ValueError, match=FILE_TOO_LARGE_ERROR):
+            save_upload(file, str(tmp_path), 'a.png', 1000, ALLOWED)
+        assert os.listdir(tmp_path) == []
+
+class TestStreamUploadsRoute:
+
+    @pytest.fixture
+    def upload_app(self, tmp_path):
+        app = Flask(__name__)
+        app.request_class = UploadRequest
+        folder = str(tmp_path)
+
+        @app.route('/upload', methods=['POST'])
+        @stream_uploads(32 * 1024, folder, ALLOWED)
+        def upload():
+            try:
+                image = request.files['image']
+                stored = save_upload(image, folder, 'stored.png', 32 * 1024, ALLOWED)
+                return jsonify({"sha256": stored.sha256, "title": request.form.get('title')}), 201
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+        return app
+
+    def test_upload_is_streamed_into_place(self, upload_app, tmp_path):
+        client = upload_app.test_client()
+        with patch('app.utils.uploads.magic.from_buffer', wraps=__import__('magic').from_buffer) as sniff:
+            response = client.post('/upload', data={
+                'title': 'hello',
+                'image': (BytesIO(PNG_BYTES), 'a.png'),
+            }, content_type='multipart/form-data')
+
+        assert response.status_code == 201
+        assert response.get_json() == {"sha256": hashlib.sha256(PNG_BYTES).hexdigest(), "title": "hello"}
+        assert (tmp_path / 'stored.png').read_bytes() == PNG_BYTES
+        assert leftover_parts(tmp_path) == []
+        # libmagic only ever sees the head of the file
+        assert all(len(call.args[0]) < len(PNG_BYTES) for call in sniff.call_args_list)
+
+    def test_oversized_body_is_rejected_before_parsing(self, upload_app, tmp_path):
+        client = upload_app.test_client()
+        with patch.object(UploadRequest, '_get_file_stream') as get_file_stream:
+            response = client.post('/upload', data={
+                'image': (BytesIO(PNG_BYTES * 20), 'big.png'),
+            }, content_type='multipart/form-data')
+
+        assert response.status_code == 413
+        get_file_stream.assert_not_called()
+        assert os.listdir(tmp_path) == []
+
+    def test_rejected_content_leaves_no_files(self, upload_app, tmp_path):
+        client = upload_app.test_client()
+        response = client.post('/upload', data={
+            'image': (BytesIO(b'#!/bin/sh\n' + b'echo hi\n' * 400), 'a.png'),
+        }, content_type='multipart/form-data')
+
+        assert response.status_code == 400
+        assert response.get_json()['error'] == INVALID_CONTENT_ERROR
+        assert os.listdir(tmp_path) == []
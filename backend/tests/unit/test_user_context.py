@@ -0,0 +1,93 @@
+import pytest
+import sys
+import os
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from flask import Flask, jsonify
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required
+
+from app.cache import TokenVersionCache
+from app.utils.user_context import (
+    CONTEXT_CLAIM, UserContext, context_claims, context_from_claims, context_of, get_user_context
+)
+
+def make_user(**overrides):
+    fields = dict(user_id=7, membership='basic', totp_verified=True, username='painter', token_version=2)
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+class TestUserContextClaims:
+
+    def test_claims_round_trip(self):
+        context = context_of(make_user())
+        claims = context_claims(context)
+
+        assert claims["totp_verified"] is True
+        assert context_from_claims("7", claims) == context
+
+    def test_tokens_without_context_have_none(self):
+        assert context_from_claims("7", {"totp_verified": True}) is None
+        assert context_from_claims("7", {CONTEXT_CLAIM: {"v": 0, "m": "basic"}}) is None
+
+    def test_new_user_defaults(self):
+        context = context_of(make_user(membership=None, totp_verified=None, token_version=None))
+        assert (context.membership, context.totp_verified, context.token_version) == ('basic', False, 0)
+
+class TestTokenVersionCache:
+
+    @pytest.fixture
+    def app(self):
+        app = Flask(__name__)
+        app.config.update({'JWT_SECRET_KEY': 'test-secret-key-long-enough-for-hs256', 'TESTING': True})
+        jwt = JWTManager(app)
+        versions = TokenVersionCache(app, jwt)
+
+        @app.route('/context')
+        @jwt_required()
+        def context_view():
+            return jsonify(get_user_context()._asdict())
+
+        app.versions = versions
+        return app
+
+    def token(self, app, **overrides):
+        with app.app_context():
+            context = context_of(make_user(**overrides))
+            return create_access_token(identity=str(context.user_id), additional_claims=context_claims(context))
+
+    def test_context_read_from_token(self, app):
+        response = app.test_client().get('/context', headers={'Authorization': f'Bearer {self.token(app)}'})
+
+        assert response.status_code == 200
+        assert UserContext(**response.get_json()) == context_of(make_user())
+
+    def test_bump_rejects_older_tokens(self, app):
+        """After an upgrade, tokens claiming the old membership get 401 so the client refreshes"""
+        stale = self.token(app, token_version=2)
+        fresh = self.token(app, membership='premium', token_version=3)
+        app.versions.bump(7, 3)
+
+        client = app.test_client()
+        response = client.get('/context', headers={'Authorization': f'Bearer {stale}'})
+        assert response.status_code == 401
+        assert response.get_json()["error"] == "token_stale"
+        assert client.get('/context', headers={'Authorization': f'Bearer {fresh}'}).status_code == 200
+
+    def test_other_users_are_unaffected(self, app):
+        app.versions.bump(8, 5)
+        token = self.token(app)
+
+        assert app.test_client().get('/context', headers={'Authorization': f'Bearer {token}'}).status_code == 200
+        assert not app.versions.is_stale(7, 0)
+
+    def test_bumps_outlive_configured_access_tokens(self):
+        from datetime import timedelta
+
+        app = Flask(__name__)
+        app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
+        assert TokenVersionCache(app).ttl == 3600
+
+        app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(minutes=5)
+        assert TokenVersionCache(app).ttl == 900
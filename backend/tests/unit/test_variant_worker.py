@@ -0,0 +1,96 @@
+import pytest
+import sys
+import os
+from io import BytesIO
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+Image = pytest.importorskip('PIL.Image')
+
+from app.workers.variant_worker import VariantWorker
+from app.utils.media_paths import VARIANT_FORMATS, media_relative_path, variant_name
+
+NAME = 'ab' * 32 + '.png'
+
+class FakeVariantRepository:
+    def __init__(self, released=False):
+        self.rows = []
+        self.released = released
+
+    def get_variants(self, sha256s, format=None):
+        return [SimpleNamespace(sha256=sha, **row) for sha, row in self.rows if sha in sha256s]
+
+    def add_variants(self, sha256, variants):
+        if self.released:
+            return False
+        self.rows += [(sha256, variant) for variant in variants]
+        return True
+
+def store_image(root, size, mode='RGB'):
+    path = root / media_relative_path(NAME)
+    path.parent.mkdir(parents=True)
+    buffer = BytesIO()
+    Image.new(mode, size, (200, 30, 30, 128) if mode == 'RGBA' else (200, 30, 30)).save(buffer, 'PNG')
+    path.write_bytes(buffer.getvalue())
+    return path.parent
+
+class TestVariantWorker:
+
+    def test_generates_narrower_widths_in_every_format(self, tmp_path):
+        """A 600px wide original gets 128 and 480 px copies, with heights kept in proportion"""
+        folder = store_image(tmp_path, (600, 300), mode='RGBA')
+        repository = FakeVariantRepository()
+        worker = VariantWorker(media_repository=repository, media_root=str(tmp_path))
+
+        variants = worker.generate(NAME)
+
+        assert sorted((v['width'], v['height'], v['format']) for v in variants) == [
+            (128, 64, 'jpeg'), (128, 64, 'webp'), (480, 240, 'jpeg'), (480, 240, 'webp')
+        ]
+        for variant in variants:
+            with Image.open(folder / variant_name(NAME, variant['width'], variant['format'])) as image:
+                assert image.size == (variant['width'], variant['height'])
+                assert image.format == variant['format'].upper()
+        assert len(repository.rows) == 4
+
+    def test_existing_variants_are_not_regenerated(self, tmp_path):
+        store_image(tmp_path, (600, 300))
+        repository = FakeVariantRepository()
+        worker = VariantWorker(media_repository=repository, media_root=str(tmp_path))
+        worker.generate(NAME)
+
+        assert worker.generate(NAME) == []
+        assert len(repository.rows) == 4
+
+    def test_small_image_has_no_variants(self, tmp_path):
+        folder = store_image(tmp_path, (100, 80))
+        worker = VariantWorker(media_repository=FakeVariantRepository(), media_root=str(tmp_path))
+
+        assert worker.generate(NAME) == []
+        assert os.listdir(folder) == [NAME]
+
+    def test_variants_of_released_image_are_removed(self, tmp_path):
+        """Files written for an image released mid-way do not outlive it"""
+        folder = store_image(tmp_path, (600, 300))
+        worker = VariantWorker(media_repository=FakeVariantRepository(released=True), media_root=str(tmp_path))
+
+        assert worker.generate(NAME) == []
+        assert os.listdir(folder) == [NAME]
+
+    def test_submit_is_a_no_op_when_disabled(self, tmp_path):
+        worker = VariantWorker(media_repository=FakeVariantRepository(), media_root=str(tmp_path))
+        assert worker.submit(NAME) is None
+
+    def test_pool_generates_in_background(self, tmp_path, mock_flask_app):
+        store_image(tmp_path, (600, 300))
+        repository = FakeVariantRepository()
+        worker = VariantWorker(media_repository=repository, media_root=str(tmp_path))
+        mock_flask_app.config['MEDIA_VARIANT_WORKERS'] = 1
+        worker.init_app(mock_flask_app)
+        try:
+            worker.submit(NAME).result(timeout=30)
+        finally:
+            worker.stop()
+
+        assert len(repository.rows) == 2 * len(VARIANT_FORMATS)
@@ -1,5 +1,9 @@
 import { useEffect, useState, useContext } from "react";
-import { API_ENDPOINT, FETCH_COMMENTS_ROUTE } from "../../const";
+import {
+  API_ENDPOINT,
+  FETCH_COMMENTS_ROUTE,
+  COMMENTS_PAGE_SIZE,
+} from "../../const";
 import fetchWithAuth from "../../utils/fetchWithAuth";
 import { GlobalContext } from "../../utils/globalContext";
 import CommentThread from "./CommentThread";
@@ -9,38 +13,19 @@ export default function CommentSection({ postId }) {
   const { getAuthToken, updateAuthToken, handleLogout } =
     useContext(GlobalContext);
   const [comments, setComments] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [showForm, setShowForm] = useState(false);
 
-  function buildCommentTree(flatComments) {
-    const map = new Map();
-    const roots = [];
+  // Top-level comments arrive a page at a time; replies are loaded per thread
+  async function loadComments(cursor = null) {
+    const params = new URLSearchParams({ limit: COMMENTS_PAGE_SIZE });
+    if (cursor) params.set("cursor", cursor);
 
-    // Initialize map and set up reply containers
-    flatComments.forEach((comment) => {
-      comment.replies = [];
-      map.set(comment.comment_id, comment);
-    });
-
-    flatComments.forEach((comment) => {
-      if (comment.parent_id) {
-        const parent = map.get(comment.parent_id);
-        if (parent) {
-          parent.replies.push(comment);
-        } else {
-          roots.push(comment); // fallback
-        }
-      } else {
-        roots.push(comment);
-      }
-    });
-
-    return roots;
-  }
-
-  async function loadComments() {
     try {
+      setLoadingMore(true);
       const res = await fetchWithAuth(
-        `${API_ENDPOINT}/${FETCH_COMMENTS_ROUTE}/${postId}`,
+        `${API_ENDPOINT}/${FETCH_COMMENTS_ROUTE}/${postId}?${params}`,
         { method: "GET" },
         getAuthToken,
         updateAuthToken,
@@ -49,10 +34,13 @@ export default function CommentSection({ postId }) {
 
       if (!res.ok) throw new Error("Failed to load comments");
       const data = await res.json();
-      const tree = buildCommentTree(data.comments || []);
-      setComments(tree);
+      const page = data.comments || [];
+      setComments((prev) => (cursor ? [...prev, ...page] : page));
+      setNextCursor(data.has_more ? data.next_cursor : null);
     } catch (err) {
       console.error("Error loading comments:", err);
+    } finally {
+      setLoadingMore(false);
     }
   }
 
@@ -61,29 +49,10 @@ export default function CommentSection({ postId }) {
   }, [postId]);
 
   function handleNewComment(newComment) {
-    setComments((prevTree) => {
-      // Flatten existing tree to flat list
-      const flatList = flattenComments(prevTree);
-
-      // Add new comment to flat list
-      flatList.push(newComment);
-
-      // Rebuild tree from updated flat list
-      return buildCommentTree(flatList);
-    });
-  }
-
-  // Utility to flatten comment tree to a flat array
-  function flattenComments(tree) {
-    const flat = [];
-    function recurse(nodes) {
-      nodes.forEach((node) => {
-        flat.push(node);
-        if (node.replies?.length) recurse(node.replies);
-      });
+    // Comments are listed oldest first, so a new one belongs after the last page
+    if (!nextCursor && newComment?.comment_id) {
+      setComments((prev) => [...prev, { ...newComment, reply_count: 0 }]);
     }
-    recurse(tree);
-    return flat;
   }
 
   return (
@@ -111,6 +80,16 @@ export default function CommentSection({ postId }) {
           <CommentThread key={comment.comment_id} comment={comment} />
         ))
       )}
+
+      {nextCursor && (
+        <button
+          onClick={() => loadComments(nextCursor)}
+          disabled={loadingMore}
+          className="text-blue-500 text-sm cursor-pointer disabled:opacity-50"
+        >
+          {loadingMore ? "Loading..." : "Load more comments"}
+        </button>
+      )}
     </div>
   );
 }
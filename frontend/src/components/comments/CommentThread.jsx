@@ -1,17 +1,88 @@
-import { useState } from "react";
+import { useContext, useState } from "react";
 import CommentForm from "./CommentForm";
-import { API_ENDPOINT } from "../../const";
+import {
+  API_ENDPOINT,
+  FETCH_COMMENTS_ROUTE,
+  DELETE_COMMENT_ROUTE,
+  COMMENTS_PAGE_SIZE,
+} from "../../const";
+import fetchWithAuth from "../../utils/fetchWithAuth";
+import { GlobalContext } from "../../utils/globalContext";
 
 export default function CommentThread({ comment }) {
+  const { auth, getAuthToken, updateAuthToken, handleLogout } =
+    useContext(GlobalContext);
   const [showReplies, setShowReplies] = useState(false);
   const [showReplyForm, setShowReplyForm] = useState(false);
+  const [replies, setReplies] = useState([]);
+  const [repliesLoaded, setRepliesLoaded] = useState(false);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingReplies, setLoadingReplies] = useState(false);
+  const [deleted, setDeleted] = useState(false);
+
+  const replyCount = comment.reply_count || 0;
 
   const commentImageUrl = comment?.image
     ? `${API_ENDPOINT}/api/comments${
         comment.image.startsWith("/") ? comment.image : "/" + comment.image
-      }`
+      }?w=480`
     : null;
 
+  // Replies are fetched the first time the thread is opened, a page at a time
+  async function loadReplies(cursor = null) {
+    const params = new URLSearchParams({ limit: COMMENTS_PAGE_SIZE });
+    if (cursor) params.set("cursor", cursor);
+
+    try {
+      setLoadingReplies(true);
+      const res = await fetchWithAuth(
+        `${API_ENDPOINT}/${FETCH_COMMENTS_ROUTE}/${comment.post_id}/replies/${comment.comment_id}?${params}`,
+        { method: "GET" },
+        getAuthToken,
+        updateAuthToken,
+        handleLogout
+      );
+
+      if (!res.ok) throw new Error("Failed to load replies");
+      const data = await res.json();
+      const page = data.comments || [];
+      setReplies((prev) => (cursor ? [...prev, ...page] : page));
+      setNextCursor(data.has_more ? data.next_cursor : null);
+      setRepliesLoaded(true);
+    } catch (err) {
+      console.error("Error loading replies:", err);
+    } finally {
+      setLoadingReplies(false);
+    }
+  }
+
+  // Deleting a comment removes every reply under it as well
+  async function deleteComment() {
+    if (!window.confirm("Delete this comment and all of its replies?")) return;
+
+    try {
+      const res = await fetchWithAuth(
+        `${API_ENDPOINT}/${DELETE_COMMENT_ROUTE}/${comment.comment_id}`,
+        { method: "DELETE" },
+        getAuthToken,
+        updateAuthToken,
+        handleLogout
+      );
+
+      if (!res.ok) throw new Error("Failed to delete comment");
+      setDeleted(true);
+    } catch (err) {
+      console.error("Error deleting comment:", err);
+    }
+  }
+
+  function toggleReplies() {
+    if (!showReplies && !repliesLoaded) loadReplies();
+    setShowReplies((s) => !s);
+  }
+
+  if (deleted) return null;
+
   return (
     <div className="ml-4 border-l pl-4 mb-4">
       <div className="text-sm mb-2">
@@ -30,14 +101,20 @@ export default function CommentThread({ comment }) {
         >
           Reply
         </button>
-        {comment.replies?.length > 0 && (
+        {auth?.user && auth.user.user_id === comment.user_id && (
           <button
-            onClick={() => setShowReplies((s) => !s)}
+            onClick={deleteComment}
+            className="text-red-500 text-xs ml-2 cursor-pointer"
+          >
+            Delete
+          </button>
+        )}
+        {replyCount > 0 && (
+          <button
+            onClick={toggleReplies}
             className="text-blue-400 text-xs ml-2 cursor-pointer"
           >
-            {showReplies
-              ? "Hide Replies"
-              : `View Replies (${comment.replies.length})`}
+            {showReplies ? "Hide Replies" : `View Replies (${replyCount})`}
           </button>
         )}
       </div>
@@ -52,9 +129,19 @@ export default function CommentThread({ comment }) {
       )}
 
       {showReplies &&
-        comment.replies?.map((reply) => (
+        replies.map((reply) => (
           <CommentThread key={reply.comment_id} comment={reply} />
         ))}
+
+      {showReplies && nextCursor && (
+        <button
+          onClick={() => loadReplies(nextCursor)}
+          disabled={loadingReplies}
+          className="text-blue-400 text-xs ml-4 cursor-pointer disabled:opacity-50"
+        >
+          {loadingReplies ? "Loading..." : "Load more replies"}
+        </button>
+      )}
     </div>
   );
 }
@@ -7,7 +7,7 @@ import checkRateLimit from "../../utils/checkRateLimit";
 import { GlobalContext } from "../../utils/globalContext";
 import fetchWithAuth from "../../utils/fetchWithAuth";
 import handleRateLimitResponse from "../../utils/handleRateLimitResponse";
-import { editPost, deletePost } from "../../utils/postHelpers";
+import { editPost, deletePost, getImageSrcSet } from "../../utils/postHelpers";
 
 export default function SimplifiedPost({
   scrollContainerRef,
@@ -347,6 +347,8 @@ export default function SimplifiedPost({
                   <div className="mt-3">
                     <img
                       src={getPostImageUrl(post.image)}
+                      srcSet={getImageSrcSet(post.image_variants, getPostImageUrl)}
+                      sizes="(max-width: 768px) 100vw, 768px"
                       alt={post.title}
                       className="w-full object-contain max-h-[400px] rounded-md"
                     />
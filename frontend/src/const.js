@@ -23,6 +23,8 @@ export const FETCH_USER_POST_LIMIT = "api/posts/limit";
 // Comments
 export const FETCH_COMMENTS_ROUTE = `api/comments`;
 export const CREATE_COMMENT_ROUTE = `api/comments/create`;
+export const DELETE_COMMENT_ROUTE = `api/comments/delete`;
+export const COMMENTS_PAGE_SIZE = 20;
 
 // Profile/Global
 export const FETCH_USER_ROUTE = "api/profile";
@@ -10,7 +10,7 @@ import {
 } from "../../const";
 import { Heart, MessageCircle } from "lucide-react";
 import checkRateLimit from "../../utils/checkRateLimit";
-import { editPost, deletePost } from "../../utils/postHelpers";
+import { editPost, deletePost, getImageSrcSet } from "../../utils/postHelpers";
 import { useNavigate } from "react-router-dom";
 import CommentSection from "../../components/comments/CommentSection";
 
@@ -154,11 +154,9 @@ export default function PostDetail() {
   if (!post)
     return <div className="text-center text-white">Post not found.</div>;
 
-  const postImageUrl = post?.image
-    ? `${API_ENDPOINT}/api/posts${
-        post.image.startsWith("/") ? post.image : "/" + post.image
-      }`
-    : null;
+  const toPostImageUrl = (imagePath) =>
+    `${API_ENDPOINT}/api/posts${imagePath.startsWith("/") ? imagePath : "/" + imagePath}`;
+  const postImageUrl = post?.image ? toPostImageUrl(post.image) : null;
 
   return (
     <div className="pt-20 p-6 max-w-3xl mx-auto text-white">
@@ -168,6 +166,8 @@ export default function PostDetail() {
       {postImageUrl && (
         <img
           src={postImageUrl}
+          srcSet={getImageSrcSet(post.image_variants, toPostImageUrl)}
+          sizes="(max-width: 768px) 100vw, 768px"
           alt={post.title}
           className="w-full max-h-[400px] object-cover rounded"
         />
@@ -3,6 +3,12 @@ import checkRateLimit from "./checkRateLimit";
 import handleRateLimitResponse from "./handleRateLimitResponse";
 import { API_ENDPOINT, DELETE_POSTS_ROUTE } from "../const";
 
+// srcSet from the resized copies the API lists in image_variants (none until they are generated)
+export function getImageSrcSet(variants, toUrl) {
+  if (!variants || variants.length === 0) return undefined;
+  return variants.map((variant) => `${toUrl(variant.url)} ${variant.width}w`).join(", ");
+}
+
 export function editPost(navigate, postId) {
   if (!postId) return;
   navigate(`/edit-post/${postId}`);